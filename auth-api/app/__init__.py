@@ -1,8 +1,12 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
+from sqlalchemy import text
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from .models import db
+from .models import db, PredictionHistory
 from .routes.auth import auth_bp, init_oauth
+from .utils.user_cache import create_user_cache, render_metrics
+from .utils.password_hasher import password_hasher
+from .utils.database import configure_engine, engine_options
 import os
 
 def create_app():
@@ -13,6 +17,7 @@ def create_app():
     
     # Configuration directe
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app/database.sqlite')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET', 'dev-secret-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 86400  # 24 hours
     app.config['GOOGLE_CLIENT_ID'] = os.getenv('GOOGLE_CLIENT_ID', '')
@@ -28,6 +33,9 @@ def create_app():
     # Initialize OAuth
     init_oauth(app)
     
+    # Cache des profils servis par /me et /profile
+    app.extensions['user_cache'] = create_user_cache()
+    
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     
@@ -42,10 +50,32 @@ def create_app():
     
     @app.route('/health')
     def health():
-        return jsonify({'status': 'healthy'})
+        cache = app.extensions['user_cache']
+        return jsonify({
+            'status': 'healthy',
+            'user_cache': cache.stats() if cache is not None else None,
+            'password_hasher': password_hasher.stats()
+        })
+    
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint (METRICS_TOKEN protects it when set)"""
+        token = os.getenv('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'error': 'Unauthorized'}), 401
+        body = render_metrics(app.extensions['user_cache']) + password_hasher.render_metrics()
+        return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
     
     # Create tables
     with app.app_context():
+        # Pragmas SQLite (WAL, synchronous, busy_timeout) avant la première connexion
+        configure_engine(db.engine)
         db.create_all()
+        # create_all n'ajoute pas d'index à une table existante
+        for index in PredictionHistory.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        with db.engine.begin() as conn:
+            # Ancien index (user_id, created_at), préfixe du nouveau
+            conn.execute(text('DROP INDEX IF EXISTS ix_prediction_history_user_created'))
     
     return app
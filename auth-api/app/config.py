@@ -1,4 +1,5 @@
 import os
+from app.utils.database import engine_options
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -7,6 +8,8 @@ class Config:
     # Configuration de la base de données
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app/shared/data/database.sqlite'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool et pilote (DB_POOL_*, DB_BUSY_TIMEOUT_MS) ; pragmas SQLite posés par configure_engine
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     
     # Configuration OAuth Google
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID') or ''
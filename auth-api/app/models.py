@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import uuid
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.password_hasher import password_hasher
 
 db = SQLAlchemy()
 
@@ -25,14 +25,18 @@ class User(db.Model):
     predictions = db.relationship('PredictionHistory', backref='user', lazy=True)
     
     def set_password(self, password):
-        """Hacher et définir le mot de passe"""
-        self.password_hash = generate_password_hash(password)
+        """Hacher et définir le mot de passe (pool dédié, HasherBusy si saturé)"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Vérifier le mot de passe"""
+        """Vérifier le mot de passe (pool dédié, HasherBusy si saturé)"""
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Le hash stocké utilise-t-il d'autres paramètres que PASSWORD_HASH_METHOD ?"""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -47,6 +51,11 @@ class User(db.Model):
 
 class PredictionHistory(db.Model):
     __tablename__ = 'prediction_history'
+    # Pagination par clé (created_at, id) d'un utilisateur : chaque page est un parcours d'index,
+    # même au milieu d'un lot dont toutes les lignes ont le même horodatage
+    __table_args__ = (
+        db.Index('ix_prediction_history_user_created_id', 'user_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
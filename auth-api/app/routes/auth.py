@@ -1,12 +1,38 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from authlib.integrations.flask_client import OAuth
-from app.models import db, User
+from app.models import db, User, PredictionHistory
+from app.utils.password_hasher import HasherBusy, password_hasher
 from email_validator import validate_email, EmailNotValidError
+from datetime import datetime
+import base64
 
 # Def le Blueprint EN PREMIER 
 auth_bp = Blueprint('auth', __name__)
 
+def user_payload(user_id):
+    """Serialised user, read through the user cache when it is enabled"""
+    def load():
+        user = User.query.get(user_id)
+        return user.to_dict() if user else None
+    
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        return load()
+    return cache.get_or_load(user_id, load)
+
+def hasher_busy():
+    """503 while the password hashing pool is saturated"""
+    response = jsonify({'error': 'Authentication service busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def invalidate_user(user_id):
+    """Drop a user from the cache once its changes are committed"""
+    cache = current_app.extensions.get('user_cache')
+    if cache is not None:
+        cache.invalidate(user_id)
+
 # OAuth Configuration - Initialiser plus tard
 oauth = OAuth()
 google = None
@@ -72,6 +98,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed', 'details': str(e)}), 500
@@ -89,6 +118,16 @@ def login():
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        # Paramètres de hachage modifiés : mettre à niveau le hash avec le mot de passe en clair
+        if user.password_needs_rehash():
+            try:
+                user.set_password(data['password'])
+                db.session.commit()
+                password_hasher.count_rehash()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Password rehash skipped for {user.id}: {e}")
+        
         access_token = create_access_token(identity=user.id)
         
         return jsonify({
@@ -97,6 +136,8 @@ def login():
             'user': user.to_dict()
         })
         
+    except HasherBusy:
+        return hasher_busy()
     except Exception as e:
         return jsonify({'error': 'Login failed', 'details': str(e)}), 500
 
@@ -137,6 +178,7 @@ def google_callback():
             )
             db.session.add(user)
             db.session.commit()
+        invalidate_user(user.id)
         
         access_token = create_access_token(identity=user.id)
         
@@ -152,12 +194,12 @@ def google_callback():
 def get_current_user():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = user_payload(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()})
+        return jsonify({'user': user})
         
     except Exception as e:
         return jsonify({'error': 'Failed to get user information', 'details': str(e)}), 500
@@ -174,14 +216,14 @@ def logout():
 def get_user_profile():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = user_payload(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         return jsonify({
             'success': True,
-            'user': user.to_dict()
+            'user': user
         })
         
     except Exception as e:
@@ -223,12 +265,16 @@ def change_password():
             user.auth_provider = 'local'
         
         db.session.commit()
+        invalidate_user(user_id)
         
         return jsonify({
             'success': True,
             'message': 'Password updated successfully'
         })
         
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to change password', 'details': str(e)}), 500
@@ -252,6 +298,7 @@ def update_profile():
                 setattr(user, field, data[field])
         
         db.session.commit()
+        invalidate_user(user_id)
         
         return jsonify({
             'success': True,
@@ -261,4 +308,49 @@ def update_profile():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to update profile', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to update profile', 'details': str(e)}), 500
+
+def encode_cursor(record):
+    """Opaque keyset cursor: position of the last record of a page"""
+    raw = f"{record.created_at.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    created_at, record_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+    return datetime.fromisoformat(created_at), record_id
+
+# Historique des prédictions, du plus récent au plus ancien
+@auth_bp.route('/history', methods=['GET'])
+@jwt_required()
+def get_prediction_history():
+    try:
+        user_id = get_jwt_identity()
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        
+        query = PredictionHistory.query.filter(PredictionHistory.user_id == user_id)
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                created_at, record_id = decode_cursor(cursor)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            # Reprise après le dernier élément vu, sans OFFSET : (created_at, id) < (?, ?) est un parcours d'index
+            query = query.filter(
+                db.tuple_(PredictionHistory.created_at, PredictionHistory.id) < db.tuple_(created_at, record_id)
+            )
+        
+        records = query.order_by(
+            PredictionHistory.created_at.desc(), PredictionHistory.id.desc()
+        ).limit(limit + 1).all()
+        
+        has_more = len(records) > limit
+        records = records[:limit]
+        
+        return jsonify({
+            'success': True,
+            'history': [record.to_dict() for record in records],
+            'next_cursor': encode_cursor(records[-1]) if has_more else None
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get prediction history', 'details': str(e)}), 500
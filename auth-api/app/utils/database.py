@@ -0,0 +1,98 @@
+import os
+from typing import Dict, List, Tuple
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+def is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def sqlite_pragmas() -> List[Tuple[str, str]]:
+    """PRAGMA statements run on every new SQLite connection, in order"""
+    journal_mode = os.getenv('DB_JOURNAL_MODE', 'WAL').upper()
+    synchronous = os.getenv('DB_SYNCHRONOUS', 'NORMAL').upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"DB_JOURNAL_MODE invalide: {journal_mode}")
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"DB_SYNCHRONOUS invalide: {synchronous}")
+
+    pragmas = [
+        ('busy_timeout', os.getenv('DB_BUSY_TIMEOUT_MS', '5000')),
+        ('journal_mode', journal_mode),
+        ('synchronous', synchronous)
+    ]
+    # Pragmas supplémentaires : "foreign_keys=ON;temp_store=MEMORY"
+    for item in os.getenv('DB_SQLITE_PRAGMAS', '').split(';'):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            pragmas.append((name.strip(), value.strip()))
+    return pragmas
+
+
+def engine_options(database_url: str) -> Dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Pool settings apply to every backend with a connection pool; SQLite
+    file databases also get a busy timeout at the driver level. Pragmas
+    are set by ``configure_engine`` once the engine exists.
+    """
+    if is_memory_sqlite(database_url):
+        # Base en mémoire : une seule connexion partagée, pas de pool à régler
+        return {}
+
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': _flag('DB_POOL_PRE_PING', 'true')
+    }
+    if is_sqlite(database_url):
+        # Attente du verrou d'écriture par le pilote plutôt qu'un échec immédiat
+        options['connect_args'] = {
+            'timeout': int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000')) / 1000,
+            'check_same_thread': False
+        }
+        # Les connexions SQLite ne vieillissent pas côté serveur
+        options['pool_pre_ping'] = False
+        # QueuePool explicite : SQLAlchemy 1.4 utilise NullPool pour un fichier SQLite,
+        # qui refuse pool_size / max_overflow
+        options['poolclass'] = QueuePool
+    return options
+
+
+def configure_engine(engine):
+    """Run the SQLite pragmas on each new connection (no-op for other backends)"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    logger.info(f"SQLite pragmas: {pragmas}")
@@ -0,0 +1,107 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import logging
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+# Valeur par défaut de Werkzeug 2.3 (version épinglée dans requirements.txt)
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+
+class HasherBusy(Exception):
+    """Every hashing slot is taken; the caller should answer 503"""
+
+
+class PasswordHasher:
+    """Password hashing on a dedicated, bounded thread pool.
+
+    PBKDF2 and scrypt release the GIL, so at most ``max_workers`` cores are
+    spent on hashing while request threads keep serving cheap endpoints.
+    Up to ``max_pending`` more calls wait for a worker; beyond that, a call
+    waits ``queue_timeout`` seconds for a slot and then raises HasherBusy.
+    """
+
+    def __init__(self, method: str = DEFAULT_METHOD, max_workers: int = 2,
+                 max_pending: int = 8, queue_timeout: float = 0.5):
+        self.method = method
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._prefix = None
+        self._lock = threading.Lock()
+        self._counters = {'hashes': 0, 'verifications': 0, 'rejected': 0, 'rehashes': 0}
+
+    @classmethod
+    def from_env(cls) -> 'PasswordHasher':
+        return cls(
+            method=os.getenv('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+            max_workers=int(os.getenv('PASSWORD_HASH_WORKERS', str(min(2, os.cpu_count() or 1)))),
+            max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', '8')),
+            queue_timeout=float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '0.5'))
+        )
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise HasherBusy('Password hashing is saturated')
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password: str) -> str:
+        with self._lock:
+            self._counters['hashes'] += 1
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        with self._lock:
+            self._counters['verifications'] += 1
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: Optional[str]) -> bool:
+        """True when a stored hash was made with other parameters than ``method``"""
+        if not password_hash:
+            return False
+        return password_hash.split('$', 1)[0] != self.method_prefix()
+
+    def method_prefix(self) -> str:
+        # Forme complète de la méthode (ex. "pbkdf2" -> "pbkdf2:sha256:600000")
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._prefix
+
+    def count_rehash(self):
+        with self._lock:
+            self._counters['rehashes'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(method=self.method, workers=self.max_workers, max_pending=self.max_pending)
+        return stats
+
+    def render_metrics(self) -> str:
+        """Pool counters in the Prometheus text format"""
+        stats = self.stats()
+        lines = [
+            '# HELP auth_password_hash_events Password hashing pool counters since start',
+            '# TYPE auth_password_hash_events gauge'
+        ]
+        for event in ('hashes', 'verifications', 'rejected', 'rehashes'):
+            lines.append(f'auth_password_hash_events{{event="{event}"}} {stats[event]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Global instance
+password_hasher = PasswordHasher.from_env()
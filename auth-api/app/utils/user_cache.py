@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Bounded TTL cache of serialised users, with an optional shared SQLite tier.
+
+    Workers sharing the tier see each other's invalidations immediately in
+    the tier; their in-process copies are only trusted for ``local_ttl``
+    seconds, which bounds how long another worker can serve a stale profile.
+    Every invalidation bumps the user's generation in the tier, and a load
+    is only published if that generation did not change while it ran, so a
+    worker never writes back a copy read before another worker's update.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300,
+                 db_path: Optional[str] = None, local_ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        # Sans tier partagé, ce processus voit toutes les invalidations : TTL complet
+        if local_ttl_seconds is None or not db_path:
+            local_ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = min(local_ttl_seconds, ttl_seconds)
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'disk_hits': 0, 'evictions': 0, 'invalidations': 0}
+
+        if self.db_path:
+            try:
+                self.init_db()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"User cache store unavailable ({self.db_path}), memory only: {e}")
+                self.db_path = None
+                self.local_ttl_seconds = ttl_seconds
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS users ('
+                ' user_id TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS user_generations ('
+                ' user_id TEXT PRIMARY KEY, generation INTEGER NOT NULL)'
+            )
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self._counters['hits'] += 1
+                return entry[0]
+
+        payload = self._read_disk(user_id) if self.db_path else None
+        with self._lock:
+            if payload is None:
+                self._counters['misses'] += 1
+                return None
+            self._remember(user_id, payload, now)
+            self._counters['hits'] += 1
+            self._counters['disk_hits'] += 1
+        return payload
+
+    def get_or_load(self, user_id: str, loader: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """Cached payload, or ``loader()`` stored unless the user changed meanwhile"""
+        payload = self.get(user_id)
+        if payload is not None:
+            return payload
+
+        generation = self.generation(user_id)
+        payload = loader()
+        if payload is not None:
+            self.put(user_id, payload, generation)
+        return payload
+
+    def generation(self, user_id: str) -> Tuple[int, Optional[int]]:
+        """Version of a user to hand to put: local and shared invalidation counts"""
+        with self._lock:
+            local = self._generations.get(user_id, 0)
+        return local, self._read_generation(user_id) if self.db_path else None
+
+    def put(self, user_id: str, payload: Dict, generation: Optional[Tuple[int, Optional[int]]] = None):
+        """Store a payload; with ``generation``, only if the user was not invalidated since"""
+        if self.db_path and (generation is None or generation[1] is not None):
+            try:
+                with closing(self.connect()) as conn, conn:
+                    values = (user_id, json.dumps(payload), time.time() + self.ttl_seconds)
+                    if generation is None:
+                        conn.execute(
+                            'INSERT OR REPLACE INTO users (user_id, payload, expires_at) VALUES (?, ?, ?)', values
+                        )
+                    else:
+                        # Compare-and-set : un autre worker a pu invalider l'utilisateur pendant la lecture
+                        written = conn.execute(
+                            'INSERT OR REPLACE INTO users (user_id, payload, expires_at) SELECT ?, ?, ?'
+                            ' WHERE COALESCE((SELECT generation FROM user_generations WHERE user_id = ?), 0) = ?',
+                            (*values, user_id, generation[1])
+                        ).rowcount
+                        if not written:
+                            return
+            except sqlite3.Error as e:
+                logger.warning(f"Could not write user cache: {e}")
+
+        with self._lock:
+            # Lecture antérieure à une invalidation : ne pas republier l'ancienne version
+            if generation is not None and generation[0] != self._generations.get(user_id, 0):
+                return
+            self._remember(user_id, payload, time.monotonic())
+
+    def invalidate(self, user_id: str):
+        """Drop a user after a write (call once the transaction is committed)"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._counters['invalidations'] += 1
+
+        if self.db_path:
+            try:
+                with closing(self.connect()) as conn, conn:
+                    conn.execute(
+                        'INSERT INTO user_generations (user_id, generation) VALUES (?, 1)'
+                        ' ON CONFLICT (user_id) DO UPDATE SET generation = generation + 1',
+                        (user_id,)
+                    )
+                    conn.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
+            except sqlite3.Error as e:
+                logger.warning(f"Could not invalidate user cache: {e}")
+
+    def _remember(self, user_id: str, payload: Dict, now: float):
+        """Insert into the LRU (caller holds the lock)"""
+        self._entries[user_id] = (payload, now + self.local_ttl_seconds)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _read_generation(self, user_id: str) -> Optional[int]:
+        try:
+            with closing(self.connect()) as conn:
+                row = conn.execute('SELECT generation FROM user_generations WHERE user_id = ?', (user_id,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read user cache generation: {e}")
+            return None
+        return row[0] if row else 0
+
+    def _read_disk(self, user_id: str) -> Optional[Dict]:
+        try:
+            with closing(self.connect()) as conn:
+                row = conn.execute(
+                    'SELECT payload FROM users WHERE user_id = ? AND expires_at > ?', (user_id, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read user cache: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['max_entries'] = self.max_entries
+        stats['ttl_seconds'] = self.ttl_seconds
+        stats['shared_tier'] = bool(self.db_path)
+        return stats
+
+
+def create_user_cache() -> Optional[UserCache]:
+    """Cache configured from the environment (USER_CACHE_TTL_SECONDS=0 disables it)"""
+    ttl = float(os.getenv('USER_CACHE_TTL_SECONDS', '300'))
+    if ttl <= 0:
+        return None
+    local_ttl = os.getenv('USER_CACHE_LOCAL_TTL_SECONDS', '5')
+    return UserCache(
+        max_entries=int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000')),
+        ttl_seconds=ttl,
+        db_path=os.getenv('USER_CACHE_PATH') or None,
+        local_ttl_seconds=float(local_ttl) if local_ttl else None
+    )
+
+
+def render_metrics(cache: Optional[UserCache]) -> str:
+    """Cache counters in the Prometheus text format"""
+    lines = [
+        '# HELP auth_user_cache_events User cache counters since start',
+        '# TYPE auth_user_cache_events gauge'
+    ]
+    if cache is None:
+        return '\n'.join(lines) + '\n'
+
+    stats = cache.stats()
+    for event in ('hits', 'misses', 'disk_hits', 'evictions', 'invalidations', 'entries'):
+        lines.append(f'auth_user_cache_events{{event="{event}"}} {stats[event]}')
+    if stats['hit_ratio'] is not None:
+        lines.append('# HELP auth_user_cache_hit_ratio Share of /me and /profile lookups served from the cache')
+        lines.append('# TYPE auth_user_cache_hit_ratio gauge')
+        lines.append(f"auth_user_cache_hit_ratio {stats['hit_ratio']}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,70 @@
+"""Mixed read/write auth traffic against the SQLite store.
+
+Usage (from auth-api/):
+    python -m benchmarks.bench_db_concurrency [--requests 2000] [--concurrency 16]
+    DB_JOURNAL_MODE=DELETE DB_BUSY_TIMEOUT_MS=0 python -m benchmarks.bench_db_concurrency
+
+Mix: 10% register, 20% login, 20% profile update, 50% /me. The user
+cache is off and hashing is cheap, so the database dominates. Failed
+requests (mostly "database is locked") are counted as errors. Each run
+uses a fresh file database.
+"""
+import argparse
+import os
+import uuid
+
+# Avant l'import de l'application : isoler la base, couper les effets hors base
+os.environ.setdefault('USER_CACHE_TTL_SECONDS', '0')
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '4')
+os.environ.setdefault('PASSWORD_HASH_MAX_PENDING', '64')
+os.environ.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', '30')
+
+import email_validator
+
+from benchmarks.common import format_stats
+from benchmarks.loadgen import run_load
+from benchmarks.suite import PASSWORD, seed_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.utils.database import sqlite_pragmas
+
+    email_validator.TEST_ENVIRONMENT = True
+    app = create_app()
+    user_ids = seed_users(app, args.users)
+    with app.app_context():
+        tokens = [create_access_token(identity=user_id) for user_id in user_ids]
+
+    def mixed(client, i):
+        slot = i % 10
+        user = i % args.users
+        headers = {'Authorization': f'Bearer {tokens[user]}'}
+        if slot == 0:
+            return client.post('/api/auth/register', json={
+                'email': f'new-{uuid.uuid4().hex[:12]}@bench.test', 'password': PASSWORD,
+                'first_name': 'New', 'last_name': 'User'
+            })
+        if slot in (1, 2):
+            return client.post('/api/auth/login', json={'email': f'bench-{user}@bench.test', 'password': PASSWORD})
+        if slot in (3, 4):
+            return client.put('/api/auth/profile/update', json={'first_name': f'Name {i}'}, headers=headers)
+        return client.get('/api/auth/me', headers=headers)
+
+    stats = run_load(app, mixed, args.concurrency, args.requests)
+    print(f"pragmas: {sqlite_pragmas()}")
+    print(f"pool: {app.config['SQLALCHEMY_ENGINE_OPTIONS']}")
+    print(format_stats('mixed auth traffic', stats) +
+          f"  p99={stats['p99'] * 1e6:9.1f}us  {stats['throughput']:8.1f} req/s  errors={stats['errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Login throughput and /me, /health tail latency during a login storm.
+
+Usage (from auth-api/):
+    python -m benchmarks.bench_login_storm [--logins 200] [--storm-threads 16]
+
+The storm threads log in as fast as they can while one probe thread
+calls /me and /health. Hashing runs on the bounded pool
+(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING), so excess logins are
+answered 503 instead of queueing behind every other request. Compare
+runs with different pool sizes or PASSWORD_HASH_METHOD values.
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.common import measure
+from benchmarks.loadgen import run_load
+from benchmarks.suite import PASSWORD, seed_users
+
+
+def percentiles(values):
+    values = sorted(values)
+    n = len(values)
+    return {name: values[int(q * (n - 1))] if n else 0.0 for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))}
+
+
+def probe(app, token, stop, latencies):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    while not stop.is_set():
+        for path, kwargs in (('/api/auth/me', {'headers': headers}), ('/health', {})):
+            started = time.perf_counter()
+            client.get(path, **kwargs).get_data()
+            latencies[path].append(time.perf_counter() - started)
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--storm-threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.utils.password_hasher import password_hasher
+
+    app = create_app()
+    user_ids = seed_users(app, args.users)
+    with app.app_context():
+        token = create_access_token(identity=user_ids[0])
+
+    client = app.test_client()
+    idle = measure(lambda: client.get('/api/auth/me', headers={'Authorization': f'Bearer {token}'}), repeat=200)
+    print(f"hasher: {password_hasher.stats()}")
+    print(f"idle /me        p50={idle['p50'] * 1e3:7.2f}ms p95={idle['p95'] * 1e3:7.2f}ms p99={idle['p99'] * 1e3:7.2f}ms")
+
+    stop = threading.Event()
+    latencies = {'/api/auth/me': [], '/health': []}
+    prober = threading.Thread(target=probe, args=(app, token, stop, latencies))
+    prober.start()
+
+    statuses = {}
+    lock = threading.Lock()
+
+    def login(client, i):
+        response = client.post('/api/auth/login', json={'email': f'bench-{i % args.users}@bench.test', 'password': PASSWORD})
+        with lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        # Les 503 sont la contre-pression attendue, pas des erreurs du banc
+        response.status_code = 200 if response.status_code == 503 else response.status_code
+        return response
+
+    stats = run_load(app, login, args.storm_threads, args.logins)
+    stop.set()
+    prober.join()
+
+    accepted = statuses.get(200, 0)
+    wall = stats['requests'] / stats['throughput']
+    print(f"storm logins    {stats['throughput']:7.1f} req/s  accepted={accepted / wall:7.1f}/s  statuses={statuses}  "
+          f"p50={stats['p50'] * 1e3:7.1f}ms p99={stats['p99'] * 1e3:7.1f}ms")
+    for path, values in latencies.items():
+        p = percentiles(values)
+        print(f"storm {path:<13} p50={p['p50'] * 1e3:7.2f}ms p95={p['p95'] * 1e3:7.2f}ms p99={p['p99'] * 1e3:7.2f}ms "
+              f"({len(values)} calls)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Base SQLite jetable : les benchmarks ne touchent jamais la base de l'application
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-auth-'), 'auth.sqlite'))
+os.environ.setdefault('JWT_SECRET', 'bench-secret-bench-secret-bench-secret')
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def measure(func: Callable, repeat: int = 1000, warmup: int = 10) -> Dict:
+    """Time repeated calls of func and return per-call statistics (seconds)"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    return {
+        'calls': repeat,
+        'mean': sum(timings) / repeat,
+        'p50': timings[int(0.50 * (repeat - 1))],
+        'p95': timings[int(0.95 * (repeat - 1))],
+        'p99': timings[int(0.99 * (repeat - 1))]
+    }
+
+
+def format_stats(label: str, stats: Dict) -> str:
+    return (f"{label:<32} mean={stats['mean'] * 1e6:9.1f}us  "
+            f"p50={stats['p50'] * 1e6:9.1f}us  p95={stats['p95'] * 1e6:9.1f}us")
+
+
+def environment() -> Dict:
+    """Machine description stored with results (baselines only compare on similar hosts)"""
+    import sqlalchemy
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def save_baseline(path: str, report: Dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def compare_baseline(path: str, report: Dict, tolerance: float = 0.25) -> List[str]:
+    """Regressions of report against a saved baseline (latency up or throughput down by > tolerance)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ('p50', 'p95'):
+            if metric in current and previous.get(metric):
+                ratio = current[metric] / previous[metric]
+                if ratio > 1 + tolerance:
+                    regressions.append(f"{name} {metric}: {previous[metric] * 1e3:.3f}ms -> {current[metric] * 1e3:.3f}ms (x{ratio:.2f})")
+        if 'throughput' in current and previous.get('throughput'):
+            ratio = current['throughput'] / previous['throughput']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{name} throughput: {previous['throughput']:.1f}/s -> {current['throughput']:.1f}/s (x{ratio:.2f})")
+    return regressions
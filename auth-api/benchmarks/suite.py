@@ -0,0 +1,115 @@
+"""Microbenchmarks and in-process load test of the auth API.
+
+Usage (from auth-api/):
+    python -m benchmarks.suite [--quick] [--output results.json]
+                               [--save-baseline baseline.json]
+                               [--compare baseline.json --tolerance 0.25]
+
+Micro: password hashing and verification. Load: /login and /me through
+the Flask test client from several threads, against a throw-away SQLite
+database seeded with local users. The load generator shares the server's
+process (and GIL), so its figures compare runs with each other, not with
+production.
+
+With --compare, exits 1 when a p50/p95 grew or a throughput fell by more
+than the tolerance.
+"""
+import argparse
+import sys
+
+from benchmarks.common import compare_baseline, environment, format_stats, measure, save_baseline
+from benchmarks.loadgen import run_load
+
+PASSWORD = 'bench-password'
+
+
+def seed_users(app, n_users: int):
+    """Local users bench-<i>@bench.test sharing one password hash"""
+    from app.models import db, User
+
+    with app.app_context():
+        template = User()
+        template.set_password(PASSWORD)
+        users = [
+            User(email=f'bench-{i}@bench.test', first_name='Bench', last_name=str(i),
+                 auth_provider='local', password_hash=template.password_hash)
+            for i in range(n_users)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return [user.id for user in users]
+
+
+def run_micro(results, quick: bool):
+    from app.models import User
+
+    user = User()
+    user.set_password(PASSWORD)
+    repeat = 10 if quick else 50
+    results['micro.set_password'] = measure(lambda: User().set_password(PASSWORD), repeat=repeat, warmup=1)
+    results['micro.check_password'] = measure(lambda: user.check_password(PASSWORD), repeat=repeat, warmup=1)
+
+
+def run_load_tests(results, app, user_ids, quick: bool, concurrency: int):
+    from flask_jwt_extended import create_access_token
+
+    n_users = len(user_ids)
+    with app.app_context():
+        tokens = [create_access_token(identity=user_id) for user_id in user_ids]
+
+    def login(client, i):
+        return client.post('/api/auth/login', json={'email': f'bench-{i % n_users}@bench.test', 'password': PASSWORD})
+    results['load.login'] = run_load(app, login, concurrency, 20 if quick else 200)
+
+    def me(client, i):
+        return client.get('/api/auth/me', headers={'Authorization': f'Bearer {tokens[i % n_users]}'})
+    results['load.me'] = run_load(app, me, concurrency, 200 if quick else 2000)
+
+
+def print_results(results):
+    for name, stats in results.items():
+        line = format_stats(name, stats)
+        if 'throughput' in stats:
+            line += f"  p99={stats['p99'] * 1e6:9.1f}us  {stats['throughput']:8.1f} req/s  errors={stats['errors']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='fewer calls (smoke run)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--save-baseline', help='write the results as the new baseline')
+    parser.add_argument('--compare', help='baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    app.config['TESTING'] = True
+    user_ids = seed_users(app, args.users)
+
+    results = {}
+    run_micro(results, args.quick)
+    run_load_tests(results, app, user_ids, args.quick, args.concurrency)
+
+    report = {'api': 'auth-api', 'environment': environment(), 'results': results}
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            save_baseline(path, report)
+
+    if args.compare:
+        regressions = compare_baseline(args.compare, report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+import email_validator
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Base jetable ; le domaine réservé .test est accepté sans résolution DNS
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='auth-tests-'), 'auth.sqlite'))
+os.environ.setdefault('JWT_SECRET', 'test-secret-test-secret-test-secret')
+email_validator.TEST_ENVIRONMENT = True
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    from app import create_app
+
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def registered_user(client):
+    """A new local user: (email, password, access token)"""
+    import uuid
+
+    email = f'user-{uuid.uuid4().hex[:8]}@example.test'
+    password = 'secret-password'
+    response = client.post('/api/auth/register', json={
+        'email': email, 'password': password, 'first_name': 'Test', 'last_name': 'User'
+    })
+    assert response.status_code == 201
+    return email, password, response.get_json()['access_token']
@@ -0,0 +1,114 @@
+from benchmarks.loadgen import run_load
+
+
+def test_register_login_and_me(client, registered_user):
+    email, password, token = registered_user
+
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 200
+    assert response.get_json()['user']['email'] == email
+
+    response = client.post('/api/auth/login', json={'email': email, 'password': 'wrong-password'})
+    assert response.status_code == 401
+
+    response = client.get('/api/auth/me', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.get_json()['user']['email'] == email
+
+
+def test_load_generator_reports_latency(flask_app, registered_user):
+    token = registered_user[2]
+
+    def me(client, i):
+        return client.get('/api/auth/me', headers={'Authorization': f'Bearer {token}'})
+
+    stats = run_load(flask_app, me, concurrency=2, requests=10)
+    assert stats['requests'] == 10 and stats['errors'] == 0
+    assert stats['p50'] <= stats['p99']
+
+
+def test_me_is_cached_and_invalidated_on_update(flask_app, client, registered_user):
+    from app.models import db, User
+
+    email, _, token = registered_user
+    headers = {'Authorization': f'Bearer {token}'}
+    cache = flask_app.extensions['user_cache']
+    before = cache.stats()
+
+    assert client.get('/api/auth/me', headers=headers).get_json()['user']['first_name'] == 'Test'
+    assert client.get('/api/auth/profile', headers=headers).get_json()['user']['first_name'] == 'Test'
+    assert cache.stats()['hits'] == before['hits'] + 1
+
+    # Écriture directe en base : la copie en cache est servie jusqu'à invalidation
+    with flask_app.app_context():
+        User.query.filter_by(email=email).update({'last_name': 'Direct'})
+        db.session.commit()
+    assert client.get('/api/auth/me', headers=headers).get_json()['user']['last_name'] == 'User'
+
+    response = client.put('/api/auth/profile/update', json={'first_name': 'Renamed'}, headers=headers)
+    assert response.status_code == 200
+    user = client.get('/api/auth/me', headers=headers).get_json()['user']
+    assert (user['first_name'], user['last_name']) == ('Renamed', 'Direct')
+
+    assert 'auth_user_cache_hit_ratio' in client.get('/metrics').get_data(as_text=True)
+
+
+def test_login_upgrades_hash_and_backs_off_when_busy(flask_app, client, registered_user, monkeypatch):
+    from app.models import User
+    from app.utils.password_hasher import HasherBusy, password_hasher
+
+    email, password, _ = registered_user
+    monkeypatch.setattr(password_hasher, 'method', 'pbkdf2:sha256:1000')
+    monkeypatch.setattr(password_hasher, '_prefix', None)
+
+    assert client.post('/api/auth/login', json={'email': email, 'password': password}).status_code == 200
+    with flask_app.app_context():
+        assert User.query.filter_by(email=email).first().password_hash.startswith('pbkdf2:sha256:1000$')
+    assert client.post('/api/auth/login', json={'email': email, 'password': password}).status_code == 200
+
+    def busy(*args):
+        raise HasherBusy('saturated')
+    monkeypatch.setattr(password_hasher, 'verify', busy)
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_history_keyset_pagination(flask_app, client, registered_user):
+    from datetime import datetime, timedelta
+    from sqlalchemy import text
+    from app.models import db, User, PredictionHistory
+
+    email, _, token = registered_user
+    headers = {'Authorization': f'Bearer {token}'}
+    with flask_app.app_context():
+        user_id = User.query.filter_by(email=email).first().id
+        start = datetime(2025, 1, 1)
+        # Deux lignes par horodatage (comme un lot) : l'id départage
+        db.session.add_all([
+            PredictionHistory(user_id=user_id, input_data={'row': i}, prediction_result=60 + i,
+                              created_at=start + timedelta(minutes=i // 2))
+            for i in range(7)
+        ])
+        db.session.commit()
+        plan = db.session.execute(text(
+            'EXPLAIN QUERY PLAN SELECT id FROM prediction_history WHERE user_id = :u'
+            ' AND (created_at, id) < (:c, :i) ORDER BY created_at DESC, id DESC'
+        ), {'u': user_id, 'c': start, 'i': 'x'}).fetchall()
+        # Recherche dans l'index (pas de tri ni de relecture des lignes de même horodatage)
+        plan = [str(row).replace(' ', '') for row in plan]
+        assert any('ix_prediction_history_user_created_id' in row and '(created_at,id)<' in row for row in plan)
+        assert not any('TEMPB-TREE' in row for row in plan)
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/auth/history?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers=headers).get_json()
+        seen.extend(record['input_data']['row'] for record in page['history'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert sorted(seen) == list(range(7)) and len(seen) == 7
+    assert seen[0] in (5, 6) and seen[-1] in (0, 1)
+    assert client.get('/api/auth/history?cursor=not-a-cursor', headers=headers).status_code == 400
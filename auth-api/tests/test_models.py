@@ -0,0 +1,96 @@
+from app.models import User
+
+
+def test_password_hash_round_trip():
+    user = User()
+    assert not user.check_password('anything')
+
+    user.set_password('secret-password')
+    assert user.password_hash != 'secret-password'
+    assert user.check_password('secret-password')
+    assert not user.check_password('other-password')
+
+
+def test_user_cache_shared_tier_and_stale_loads(tmp_path):
+    from app.utils.user_cache import UserCache
+
+    path = str(tmp_path / 'users.sqlite')
+    first = UserCache(ttl_seconds=60, db_path=path, local_ttl_seconds=60)
+    second = UserCache(ttl_seconds=60, db_path=path, local_ttl_seconds=60)
+
+    assert first.get_or_load('u1', lambda: {'first_name': 'A'}) == {'first_name': 'A'}
+    assert second.get('u1') == {'first_name': 'A'}
+    assert second.stats()['disk_hits'] == 1
+
+    # Un chargement commencé avant l'invalidation n'est pas remis en cache
+    def stale_load():
+        first.invalidate('u2')
+        return {'first_name': 'stale'}
+    assert first.get_or_load('u2', stale_load) == {'first_name': 'stale'}
+    assert first.get('u2') is None
+
+    # ... y compris quand l'invalidation vient d'un autre worker : rien n'est publié dans le tier partagé
+    def stale_elsewhere():
+        second.invalidate('u3')
+        return {'first_name': 'stale'}
+    assert first.get_or_load('u3', stale_elsewhere) == {'first_name': 'stale'}
+    assert second.get('u3') is None and first.get('u3') is None
+
+    # L'invalidation vide le tier partagé ; l'autre worker garde sa copie locale au plus local_ttl
+    first.invalidate('u1')
+    assert second.get('u1') == {'first_name': 'A'}
+    second.clear()
+    assert second.get('u1') is None
+
+
+def test_password_hasher_rejects_when_saturated():
+    import threading
+
+    import pytest
+    from app.utils.password_hasher import HasherBusy, PasswordHasher
+
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', max_workers=1, max_pending=0, queue_timeout=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def hold_worker():
+        started.set()
+        release.wait()
+
+    worker = threading.Thread(target=hasher._run, args=(hold_worker,))
+    worker.start()
+    started.wait()
+    try:
+        with pytest.raises(HasherBusy):
+            hasher.hash('secret-password')
+    finally:
+        release.set()
+        worker.join()
+
+    password_hash = hasher.hash('secret-password')
+    assert hasher.verify(password_hash, 'secret-password')
+    assert not hasher.needs_rehash(password_hash)
+    assert PasswordHasher(method='pbkdf2:sha256:2000').needs_rehash(password_hash)
+    assert hasher.stats()['rejected'] == 1
+
+
+def test_sqlite_engine_pragmas_and_server_options(flask_app, tmp_path):
+    from sqlalchemy import text
+    from app.models import db
+    from app.utils.database import engine_options
+
+    with flask_app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+
+    options = engine_options('postgresql://user:secret@db/auth')
+    assert 'connect_args' not in options and options['pool_pre_ping'] is True
+    assert engine_options('sqlite://') == {}
+
+    # Options de pool valides quelle que soit la version de SQLAlchemy
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **engine_options(f"sqlite:///{tmp_path / 'pool.db'}"))
+    assert isinstance(engine.pool, QueuePool) and engine.pool.size() == 5
+    engine.dispose()
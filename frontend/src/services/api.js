@@ -85,6 +85,23 @@ export const predictionService = {
       headers: { 'Content-Type': 'multipart/form-data' }
     });
   },
+  // Résultats conservés côté serveur : seule la première page est renvoyée
+  predictBatchStored: (file, limit = 100) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    return predictionApi.post(`/api/predict/batch?store=true&limit=${limit}`, formData, {
+      headers: { 'Content-Type': 'multipart/form-data' }
+    });
+  },
+  // params : URLSearchParams pour répéter "filter" (ex. filter=potential:gt:80)
+  getBatchResults: (resultId, params) =>
+    predictionApi.get(`/api/predict/results/${resultId}`, { params }),
+  getBatchTop: (resultId, params) =>
+    predictionApi.get(`/api/predict/results/${resultId}/top`, { params }),
+  deleteBatchResults: (resultId) => predictionApi.delete(`/api/predict/results/${resultId}`),
+  // query : { player_id } d'un lot déjà scoré, ou { player_data }
+  findSimilarPlayers: (query, k = 10) =>
+    predictionApi.post('/api/predict/similar', { ...query, k }),
   getRecommendations: (playerData, prediction) => 
     predictionApi.post('/api/predict/recommendations', { player_data: playerData, prediction }),
   healthCheck: () => predictionApi.get('/api/predict/health')
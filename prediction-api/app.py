@@ -1,7 +1,9 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from app.routes.prediction import prediction_bp
+from app.routes.jobs import jobs_bp
+from app.routes.metrics import metrics_bp
 import os
 import logging
 
@@ -23,6 +25,8 @@ def create_app():
     
     # Register blueprints
     app.register_blueprint(prediction_bp, url_prefix='/api/predict')
+    app.register_blueprint(jobs_bp, url_prefix='/api/predict/jobs')
+    app.register_blueprint(metrics_bp)
     
     @app.route('/')
     def home():
@@ -33,7 +37,10 @@ def create_app():
                 'single_prediction': '/api/predict/single',
                 'batch_prediction': '/api/predict/batch',
                 'recommendations': '/api/predict/recommendations',
-                'health': '/api/predict/health'
+                'batch_jobs': '/api/predict/jobs',
+                'models': '/api/predict/models',
+                'health': '/api/predict/health',
+                'metrics': '/metrics'
             }
         })
     
@@ -0,0 +1,129 @@
+from flask import Blueprint, current_app, request, jsonify, send_file, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import tempfile
+import os
+import logging
+from app.services.job_service import job_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+jobs_bp = Blueprint('jobs', __name__)
+
+MAX_PAGE_SIZE = 1000
+
+
+def job_response(job):
+    """Job status plus the URLs a client needs to follow it"""
+    job = dict(job)
+    job['status_url'] = url_for('jobs.get_job', job_id=job['id'])
+    if job['status'] == 'completed':
+        job['results_url'] = url_for('jobs.get_job_results', job_id=job['id'])
+        job['download_url'] = url_for('jobs.download_job_results', job_id=job['id'])
+    return job
+
+
+@jobs_bp.route('', methods=['POST'])
+@jwt_required()
+def submit_job():
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided', 'success': False}), 400
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            return jsonify({'error': 'No file selected', 'success': False}), 400
+        
+        if not file.filename.endswith('.csv'):
+            return jsonify({'error': 'File must be CSV', 'success': False}), 400
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv', dir=job_service.jobs_dir) as temp_file:
+            file.save(temp_file.name)
+            temp_path = temp_file.name
+        
+        job = job_service.submit(temp_path, file.filename, user_id=get_jwt_identity(),
+                                 dumps=current_app.json.dumps)
+        
+        return jsonify({'success': True, 'job': job_response(job)}), 202
+        
+    except Exception as e:
+        logger.error(f"Batch job submission failed: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'Job submission failed: {str(e)}'
+        }), 500
+
+
+@jobs_bp.route('', methods=['GET'])
+@jwt_required()
+def list_jobs():
+    jobs = job_service.list_jobs(get_jwt_identity())
+    return jsonify({'success': True, 'jobs': [job_response(job) for job in jobs]})
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    job = job_service.get(job_id, user_id=get_jwt_identity())
+    if job is None:
+        return jsonify({'error': 'Job not found', 'success': False}), 404
+    
+    return jsonify({'success': True, 'job': job_response(job)})
+
+
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_job(job_id):
+    if job_service.get(job_id, user_id=get_jwt_identity()) is None:
+        return jsonify({'error': 'Job not found', 'success': False}), 404
+    
+    job = job_service.cancel(job_id)
+    return jsonify({'success': True, 'job': job_response(job)})
+
+
+@jobs_bp.route('/<job_id>/results', methods=['GET'])
+@jwt_required()
+def get_job_results(job_id):
+    job = job_service.get(job_id, user_id=get_jwt_identity())
+    if job is None:
+        return jsonify({'error': 'Job not found', 'success': False}), 404
+    
+    if job['status'] != 'completed':
+        return jsonify({
+            'error': f"Job is {job['status']}",
+            'success': False,
+            'job': job_response(job)
+        }), 409
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), MAX_PAGE_SIZE)
+    predictions = job_service.read_results(job_id, offset, limit)
+    
+    return jsonify({
+        'success': True,
+        'predictions': predictions,
+        'offset': offset,
+        'limit': limit,
+        'total_players': job['rows_total']
+    })
+
+
+@jobs_bp.route('/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_job_results(job_id):
+    job = job_service.get(job_id, user_id=get_jwt_identity())
+    if job is None:
+        return jsonify({'error': 'Job not found', 'success': False}), 404
+    
+    if job['status'] != 'completed':
+        return jsonify({'error': f"Job is {job['status']}", 'success': False}), 409
+    
+    # Fichier NDJSON envoyé en flux depuis le disque
+    download_name = f"{os.path.splitext(job['filename'] or 'predictions')[0]}_predictions.ndjson"
+    return send_file(
+        job_service.results_path(job_id),
+        mimetype='application/x-ndjson',
+        as_attachment=True,
+        download_name=download_name
+    )
@@ -0,0 +1,92 @@
+from flask import Blueprint, Response, g, request, jsonify
+import os
+import time
+import logging
+from app.services.prediction_service import prediction_service
+from app.services.recommendation_service import recommendation_service
+from app.services.prediction_recorder import prediction_recorder
+from app.utils.metrics import REGISTRY, SIZE_BUCKETS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUESTS_TOTAL = REGISTRY.counter(
+    'http_requests_total', 'HTTP requests, by route, method and status', ('endpoint', 'method', 'status')
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Request latency until the response is closed', ('endpoint', 'method')
+)
+REQUEST_BYTES = REGISTRY.histogram(
+    'http_request_size_bytes', 'Request body size', ('endpoint',), buckets=SIZE_BUCKETS
+)
+RESPONSE_BYTES = REGISTRY.histogram(
+    'http_response_size_bytes', 'Response body size (buffered responses only)', ('endpoint',), buckets=SIZE_BUCKETS
+)
+
+
+def cache_samples(cache, fields):
+    if cache is None:
+        return {}
+    stats = cache.stats()
+    return {(field,): stats.get(field) for field in fields}
+
+
+REGISTRY.gauge(
+    'prediction_cache_events', 'Prediction cache counters since start', lambda: cache_samples(
+        prediction_service.prediction_cache, ('hits', 'misses', 'evictions', 'disk_hits', 'entries')
+    ), ('event',)
+)
+REGISTRY.gauge(
+    'advice_cache_events', 'Training advice cache counters since start', lambda: cache_samples(
+        recommendation_service.advice_cache, ('hits', 'misses', 'disk_hits', 'entries')
+    ), ('event',)
+)
+REGISTRY.gauge(
+    'prediction_history_events', 'Write-behind prediction history counters since start', lambda: cache_samples(
+        prediction_recorder, ('recorded', 'written', 'flushes', 'dropped', 'errors', 'buffered')
+    ), ('event',)
+)
+REGISTRY.gauge(
+    'prediction_model_info', 'Active model version (value is always 1)',
+    lambda: {(prediction_service.bundle.version, prediction_service.bundle.identity): 1},
+    ('version', 'identity')
+)
+
+
+@metrics_bp.before_app_request
+def start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    method = request.method
+    REQUESTS_TOTAL.labels(endpoint, method, response.status_code).inc()
+    if request.content_length:
+        REQUEST_BYTES.labels(endpoint).observe(request.content_length)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_BYTES.labels(endpoint).observe(response.content_length)
+
+    # Pour un flux, la latence inclut l'envoi complet du corps
+    histogram = REQUEST_SECONDS.labels(endpoint, method)
+    response.call_on_close(lambda: histogram.observe(time.perf_counter() - started))
+    return response
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint (METRICS_TOKEN protects it when set)"""
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized', 'success': False}), 401
+
+    return Response(REGISTRY.render(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
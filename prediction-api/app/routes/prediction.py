@@ -1,17 +1,127 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import pandas as pd
+import hmac
 import tempfile
 import os
+import time
 import logging
 from app.services.prediction_service import prediction_service
+from app.services.prediction_cache import ReuseStats
 from app.services.recommendation_service import recommendation_service
+from app.services.prediction_recorder import prediction_recorder
+from app.services.result_store import result_store, FILTER_OPERATORS
+from app.services.similarity_index import similarity_indexes
+from app.services import batch_io
+from app.utils.metrics import stage_timer
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 prediction_bp = Blueprint('prediction', __name__)
 
+STREAM_MODES = ('ndjson', 'json')
+MAX_PAGE_SIZE = 1000
+
+
+def remove_file(path):
+    """Remove a temporary upload if it still exists (upload streams are left alone)"""
+    if isinstance(path, str) and os.path.exists(path):
+        os.unlink(path)
+
+
+def parse_filters(args):
+    """filter=column:operator:value query arguments ('in' takes comma-separated values)"""
+    filters = []
+    for item in args.getlist('filter'):
+        column, _, rest = item.partition(':')
+        operator, _, value = rest.partition(':')
+        if not column or operator not in FILTER_OPERATORS:
+            raise ValueError(f"Filtre invalide: {item!r} (attendu colonne:opérateur:valeur, opérateurs {', '.join(FILTER_OPERATORS)})")
+        filters.append((column, operator, value.split(',') if operator == 'in' else value))
+    return filters
+
+
+def page_limit(default=100):
+    return min(max(request.args.get('limit', default, type=int), 1), MAX_PAGE_SIZE)
+
+
+def result_page(result, filters, sort_by, descending, offset, limit):
+    total, positions = result.query(filters, sort_by, descending, offset, limit)
+    return {
+        'success': True,
+        'result_id': result.result_id,
+        'predictions': result.records(positions),
+        'total_players': len(result),
+        'matching_players': total,
+        'offset': offset,
+        'limit': limit,
+        'sort': sort_by,
+        'order': 'desc' if descending else 'asc'
+    }
+
+
+def record_history(user_id, results):
+    """Queue batch results (records or result frame) for the prediction history"""
+    if prediction_recorder is not None and len(results):
+        prediction_recorder.record_batch(user_id, results)
+
+
+def user_index(user_id):
+    """Similarity index fed by the user's batches (None when disabled)"""
+    return similarity_indexes.for_user(user_id) if similarity_indexes is not None else None
+
+
+def stream_batch_ndjson(source, chunk_rows, user_id=None, file_format=None):
+    """One JSON result per line, written chunk by chunk, then a summary line"""
+    dumps = current_app.json.dumps
+    total = 0
+    try:
+        reuse = ReuseStats()
+        for results in prediction_service.iter_batch_predictions(source, chunk_rows, file_format=file_format,
+                                                                 reuse=reuse, index=user_index(user_id)):
+            record_history(user_id, results)
+            with stage_timer('serialize'):
+                chunk = ''.join(dumps(result) + '\n' for result in results)
+            yield chunk
+            total += len(results)
+        # Dernière ligne : même résumé que les réponses bufferisée et JSON en flux
+        yield dumps({
+            'success': True,
+            'total_players': total,
+            'reuse': reuse.to_dict(),
+            'message': f'Prédictions terminées pour {total} joueurs'
+        }) + '\n'
+    except Exception as e:
+        logger.error(f"Streaming batch prediction failed: {e}", exc_info=True)
+        yield dumps({'success': False, 'error': str(e)}) + '\n'
+    finally:
+        remove_file(source)
+
+
+def stream_batch_json(source, chunk_rows, user_id=None, file_format=None):
+    """Same document as the buffered response, sent as a chunked JSON array"""
+    dumps = current_app.json.dumps
+    total = 0
+    yield '{"predictions": ['
+    try:
+        reuse = ReuseStats()
+        for results in prediction_service.iter_batch_predictions(source, chunk_rows, file_format=file_format,
+                                                                 reuse=reuse, index=user_index(user_id)):
+            record_history(user_id, results)
+            if results:
+                with stage_timer('serialize'):
+                    chunk = (',' if total else '') + ','.join(dumps(result) for result in results)
+                yield chunk
+                total += len(results)
+        yield (f'], "success": true, "total_players": {total}, "reuse": {dumps(reuse.to_dict())}, '
+               f'"message": {dumps(f"Prédictions terminées pour {total} joueurs")}}}')
+    except Exception as e:
+        logger.error(f"Streaming batch prediction failed: {e}", exc_info=True)
+        yield f'], "success": false, "total_players": {total}, "error": {dumps(str(e))}}}'
+    finally:
+        remove_file(source)
+
 @prediction_bp.route('/single', methods=['POST'])
 @jwt_required()
 def predict_single():
@@ -24,6 +134,8 @@ def predict_single():
         result = prediction_service.predict_single(data)
         
         if result['success']:
+            if prediction_recorder is not None:
+                prediction_recorder.record(get_jwt_identity(), data, result['prediction'])
             return jsonify({
                 'success': True,
                 'prediction': result['prediction'],
@@ -54,28 +166,104 @@ def predict_batch():
         if file.filename == '':
             return jsonify({'error': 'No file selected', 'success': False}), 400
         
-        if not file.filename.endswith('.csv'):
-            return jsonify({'error': 'File must be CSV', 'success': False}), 400
+        file_format = batch_io.detect_format(file.filename)
+        if file_format is None:
+            return jsonify({'error': 'File must be CSV, Parquet, Arrow or Feather', 'success': False}), 400
+        if file_format != 'csv' and not batch_io.columnar_available():
+            return jsonify({'error': f'{file_format} uploads require pyarrow', 'success': False}), 415
+        
+        stream = request.args.get('stream')
+        if stream and stream not in STREAM_MODES:
+            return jsonify({'error': f'stream must be one of {STREAM_MODES}', 'success': False}), 400
+        
+        # Encodage de la réponse : JSON par défaut, ou binaire colonnaire sans passer par JSON
+        output_format = request.args.get('format', 'json')
+        if output_format != 'json' and output_format not in batch_io.OUTPUT_MIMETYPES:
+            return jsonify({'error': f"format must be json or one of {tuple(batch_io.OUTPUT_MIMETYPES)}", 'success': False}), 400
+        if output_format != 'json' and stream:
+            return jsonify({'error': 'format cannot be combined with stream', 'success': False}), 400
+        if output_format != 'json' and not batch_io.columnar_available():
+            return jsonify({'error': f'{output_format} output requires pyarrow', 'success': False}), 415
+        
+        # store=true : résultats conservés côté serveur, seule la première page est renvoyée
+        store = request.args.get('store', '').lower() in ('1', 'true', 'yes')
+        if store and (stream or output_format != 'json'):
+            return jsonify({'error': 'store cannot be combined with stream or format', 'success': False}), 400
+        
+        if file_format == 'csv' and not stream:
+            # CSV parsé directement depuis l'upload (mémoire, ou fichier spoolé par Werkzeug)
+            source = file.stream
+        else:
+            # Flux (l'upload est fermé avant la fin de la réponse) et formats colonnaires
+            # (projection / memory-map) : fichier temporaire
+            suffix = os.path.splitext(file.filename)[1].lower()
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+                file.save(temp_file.name)
+                source = temp_file.name
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-            file.save(temp_file.name)
-            temp_path = temp_file.name
+        if stream:
+            # Lecture, prédiction et écriture par morceaux : le fichier temporaire est supprimé en fin de flux
+            chunk_rows = request.args.get('chunk_size', type=int) or int(os.getenv('BATCH_STREAM_CHUNK_ROWS', '5000'))
+            logger.info(f"Streaming batch prediction ({stream}) for file: {file.filename}")
+            
+            if stream == 'ndjson':
+                body, mimetype = stream_batch_ndjson(source, chunk_rows, get_jwt_identity(), file_format), 'application/x-ndjson'
+            else:
+                body, mimetype = stream_batch_json(source, chunk_rows, get_jwt_identity(), file_format), 'application/json'
+            response = Response(stream_with_context(body), mimetype=mimetype)
+            response.call_on_close(lambda: remove_file(source))
+            return response
         
         try:
             logger.info(f"Processing batch prediction for file: {file.filename}")
             
+            reuse = ReuseStats()
+            index = user_index(get_jwt_identity())
+            if output_format != 'json':
+                frame = prediction_service.predict_batch_frame(source, file_format, reuse, index)
+                record_history(get_jwt_identity(), frame)
+                with stage_timer('serialize'):
+                    body = batch_io.write_frame(frame, output_format)
+                download_name = f"{os.path.splitext(file.filename)[0]}_predictions{batch_io.OUTPUT_EXTENSIONS[output_format]}"
+                response = Response(body, mimetype=batch_io.OUTPUT_MIMETYPES[output_format])
+                response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+                response.headers['X-Total-Players'] = str(len(frame))
+                response.headers['X-Reuse-Ratio'] = str(reuse.to_dict()['reuse_ratio'])
+                return response
+            
+            if store:
+                keys, columns = prediction_service.predict_batch_columns(source, file_format, reuse, index)
+                try:
+                    result = result_store.put(get_jwt_identity(), keys, columns,
+                                              meta={'filename': file.filename, 'reuse': reuse.to_dict()})
+                except ValueError as e:
+                    return jsonify({'error': str(e), 'success': False}), 413
+                record_history(get_jwt_identity(), result)
+                
+                page = result_page(result, [], None, False, 0, page_limit())
+                page.update(
+                    results_url=url_for('prediction.get_batch_results', result_id=result.result_id),
+                    top_url=url_for('prediction.get_batch_top', result_id=result.result_id),
+                    reuse=reuse.to_dict(),
+                    message=f'Prédictions terminées pour {len(result)} joueurs'
+                )
+                with stage_timer('serialize'):
+                    return jsonify(page)
+            
             # Faire la prédiction
-            results = prediction_service.predict_batch(temp_path)
+            results = prediction_service.predict_batch(source, file_format, reuse, index)
+            record_history(get_jwt_identity(), results)
             
             logger.info(f"Successfully processed {len(results)} players")
             
-            return jsonify({
-                'success': True,
-                'predictions': results,
-                'total_players': len(results),
-                'message': f'Prédictions terminées pour {len(results)} joueurs'
-            })
+            with stage_timer('serialize'):
+                return jsonify({
+                    'success': True,
+                    'predictions': results,
+                    'total_players': len(results),
+                    'reuse': reuse.to_dict(),
+                    'message': f'Prédictions terminées pour {len(results)} joueurs'
+                })
             
         except Exception as e:
             logger.error(f"Error in batch prediction: {e}", exc_info=True)
@@ -86,8 +274,7 @@ def predict_batch():
             
         finally:
             # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            remove_file(source)
             
     except Exception as e:
         logger.error(f"Batch prediction failed: {e}", exc_info=True)
@@ -96,6 +283,155 @@ def predict_batch():
             'error': f'Batch prediction failed: {str(e)}'
         }), 500
 
+@prediction_bp.route('/results/<result_id>', methods=['GET'])
+@jwt_required()
+def get_batch_results(result_id):
+    """One page of a stored batch result, filtered and sorted server-side"""
+    result = result_store.get(result_id, user_id=get_jwt_identity())
+    if result is None:
+        return jsonify({'error': 'Result not found or expired', 'success': False}), 404
+    
+    try:
+        filters = parse_filters(request.args)
+        sort_by = request.args.get('sort') or None
+        descending = request.args.get('order', 'desc' if sort_by == 'prediction' else 'asc') == 'desc'
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        with stage_timer('result_query'):
+            page = result_page(result, filters, sort_by, descending, offset, page_limit())
+        return jsonify(page)
+    except KeyError as e:
+        return jsonify({'error': f'Unknown column: {e.args[0]}', 'success': False}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+@prediction_bp.route('/results/<result_id>/top', methods=['GET'])
+@jwt_required()
+def get_batch_top(result_id):
+    """Best (or worst) k players of a stored result on a numeric column"""
+    result = result_store.get(result_id, user_id=get_jwt_identity())
+    if result is None:
+        return jsonify({'error': 'Result not found or expired', 'success': False}), 404
+    
+    try:
+        filters = parse_filters(request.args)
+        column = request.args.get('by', 'prediction')
+        k = min(max(request.args.get('k', 10, type=int), 1), MAX_PAGE_SIZE)
+        descending = request.args.get('order', 'desc') == 'desc'
+        with stage_timer('result_query'):
+            total, positions = result.top(column, k, filters, descending)
+        return jsonify({
+            'success': True,
+            'result_id': result.result_id,
+            'predictions': result.records(positions),
+            'matching_players': total,
+            'by': column,
+            'order': 'desc' if descending else 'asc',
+            'k': k
+        })
+    except KeyError as e:
+        return jsonify({'error': f'Unknown column: {e.args[0]}', 'success': False}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+@prediction_bp.route('/results/<result_id>', methods=['DELETE'])
+@jwt_required()
+def delete_batch_results(result_id):
+    if not result_store.delete(result_id, user_id=get_jwt_identity()):
+        return jsonify({'error': 'Result not found or expired', 'success': False}), 404
+    return jsonify({'success': True})
+
+@prediction_bp.route('/similar', methods=['POST'])
+@jwt_required()
+def similar_players():
+    """k nearest players among those scored in the user's batches"""
+    try:
+        data = request.get_json() or {}
+        if 'player_id' not in data and 'player_data' not in data:
+            return jsonify({'error': 'player_id or player_data required', 'success': False}), 400
+        
+        if similarity_indexes is None:
+            return jsonify({'error': 'Similarity search is disabled (SIMILARITY_INDEX)', 'success': False}), 404
+        
+        index = similarity_indexes.get(get_jwt_identity())
+        if index is None or not len(index):
+            return jsonify({'error': 'No scored players to search: run a batch prediction first', 'success': False}), 404
+        
+        k = min(max(int(data.get('k', 10)), 1), MAX_PAGE_SIZE)
+        exclude = None
+        if 'player_id' in data:
+            # Joueur déjà indexé : son propre vecteur, exclu des voisins
+            exclude = index.row_of(str(data['player_id']))
+            if exclude is None:
+                return jsonify({'error': f"Player {data['player_id']} is not indexed", 'success': False}), 404
+            vector = index.vector(exclude)
+        else:
+            bundle = prediction_service.bundle
+            if index.identity != prediction_service.cache_identity(bundle):
+                return jsonify({'error': 'Index built by another model version: score a batch again', 'success': False}), 409
+            vector = prediction_service.embed_player(data['player_data'], bundle)
+        
+        started = time.perf_counter()
+        with stage_timer('similarity_search'):
+            rows, distances = index.search(vector, k, exclude=exclude, exact=bool(data.get('exact')))
+        took_ms = (time.perf_counter() - started) * 1000
+        
+        neighbors = index.players(rows)
+        for neighbor, distance in zip(neighbors, distances):
+            neighbor['distance'] = round(float(distance), 4)
+        return jsonify({
+            'success': True,
+            'neighbors': neighbors,
+            'k': k,
+            'method': 'exact' if data.get('exact') else index.method,
+            'indexed_players': len(index),
+            'took_ms': round(took_ms, 3)
+        })
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    except Exception as e:
+        logger.error(f"Similarity search failed: {e}", exc_info=True)
+        return jsonify({'error': f'Similarity search failed: {str(e)}', 'success': False}), 500
+
+@prediction_bp.route('/whatif', methods=['POST'])
+@jwt_required()
+def what_if():
+    try:
+        data = request.get_json()
+        
+        if not data or 'player_data' not in data:
+            return jsonify({'error': 'Player data required', 'success': False}), 400
+        
+        # sweep: true (pas par défaut) ou {"steps": [...], "attributes": [...]}
+        sweep = data.get('sweep')
+        if sweep is True:
+            sweep = {}
+        steps, attributes = None, None
+        if isinstance(sweep, dict):
+            steps = sweep.get('steps') or [-10, -5, 5, 10]
+            attributes = sweep.get('attributes')
+        
+        scenarios = data.get('scenarios') or []
+        if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+            return jsonify({'error': 'scenarios must be a list of {attribute: delta} objects', 'success': False}), 400
+        if not scenarios and not steps:
+            return jsonify({'error': 'Provide scenarios or sweep', 'success': False}), 400
+        
+        try:
+            result = prediction_service.what_if(data['player_data'], scenarios, steps, attributes)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+        
+        with stage_timer('serialize'):
+            return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"What-if analysis failed: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'What-if analysis failed: {str(e)}'
+        }), 500
+
 @prediction_bp.route('/recommendations', methods=['POST'])
 @jwt_required()
 def get_recommendations():
@@ -123,21 +459,108 @@ def get_recommendations():
             'error': f'Failed to get recommendations: {str(e)}'
         }), 500
 
+@prediction_bp.route('/recommendations/batch', methods=['POST'])
+@jwt_required()
+def get_batch_recommendations():
+    try:
+        data = request.get_json()
+        
+        # Résultats de /batch tels quels : chaque ligne porte déjà les attributs
+        players = (data or {}).get('players')
+        if not isinstance(players, list) or not all(isinstance(p, dict) for p in players):
+            return jsonify({'error': 'players must be a list of player objects', 'success': False}), 400
+        
+        top_k = data.get('top_k', 3)
+        if not isinstance(top_k, int) or top_k < 1:
+            return jsonify({'error': 'top_k must be a positive integer', 'success': False}), 400
+        
+        result = recommendation_service.get_recommendations_batch(
+            players, top_k=top_k, include_advice=data.get('include_advice', True) is not False
+        )
+        
+        with stage_timer('serialize'):
+            return jsonify({
+                'success': True,
+                'total_players': len(players),
+                **result
+            })
+        
+    except Exception as e:
+        logger.error(f"Failed to get batch recommendations: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'Failed to get batch recommendations: {str(e)}'
+        }), 500
+
+@prediction_bp.route('/models', methods=['GET'])
+@jwt_required()
+def list_models():
+    """Active model version and versions available in the registry"""
+    return jsonify({'success': True, **prediction_service.models_info()})
+
+def is_model_admin():
+    """X-Admin-Token matches MODEL_ADMIN_TOKEN (never true when it is not set)"""
+    token = os.getenv('MODEL_ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(provided.encode(), token.encode())
+
+@prediction_bp.route('/models/activate', methods=['POST'])
+@jwt_required()
+def activate_model():
+    """Load a registry version in the background and swap it in once checked"""
+    # Bascule du modèle pour tous les utilisateurs : réservée aux administrateurs
+    if not is_model_admin():
+        return jsonify({'success': False, 'error': 'Model activation requires an admin token'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        status = prediction_service.load_version(data.get('version'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    
+    return jsonify({'success': True, 'status': status}), 202
+
 @prediction_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
         models_loaded = all([
             prediction_service.model is not None,
-            prediction_service.transformer is not None,
+            prediction_service.transformer is not None or prediction_service.feature_encoder is not None,
             prediction_service.target_pipeline is not None
         ])
         
-        return jsonify({
+        health = {
             'status': 'healthy' if models_loaded else 'degraded',
             'models_loaded': models_loaded,
             'service': 'prediction-api'
-        })
+        }
+        
+        if prediction_service.batcher is not None:
+            health['batching'] = prediction_service.batcher.stats()
+        
+        if prediction_service.prediction_cache is not None:
+            health['prediction_cache'] = prediction_service.prediction_cache.stats()
+        
+        health['model'] = {
+            'active': prediction_service.bundle.describe(),
+            'status': prediction_service.model_status
+        }
+        
+        health['advice_cache'] = recommendation_service.advice_cache.stats()
+        
+        if prediction_recorder is not None:
+            health['prediction_history'] = prediction_recorder.stats()
+        
+        health['result_store'] = result_store.stats()
+        
+        if similarity_indexes is not None:
+            health['similarity_index'] = similarity_indexes.stats()
+        
+        return jsonify(health)
         
     except Exception as e:
         logger.error(f"Health check failed: {e}", exc_info=True)
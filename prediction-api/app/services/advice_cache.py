@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AdviceCache:
+    """Training advice per attribute, with a TTL and an optional SQLite store.
+
+    The store file survives restarts and can be shared by several workers;
+    expired rows are ignored and overwritten on the next fetch.
+    """
+
+    def __init__(self, ttl_seconds: float = 7 * 24 * 3600, db_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'disk_hits': 0}
+
+        if self.db_path:
+            try:
+                self.init_db()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Advice cache store unavailable ({self.db_path}), memory only: {e}")
+                self.db_path = None
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS advice ('
+                ' attribute TEXT PRIMARY KEY, advice TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def get_many(self, attributes: Iterable[str]) -> Dict[str, str]:
+        """Fresh cached advice for the given attributes"""
+        attributes = list(attributes)
+        now = time.time()
+        found = {}
+        missing = []
+        with self._lock:
+            for attribute in attributes:
+                entry = self._entries.get(attribute)
+                if entry is not None and entry[1] > now:
+                    found[attribute] = entry[0]
+                else:
+                    missing.append(attribute)
+
+        if missing and self.db_path:
+            disk = self._read_disk(missing, now)
+            if disk:
+                with self._lock:
+                    self._entries.update(disk)
+                    self._counters['disk_hits'] += len(disk)
+                found.update({attribute: entry[0] for attribute, entry in disk.items()})
+
+        with self._lock:
+            self._counters['hits'] += len(found)
+            self._counters['misses'] += len(attributes) - len(found)
+        return found
+
+    def put(self, attribute: str, advice: str):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._entries[attribute] = (advice, expires_at)
+
+        if self.db_path:
+            try:
+                with closing(self.connect()) as conn, conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO advice (attribute, advice, expires_at) VALUES (?, ?, ?)',
+                        (attribute, advice, expires_at)
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist advice for {attribute}: {e}")
+
+    def _read_disk(self, attributes, now):
+        try:
+            placeholders = ','.join('?' * len(attributes))
+            with closing(self.connect()) as conn:
+                rows = conn.execute(
+                    f'SELECT attribute, advice, expires_at FROM advice'
+                    f' WHERE expires_at > ? AND attribute IN ({placeholders})',
+                    (now, *attributes)
+                ).fetchall()
+            return {attribute: (advice, expires_at) for attribute, advice, expires_at in rows}
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read advice cache: {e}")
+            return {}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        stats['persistent'] = bool(self.db_path)
+        return stats
@@ -0,0 +1,218 @@
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Formats colonnaires indisponibles, le CSV reste servi
+    pa = None
+
+# Extension du fichier envoyé -> format d'entrée
+INPUT_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.ipc': 'arrow',
+    '.feather': 'feather'
+}
+COLUMNAR_FORMATS = ('parquet', 'arrow', 'feather')
+OUTPUT_MIMETYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+    'feather': 'application/vnd.apache.arrow.file'
+}
+OUTPUT_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow', 'feather': '.feather'}
+CSV_ENGINES = ('auto', 'pyarrow', 'c')
+# Valeurs manquantes reconnues par pandas.read_csv, pour que les deux moteurs lisent pareil
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+# Format qui ne correspond à aucune valeur : désactive la détection des dates de pyarrow
+NO_TIMESTAMP_PARSER = '%H:%M:%S %z %Z'
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Input format from the file extension (None when unsupported)"""
+    if not isinstance(filename, str):
+        return None
+    return INPUT_FORMATS.get(os.path.splitext(filename or '')[1].lower())
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+def require_pyarrow(file_format: str):
+    if file_format in COLUMNAR_FORMATS and pa is None:
+        raise ValueError(f"Le format {file_format} nécessite pyarrow (non installé)")
+
+
+def csv_engine() -> str:
+    """Parser for whole-file CSV reads (CSV_ENGINE: auto, pyarrow or c)"""
+    engine = os.getenv('CSV_ENGINE', 'auto').lower()
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"CSV_ENGINE invalide: {engine}")
+    if engine == 'auto':
+        return 'pyarrow' if pa is not None else 'c'
+    if engine == 'pyarrow' and pa is None:
+        logger.warning("CSV_ENGINE=pyarrow sans pyarrow installé, moteur C utilisé")
+        return 'c'
+    return engine
+
+
+def csv_dtypes(categorical_columns: List[str]) -> Dict[str, str]:
+    """Explicit dtypes of the categorical model columns (numeric columns keep inference)"""
+    return {col: 'category' for col in categorical_columns}
+
+
+def _arrow_csv(source, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """pyarrow CSV parse: categorical model columns as dictionaries, the rest inferred.
+
+    Numeric columns are not forced to float64: integer-valued columns stay
+    int64, as with pandas' C parser, so echoed attributes keep their JSON
+    form (71, not 71.0) and buffered, streamed and job outputs agree.
+    """
+    column_types = {col: pa.dictionary(pa.int32(), pa.string()) for col in dtypes}
+    convert_options = pa_csv.ConvertOptions(
+        column_types=column_types,
+        null_values=CSV_NA_VALUES,
+        strings_can_be_null=True,
+        timestamp_parsers=[NO_TIMESTAMP_PARSER]
+    )
+    table = pa_csv.read_csv(source, convert_options=convert_options)
+    # Libère les buffers Arrow au fil de la conversion : pic mémoire proche du DataFrame seul
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def whole_file_dtypes(source, chunk_rows: int, model_columns: Sequence[str] = ()) -> Dict[str, str]:
+    """dtypes pinning the non-model columns of a chunked read to a whole-file read.
+
+    Each chunk infers its own types: a column holding '1', 'x', '2' would
+    come out as text in one chunk and int64 in the next. A first pass over
+    the other columns (model columns are converted by prepare_batch_frame)
+    records the types seen, then pins the ones a whole-file read would
+    widen: float64 for integers mixed with decimals or missing values, str
+    for text mixed with numbers.
+    """
+    model_columns = set(model_columns)
+    seen, missing = {}, set()
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, usecols=lambda col: col not in model_columns):
+        for col in chunk.columns:
+            values = chunk[col]
+            if values.dtype == 'float64' and values.isna().all():
+                # Chunk sans aucune valeur : ne dit rien du type
+                missing.add(col)
+                continue
+            seen.setdefault(col, set()).add(values.dtype.name)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    dtypes = {}
+    for col, kinds in seen.items():
+        if kinds == {'int64'}:
+            if col in missing:
+                dtypes[col] = 'float64'
+        elif kinds <= {'int64', 'float64'}:
+            dtypes[col] = 'float64'
+        elif len(kinds) > 1:
+            dtypes[col] = 'str'
+    return dtypes
+
+
+def read_csv(source, dtypes: Dict[str, str], chunk_rows: Optional[int] = None, model_columns: Sequence[str] = ()):
+    """Parse a CSV path or upload stream; chunk_rows returns a chunk iterator.
+
+    ``dtypes`` maps the categorical model columns to category (csv_dtypes).
+    The pyarrow engine parses them straight to category and infers the
+    others with the same result types as pandas (int64, float64, text).
+    Pandas' C parser is slower as soon as dtypes are given, so it keeps
+    inference; chunked reads always use it, with the columns outside
+    ``model_columns`` pinned by whole_file_dtypes so every chunk has the
+    types of a whole-file read. In both cases prepare_batch_frame converts
+    what is not already float64, and a numeric column holding text
+    (e.g. "abc") is coerced as before.
+    """
+    if chunk_rows:
+        pinned = whole_file_dtypes(source, chunk_rows, model_columns)
+        return pd.read_csv(source, chunksize=chunk_rows, dtype=pinned)
+    if csv_engine() == 'c':
+        return pd.read_csv(source)
+    return _arrow_csv(source, dtypes)
+
+
+def _open_ipc(path: str):
+    """Arrow IPC file (Feather v2) memory-mapped, or an IPC stream"""
+    source = pa.memory_map(path, 'r')
+    try:
+        return ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return ipc.open_stream(source).read_all()
+
+
+def schema_names(path: str, file_format: str) -> List[str]:
+    require_pyarrow(file_format)
+    if file_format == 'parquet':
+        return pq.ParquetFile(path).schema_arrow.names
+    return _open_ipc(path).schema.names
+
+
+def projected_columns(path: str, file_format: str, wanted: List[str]) -> List[str]:
+    """Columns of the file to read: ``wanted`` ones present, in file order"""
+    wanted = set(wanted)
+    return [name for name in schema_names(path, file_format) if name in wanted]
+
+
+def read_frame(path: str, file_format: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a columnar file, only the given columns; numeric columns keep their dtype"""
+    require_pyarrow(file_format)
+    if file_format == 'parquet':
+        # Projection poussée au lecteur : les autres colonnes ne sont pas décodées
+        table = pq.read_table(path, columns=columns)
+    elif file_format == 'feather':
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = _open_ipc(path)
+        if columns is not None:
+            table = table.select(columns)
+    return table.to_pandas()
+
+
+def iter_frames(path: str, file_format: str, chunk_rows: int,
+                columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Read a columnar file chunk by chunk (Parquet by record batches)"""
+    require_pyarrow(file_format)
+    if file_format == 'parquet':
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    # Fichier IPC mappé : découper la table ne copie rien
+    table = _open_ipc(path)
+    if columns is not None:
+        table = table.select(columns)
+    for start in range(0, table.num_rows, chunk_rows):
+        yield table.slice(start, chunk_rows).to_pandas()
+
+
+def write_frame(frame: pd.DataFrame, file_format: str) -> bytes:
+    """Encode a result frame as Parquet, Arrow IPC file or Feather"""
+    require_pyarrow(file_format)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if file_format == 'parquet':
+        pq.write_table(table, sink)
+    elif file_format == 'feather':
+        feather.write_feather(table, sink)
+    else:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
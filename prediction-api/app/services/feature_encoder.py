@@ -0,0 +1,229 @@
+import numpy as np
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _NumericBlock:
+    """Imputer + scaler branch of the ColumnTransformer"""
+
+    def __init__(self, indices: np.ndarray, output: slice,
+                 fill: Optional[np.ndarray], mean: Optional[np.ndarray], scale: Optional[np.ndarray]):
+        self.indices = indices
+        self.output = output
+        self.fill = fill
+        self.mean = mean
+        self.scale = scale
+
+    def transform(self, numeric: np.ndarray, out: np.ndarray):
+        values = numeric[:, self.indices].astype(np.float64)
+
+        if self.fill is not None:
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = np.broadcast_to(self.fill, values.shape)[missing]
+
+        # Même ordre d'opérations que StandardScaler (X -= mean ; X /= scale)
+        if self.mean is not None:
+            values -= self.mean
+        if self.scale is not None:
+            values /= self.scale
+
+        out[:, self.output] = values
+
+
+class _OneHotBlock:
+    """Imputer + one-hot encoder branch of the ColumnTransformer"""
+
+    def __init__(self, indices: np.ndarray, output: slice, fill: Optional[np.ndarray],
+                 categories: List[np.ndarray], handle_unknown: str):
+        self.indices = indices
+        self.output = output
+        self.fill = fill
+        self.handle_unknown = handle_unknown
+        self.categories = []
+        self.sorters = []
+        self.offsets = []
+
+        offset = output.start
+        for cats in categories:
+            cats = np.asarray(cats).astype(str)
+            self.categories.append(cats)
+            self.sorters.append(np.argsort(cats, kind='stable'))
+            self.offsets.append(offset)
+            offset += len(cats)
+
+    def transform(self, categorical: np.ndarray, out: np.ndarray):
+        n_rows = categorical.shape[0]
+        rows = np.arange(n_rows)
+        out[:, self.output] = 0.0
+
+        for j, column in enumerate(self.indices):
+            values = categorical[:, column]
+
+            if self.fill is not None:
+                # Même masque que SimpleImputer(missing_values=np.nan) : NaN != NaN
+                missing = values != values
+                if missing.any():
+                    values = values.copy()
+                    values[missing] = self.fill[j]
+
+            values = values.astype(str)
+            cats = self.categories[j]
+            sorter = self.sorters[j]
+            positions = np.searchsorted(cats, values, sorter=sorter)
+            positions = sorter[np.clip(positions, 0, len(cats) - 1)]
+            matched = cats[positions] == values
+
+            if self.handle_unknown == 'error' and not matched.all():
+                unknown = sorted(set(values[~matched].tolist()))
+                raise ValueError(f"Found unknown categories {unknown} during transform")
+
+            out[rows[matched], self.offsets[j] + positions[matched]] = 1.0
+
+
+class FeatureEncoder:
+    """Standalone NumPy version of the fitted feature ColumnTransformer.
+
+    The fitted parameters (imputer fill values, scaler mean/scale and one-hot
+    category lists) are pulled out of the sklearn pipeline once; ``transform``
+    then maps a raw (numeric, categorical) matrix pair straight to the model
+    feature matrix, without pandas or sklearn validation overhead.
+    """
+
+    def __init__(self, numeric_blocks: List[_NumericBlock], onehot_blocks: List[_OneHotBlock],
+                 n_features: int):
+        self.numeric_blocks = numeric_blocks
+        self.onehot_blocks = onehot_blocks
+        self.n_features = n_features
+
+    @classmethod
+    def from_transformer(cls, transformer, numerical_columns: List[str],
+                         categorical_columns: List[str]) -> 'FeatureEncoder':
+        """Extract fitted parameters from a ColumnTransformer"""
+        if not hasattr(transformer, 'transformers_'):
+            raise ValueError("Le transformer n'est pas un ColumnTransformer ajusté")
+        if getattr(transformer, 'sparse_output_', False):
+            raise ValueError("Sortie creuse non supportée")
+
+        numeric_index = {col: i for i, col in enumerate(numerical_columns)}
+        categorical_index = {col: i for i, col in enumerate(categorical_columns)}
+        output_indices = transformer.output_indices_
+        numeric_blocks = []
+        onehot_blocks = []
+        n_features = 0
+
+        for name, fitted, columns in transformer.transformers_:
+            output = output_indices[name]
+            n_features = max(n_features, output.stop)
+            if fitted == 'drop' or output.stop == output.start:
+                continue
+            if isinstance(columns, str):
+                columns = [columns]
+            columns = list(columns)
+
+            steps = cls._steps(fitted)
+            encoder = steps[-1] if steps and type(steps[-1]).__name__ == 'OneHotEncoder' else None
+
+            if encoder is None:
+                if not all(col in numeric_index for col in columns):
+                    raise ValueError(f"Colonnes non numériques dans la branche {name}")
+                numeric_blocks.append(cls._numeric_block(
+                    steps, np.array([numeric_index[col] for col in columns]), output
+                ))
+            else:
+                if not all(col in categorical_index for col in columns):
+                    raise ValueError(f"Colonnes non catégorielles dans la branche {name}")
+                onehot_blocks.append(cls._onehot_block(
+                    steps, np.array([categorical_index[col] for col in columns]), output
+                ))
+
+        return cls(numeric_blocks, onehot_blocks, n_features)
+
+    @staticmethod
+    def _steps(fitted) -> List:
+        if fitted == 'passthrough':
+            return []
+        if hasattr(fitted, 'steps'):
+            return [step for _, step in fitted.steps if step not in (None, 'passthrough')]
+        return [fitted]
+
+    @staticmethod
+    def _check_imputer(imputer):
+        missing = imputer.missing_values
+        if not (isinstance(missing, float) and np.isnan(missing)):
+            raise ValueError(f"missing_values={missing!r} non supporté")
+        if imputer.add_indicator:
+            raise ValueError("SimpleImputer(add_indicator=True) non supporté")
+
+    @classmethod
+    def _numeric_block(cls, steps: List, indices: np.ndarray, output: slice) -> _NumericBlock:
+        fill = mean = scale = None
+        for step in steps:
+            kind = type(step).__name__
+            if kind == 'SimpleImputer' and fill is None and mean is None and scale is None:
+                cls._check_imputer(step)
+                fill = np.asarray(step.statistics_, dtype=np.float64)
+                if np.isnan(fill).any():
+                    raise ValueError("Colonne entièrement vide à l'entraînement non supportée")
+            elif kind == 'StandardScaler' and mean is None and scale is None:
+                if step.with_mean:
+                    mean = np.asarray(step.mean_, dtype=np.float64)
+                if step.with_std:
+                    scale = np.asarray(step.scale_, dtype=np.float64)
+            else:
+                raise ValueError(f"Étape numérique non supportée: {kind}")
+
+        if len(indices) != output.stop - output.start:
+            raise ValueError("Nombre de colonnes de sortie inattendu (branche numérique)")
+        return _NumericBlock(indices, output, fill, mean, scale)
+
+    @classmethod
+    def _onehot_block(cls, steps: List, indices: np.ndarray, output: slice) -> _OneHotBlock:
+        *preprocessing, encoder = steps
+        fill = None
+        for step in preprocessing:
+            if type(step).__name__ != 'SimpleImputer' or fill is not None:
+                raise ValueError(f"Étape catégorielle non supportée: {type(step).__name__}")
+            cls._check_imputer(step)
+            fill = np.asarray(step.statistics_, dtype=object)
+
+        if encoder.handle_unknown not in ('ignore', 'error'):
+            raise ValueError(f"handle_unknown={encoder.handle_unknown!r} non supporté")
+        if getattr(encoder, 'drop_idx_', None) is not None:
+            raise ValueError("OneHotEncoder(drop=...) non supporté")
+        if getattr(encoder, '_infrequent_enabled', False):
+            raise ValueError("Catégories peu fréquentes non supportées")
+        if sum(len(cats) for cats in encoder.categories_) != output.stop - output.start:
+            raise ValueError("Nombre de colonnes de sortie inattendu (branche catégorielle)")
+
+        return _OneHotBlock(indices, output, fill, encoder.categories_, encoder.handle_unknown)
+
+    def transform(self, numeric: np.ndarray, categorical: np.ndarray) -> np.ndarray:
+        """Map raw (numeric, categorical) rows to the model feature matrix"""
+        numeric = np.atleast_2d(numeric)
+        categorical = np.atleast_2d(categorical)
+        out = np.empty((numeric.shape[0], self.n_features), dtype=np.float64)
+
+        for block in self.numeric_blocks:
+            block.transform(numeric, out)
+        for block in self.onehot_blocks:
+            block.transform(categorical, out)
+
+        return out
+
+    def parity_report(self, transformer, frame, numeric: np.ndarray, categorical: np.ndarray) -> Dict:
+        """Compare this encoder with transformer.transform on the same rows"""
+        expected = np.asarray(transformer.transform(frame), dtype=np.float64)
+        actual = self.transform(numeric, categorical)
+
+        if expected.shape != actual.shape:
+            return {'rows': len(frame), 'max_abs_error': None, 'ok': False}
+
+        max_abs_error = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+        return {
+            'rows': len(frame),
+            'max_abs_error': max_abs_error,
+            'ok': bool(np.allclose(expected, actual, rtol=0.0, atol=1e-9))
+        }
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+# Attributs saisis sur une échelle 1-10 dans le formulaire (convertis en 1-100)
+SCALED_COLUMNS = ('acceleration', 'sprint_speed', 'agility')
+DEFAULT_NUMERIC_VALUE = 50.0
+
+
+def default_categorical_value(column: str) -> str:
+    """Default value used when a categorical column is missing"""
+    if column == 'preferred_foot':
+        return 'right'
+    if 'work_rate' in column:
+        return 'medium'
+    return 'unknown'
+
+
+class InputSchema:
+    """Compiled mapping from a JSON payload to one model input row.
+
+    Built once from the expected/categorical columns, it fills preallocated
+    NumPy rows instead of going through a one-row DataFrame per request.
+    Numeric values live in a float64 row (``numerical_columns`` order) and
+    categorical values in an object row (``categorical_columns`` order).
+    """
+
+    def __init__(self, expected_columns: List[str], categorical_columns: List[str]):
+        categorical = set(categorical_columns)
+        self.expected_columns = list(expected_columns)
+        self.categorical_columns = [col for col in self.expected_columns if col in categorical]
+        self.numerical_columns = [col for col in self.expected_columns if col not in categorical]
+
+        self._numeric_index = {col: i for i, col in enumerate(self.numerical_columns)}
+        self._categorical_index = {col: i for i, col in enumerate(self.categorical_columns)}
+        self._scaled = frozenset(SCALED_COLUMNS)
+
+        self._numeric_defaults = np.full(len(self.numerical_columns), DEFAULT_NUMERIC_VALUE)
+        self._categorical_defaults = np.array(
+            [default_categorical_value(col) for col in self.categorical_columns], dtype=object
+        )
+
+    def encode(self, data: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Turn a JSON payload into (numeric row, categorical row)"""
+        numeric = self._numeric_defaults.copy()
+        categorical = self._categorical_defaults.copy()
+
+        for key, value in data.items():
+            index = self._numeric_index.get(key)
+            if index is not None:
+                try:
+                    val = float(value)
+                except (ValueError, TypeError):
+                    continue
+                if key in self._scaled and 1 <= val <= 10:
+                    val = val * 10
+                # NaN -> valeur par défaut, comme le fillna du chemin pandas
+                if val == val:
+                    numeric[index] = val
+                continue
+
+            index = self._categorical_index.get(key)
+            if index is not None:
+                if not isinstance(value, str):
+                    value = str(value)
+                categorical[index] = value.lower().strip()
+
+        return numeric, categorical
+
+    def to_frame(self, numeric: np.ndarray, categorical: np.ndarray) -> pd.DataFrame:
+        """Build the DataFrame expected by the sklearn transformer"""
+        numeric = np.atleast_2d(numeric)
+        categorical = np.atleast_2d(categorical)
+
+        columns = {}
+        for col in self.expected_columns:
+            index = self._numeric_index.get(col)
+            if index is not None:
+                columns[col] = numeric[:, index]
+            else:
+                columns[col] = categorical[:, self._categorical_index[col]]
+
+        return pd.DataFrame(columns)
@@ -0,0 +1,316 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
+from typing import Callable, Dict, List, Optional
+import logging
+
+import numpy as np
+
+from app.services.prediction_service import prediction_service
+from app.services.prediction_recorder import prediction_recorder
+from app.services.similarity_index import similarity_indexes
+
+logger = logging.getLogger(__name__)
+
+# queued -> running (-> cancelling) -> completed | failed | cancelled
+FINAL_STATUSES = ('completed', 'failed', 'cancelled')
+ACTIVE_STATUSES = ('queued', 'running', 'cancelling')
+
+JOB_COLUMNS = (
+    'id', 'user_id', 'filename', 'status', 'rows_total', 'rows_done', 'error',
+    'created_at', 'started_at', 'updated_at', 'finished_at'
+)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobService:
+    """Background batch prediction jobs, tracked in a local SQLite table.
+
+    Uploads and NDJSON results are kept on disk under ``jobs_dir``, with the
+    byte offset of every result line so result pages seek straight to their
+    first line. The job table is shared by every worker process using the
+    same directory, so status polling, cancellation and downloads work from
+    any of them. A job not updated for ``stale_seconds`` (its process died,
+    queued or running) is failed and its upload deleted.
+    """
+
+    def __init__(self, jobs_dir: Optional[str] = None, max_workers: Optional[int] = None,
+                 chunk_rows: Optional[int] = None):
+        self.jobs_dir = jobs_dir or os.getenv(
+            'BATCH_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'prediction-jobs')
+        )
+        self.max_workers = max_workers or int(os.getenv('BATCH_JOB_WORKERS', '2'))
+        self.chunk_rows = chunk_rows or int(os.getenv('BATCH_JOB_CHUNK_ROWS', '5000'))
+        self.retention_seconds = float(os.getenv('BATCH_JOB_RETENTION_HOURS', '24')) * 3600
+        self.stale_seconds = float(os.getenv('BATCH_JOB_STALE_SECONDS', '600'))
+        self.db_path = os.path.join(self.jobs_dir, 'jobs.sqlite')
+
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.init_db()
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch-job')
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_db(self):
+        """Create the job table (idempotent)"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY, user_id TEXT, filename TEXT, status TEXT NOT NULL,'
+                ' rows_total INTEGER, rows_done INTEGER NOT NULL DEFAULT 0, error TEXT,'
+                ' created_at REAL NOT NULL, started_at REAL, updated_at REAL, finished_at REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_user ON jobs (user_id, created_at)')
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def input_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), 'input.csv')
+
+    def results_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), 'results.ndjson')
+
+    def offsets_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), 'results.offsets')
+
+    def discard_input(self, job_id: str):
+        if os.path.exists(self.input_path(job_id)):
+            os.unlink(self.input_path(job_id))
+
+    def update(self, job_id: str, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{key} = ?' for key in fields)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def submit(self, upload_path: str, filename: str, user_id: Optional[str] = None,
+               dumps: Optional[Callable] = None) -> Dict:
+        """Register an uploaded CSV as a new job and queue it.
+
+        ``dumps`` serializes each result line; the routes pass the app's JSON
+        provider so job records read exactly like /batch records.
+        """
+        self.purge_expired()
+
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        input_path = self.input_path(job_id)
+        shutil.move(upload_path, input_path)
+
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                'INSERT INTO jobs (id, user_id, filename, status, rows_total, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, user_id, filename, 'queued', count_csv_rows(input_path), time.time(), time.time())
+            )
+
+        future = self._executor.submit(self.run, job_id, dumps)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+        logger.info(f"Batch job {job_id} queued for {filename}")
+        return self.get(job_id)
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Job status and progress, or None if unknown (or owned by someone else)"""
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                f'SELECT {", ".join(JOB_COLUMNS)} FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+
+        if row is None or (user_id is not None and row['user_id'] != user_id):
+            return None
+        return self._job_view(dict(row))
+
+    def _is_stale(self, job: Dict) -> bool:
+        with self._lock:
+            if job['id'] in self._futures:
+                return False
+        return job['status'] in ACTIVE_STATUSES and job['updated_at'] < time.time() - self.stale_seconds
+
+    def _job_view(self, job: Dict) -> Dict:
+        """Add progress, and fail a job whose worker stopped reporting"""
+        if self._is_stale(job):
+            # Le worker qui devait exécuter le job a disparu (redémarrage, crash)
+            now = time.time()
+            self.update(job['id'], status='failed', error='Job interrompu', finished_at=now)
+            self.discard_input(job['id'])
+            job.update(status='failed', error='Job interrompu', finished_at=now, updated_at=now)
+
+        total = job['rows_total']
+        job['progress'] = round(job['rows_done'] / total, 4) if total else None
+        return job
+
+    def list_jobs(self, user_id: Optional[str], limit: int = 50) -> List[Dict]:
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                f'SELECT {", ".join(JOB_COLUMNS)} FROM jobs WHERE user_id IS ? ORDER BY created_at DESC LIMIT ?',
+                (user_id, limit)
+            ).fetchall()
+        return [self._job_view(dict(row)) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued job, or ask a running one to stop at the next chunk"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self.update(job_id, status='cancelled', finished_at=time.time())
+            self.discard_input(job_id)
+            return self.get(job_id)
+
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE status WHEN 'queued' THEN 'cancelled' ELSE 'cancelling' END"
+                " WHERE id = ? AND status IN ('queued', 'running')",
+                (job_id,)
+            )
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return job is None or job['status'] in ('cancelling', 'cancelled')
+
+    def run(self, job_id: str, dumps: Optional[Callable] = None):
+        """Worker body: score the input chunk by chunk into an NDJSON file"""
+        dumps = dumps or json.dumps
+        job = self.get(job_id)
+        if job is None or job['status'] != 'queued':
+            # Annulé avant d'avoir démarré
+            self.discard_input(job_id)
+            return
+
+        self.update(job_id, status='running', started_at=time.time())
+        self.touch_queued(job_id)
+        input_path = self.input_path(job_id)
+        partial_path = self.results_path(job_id) + '.part'
+        partial_offsets = self.offsets_path(job_id) + '.part'
+        rows_done = 0
+        position = 0
+        index = similarity_indexes.for_user(job['user_id']) if similarity_indexes is not None else None
+
+        try:
+            with open(partial_path, 'wb') as out, open(partial_offsets, 'wb') as offsets:
+                for results in prediction_service.iter_batch_predictions(input_path, self.chunk_rows, source='job',
+                                                                         index=index):
+                    if self.is_cancel_requested(job_id):
+                        raise JobCancelled()
+                    lines = [(dumps(result) + '\n').encode('utf-8') for result in results]
+                    lengths = np.fromiter(map(len, lines), dtype='<i8', count=len(lines))
+                    # Position de début de chaque ligne : pages lues sans reparcourir le fichier
+                    offsets.write((position + np.cumsum(lengths) - lengths).tobytes())
+                    out.write(b''.join(lines))
+                    position += int(lengths.sum())
+                    if prediction_recorder is not None:
+                        prediction_recorder.record_batch(job['user_id'], results)
+                    rows_done += len(results)
+                    self.update(job_id, rows_done=rows_done)
+                    self.touch_queued(job_id)
+
+            os.replace(partial_offsets, self.offsets_path(job_id))
+            os.replace(partial_path, self.results_path(job_id))
+            self.update(job_id, status='completed', rows_total=rows_done, finished_at=time.time())
+            logger.info(f"Batch job {job_id} completed ({rows_done} rows)")
+
+        except JobCancelled:
+            self.update(job_id, status='cancelled', finished_at=time.time())
+            logger.info(f"Batch job {job_id} cancelled after {rows_done} rows")
+        except Exception as e:
+            logger.error(f"Batch job {job_id} failed: {e}", exc_info=True)
+            self.update(job_id, status='failed', error=str(e), finished_at=time.time())
+        finally:
+            for path in (partial_path, partial_offsets):
+                if os.path.exists(path):
+                    os.unlink(path)
+            self.discard_input(job_id)
+
+    def touch_queued(self, running_id: str):
+        """Heartbeat of the jobs queued behind this process' running ones"""
+        with self._lock:
+            queued = [job_id for job_id in self._futures if job_id != running_id]
+        if not queued:
+            return
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status = 'queued' AND id IN ({', '.join('?' * len(queued))})",
+                (time.time(), *queued)
+            )
+
+    def read_results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict]:
+        """One page of results of a completed job, read from its first line's offset"""
+        with open(self.results_path(job_id), 'rb') as f:
+            if not os.path.exists(self.offsets_path(job_id)):
+                # Job terminé avant l'index des offsets : parcours linéaire
+                return [json.loads(line) for line in islice(f, offset, offset + limit)]
+            with open(self.offsets_path(job_id), 'rb') as offsets:
+                offsets.seek(8 * offset)
+                start = offsets.read(8)
+            if len(start) < 8:
+                return []
+            f.seek(int.from_bytes(start, 'little'))
+            return [json.loads(line) for line in islice(f, limit)]
+
+    def expire_stale(self):
+        """Fail the jobs of other processes that stopped reporting, and drop their uploads"""
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                f'SELECT {", ".join(JOB_COLUMNS)} FROM jobs WHERE status IN {ACTIVE_STATUSES} AND updated_at < ?',
+                (time.time() - self.stale_seconds,)
+            ).fetchall()
+        for row in rows:
+            self._job_view(dict(row))
+
+    def purge_expired(self):
+        """Fail stale jobs, then drop finished jobs older than the retention period"""
+        self.expire_stale()
+        cutoff = time.time() - self.retention_seconds
+        with closing(self.connect()) as conn, conn:
+            rows = conn.execute(
+                f'SELECT id FROM jobs WHERE finished_at < ? AND status IN {FINAL_STATUSES}', (cutoff,)
+            ).fetchall()
+            for row in rows:
+                shutil.rmtree(self.job_dir(row['id']), ignore_errors=True)
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(row['id'],) for row in rows])
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def count_csv_rows(path: str) -> Optional[int]:
+    """Number of data rows (line count minus header), used for progress only"""
+    try:
+        with open(path, 'rb') as f:
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                lines += 1
+        return max(lines - 1, 0)
+    except OSError:
+        return None
+
+
+# Global instance
+job_service = JobService()
@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class _PendingItem:
+    """One caller waiting for its share of a batch"""
+
+    __slots__ = ('payload', 'enqueued_at', 'done', 'result', 'error')
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesce concurrent single requests into one call of a batch handler.
+
+    The handler receives a list of payloads and must return a list of the
+    same length, in the same order. An entry may be an Exception instance,
+    in which case it is raised in the corresponding caller only.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0,
+                 name: str = 'micro-batcher'):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size doit être >= 1")
+
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_waits = Histogram(QUEUE_WAIT_BUCKETS)
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, payload: Any, timeout: Optional[float] = None) -> Any:
+        """Queue a payload and block until its result is available"""
+        if self._closed:
+            raise RuntimeError("Le micro-batcher est arrêté")
+
+        item = _PendingItem(payload)
+        self._queue.put(item)
+
+        if not item.done.wait(timeout):
+            raise TimeoutError("Délai dépassé en attente du lot de prédiction")
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def close(self):
+        """Stop the worker once the queued items have been processed"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
+
+    def stats(self) -> Dict:
+        """Batch-size and queue-wait histograms"""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batch_size': self.batch_sizes.snapshot(),
+            'queue_wait_seconds': self.queue_waits.snapshot()
+        }
+
+    def _collect(self, first: _PendingItem) -> List[_PendingItem]:
+        """Gather items until the batch is full or the wait budget is spent"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                # Remettre le signal d'arrêt pour la boucle principale
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = self._collect(first)
+            started = time.perf_counter()
+            for item in batch:
+                self.queue_waits.observe(started - item.enqueued_at)
+            self.batch_sizes.observe(len(batch))
+
+            try:
+                results = self.handler([item.payload for item in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"Le handler a renvoyé {len(results)} résultats pour {len(batch)} entrées"
+                    )
+            except Exception as e:
+                logger.error(f"Micro-batch handler failed: {e}", exc_info=True)
+                results = [e] * len(batch)
+
+            for item, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    item.error = result
+                else:
+                    item.result = result
+                item.done.set()
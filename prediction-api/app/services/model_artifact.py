@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional
+import logging
+
+import numpy as np
+
+from app.services.feature_encoder import FeatureEncoder, _NumericBlock, _OneHotBlock
+from app.services.svr_engine import SVREngine, DEFAULT_BLOCK_BYTES
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 'foot-perf-model'
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+class TargetScaler:
+    """Inverse of the fitted target pipeline (StandardScaler on one column)"""
+
+    def __init__(self, mean: float, scale: float):
+        self.mean = float(mean)
+        self.scale = float(scale)
+
+    @classmethod
+    def from_pipeline(cls, target_pipeline) -> 'TargetScaler':
+        steps = [step for _, step in target_pipeline.steps] if hasattr(target_pipeline, 'steps') else [target_pipeline]
+        mean, scale = 0.0, 1.0
+        for step in steps:
+            kind = type(step).__name__
+            if kind == 'SimpleImputer':
+                # L'imputation n'a aucun effet au retour, sauf si un indicateur ajoute des colonnes
+                indicator = getattr(step, 'indicator_', None)
+                if indicator is not None and len(indicator.features_) > 0:
+                    raise ValueError("Indicateur de valeurs manquantes non supporté pour la cible")
+            elif kind == 'StandardScaler':
+                if step.mean_.shape != (1,):
+                    raise ValueError("Une seule colonne cible supportée")
+                mean = float(step.mean_[0]) if step.with_mean else 0.0
+                scale = float(step.scale_[0]) if step.with_std else 1.0
+            else:
+                raise ValueError(f"Étape cible non supportée: {kind}")
+        return cls(mean, scale)
+
+    def inverse_transform(self, y: np.ndarray) -> np.ndarray:
+        # Même ordre d'opérations que StandardScaler.inverse_transform
+        y = np.array(y, dtype=np.float64)
+        y *= self.scale
+        y += self.mean
+        return y
+
+
+def export_bundle(bundle, output_dir: str) -> Dict:
+    """Write a loaded bundle as NumPy arrays plus a JSON manifest.
+
+    The directory is written next to its final location and renamed into
+    place, so readers never see a half-written artifact.
+    """
+    encoder = bundle.feature_encoder or FeatureEncoder.from_transformer(
+        bundle.transformer, bundle.input_schema.numerical_columns, bundle.input_schema.categorical_columns
+    )
+    engine = SVREngine.from_model(bundle.model)
+    target = TargetScaler.from_pipeline(bundle.target_pipeline)
+
+    parent = os.path.dirname(os.path.abspath(output_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.artifact-', dir=parent)
+    # Lisible par les workers lancés sous un autre utilisateur
+    os.chmod(staging, 0o755)
+    arrays = {}
+
+    def save(name: str, array: np.ndarray) -> str:
+        array = np.ascontiguousarray(array)
+        np.save(os.path.join(staging, f'{name}.npy'), array, allow_pickle=False)
+        arrays[name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+        return name
+
+    try:
+        numeric_blocks = []
+        for i, block in enumerate(encoder.numeric_blocks):
+            numeric_blocks.append({
+                'indices': save(f'numeric_{i}_indices', block.indices),
+                'output': [block.output.start, block.output.stop],
+                'fill': save(f'numeric_{i}_fill', block.fill) if block.fill is not None else None,
+                'mean': save(f'numeric_{i}_mean', block.mean) if block.mean is not None else None,
+                'scale': save(f'numeric_{i}_scale', block.scale) if block.scale is not None else None
+            })
+
+        onehot_blocks = []
+        for i, block in enumerate(encoder.onehot_blocks):
+            onehot_blocks.append({
+                'indices': save(f'onehot_{i}_indices', block.indices),
+                'output': [block.output.start, block.output.stop],
+                'fill': [str(value) for value in block.fill] if block.fill is not None else None,
+                'categories': [save(f'onehot_{i}_categories_{j}', cats) for j, cats in enumerate(block.categories)],
+                'handle_unknown': block.handle_unknown
+            })
+
+        # Lignes de contrôle et prédictions du chemin sklearn, pour le smoke test au chargement
+        numeric, categorical = bundle.parity_rows()
+        expected = np.round(target.inverse_transform(
+            bundle.model.predict(
+                bundle.transformer.transform(bundle.input_schema.to_frame(numeric, categorical))
+            ).reshape(-1, 1)
+        ), 2)[:, 0]
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'version': bundle.version,
+            'source_identity': bundle.identity,
+            'source_files': {kind: os.path.basename(path) for kind, path in bundle.paths.items()},
+            'created_at': time.time(),
+            'expected_columns': list(bundle.expected_columns),
+            'categorical_columns': list(bundle.categorical_columns),
+            'encoder': {
+                'n_features': encoder.n_features,
+                'numeric_blocks': numeric_blocks,
+                'onehot_blocks': onehot_blocks
+            },
+            'svr': {
+                'support_vectors': save('support_vectors', engine.support_vectors),
+                'dual_coef': save('dual_coef', engine.dual_coef),
+                'intercept': engine.intercept,
+                'kernel': engine.kernel,
+                'gamma': engine.gamma,
+                'coef0': engine.coef0,
+                'degree': engine.degree
+            },
+            'target': {'mean': target.mean, 'scale': target.scale},
+            'smoke_test': {
+                'numeric': save('smoke_numeric', numeric),
+                'categorical': save('smoke_categorical', categorical.astype(str)),
+                'expected': save('smoke_expected', expected)
+            },
+            'arrays': arrays
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.replace(staging, output_dir)
+
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Model bundle {bundle.version} exported to {output_dir}")
+    return manifest
+
+
+def read_manifest(artifact_dir: str) -> Dict:
+    with open(os.path.join(artifact_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != ARTIFACT_FORMAT or manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Format d'artefact non supporté: {manifest.get('format')} v{manifest.get('format_version')}")
+    return manifest
+
+
+def open_artifact(artifact_dir: str, version: Optional[str] = None, mmap: bool = True):
+    """Open an exported artifact as a ModelBundle, memory-mapping its arrays.
+
+    Every process mapping the same files shares their physical pages; no
+    pickle is read and no sklearn object is built.
+    """
+    from app.services.model_bundle import ModelBundle
+
+    started = time.perf_counter()
+    manifest = read_manifest(artifact_dir)
+    mmap_mode = 'r' if mmap else None
+
+    def load(name: Optional[str]) -> Optional[np.ndarray]:
+        if name is None:
+            return None
+        spec = manifest['arrays'][name]
+        array = np.load(os.path.join(artifact_dir, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ValueError(f"Tableau {name} incohérent avec le manifeste")
+        return array
+
+    spec = manifest['encoder']
+    encoder = FeatureEncoder(
+        [
+            _NumericBlock(load(block['indices']), slice(*block['output']),
+                          load(block['fill']), load(block['mean']), load(block['scale']))
+            for block in spec['numeric_blocks']
+        ],
+        [
+            _OneHotBlock(load(block['indices']), slice(*block['output']),
+                         np.array(block['fill'], dtype=object) if block['fill'] is not None else None,
+                         [load(name) for name in block['categories']], block['handle_unknown'])
+            for block in spec['onehot_blocks']
+        ],
+        spec['n_features']
+    )
+
+    # En float64, les vecteurs de support restent mappés (aucune copie privée)
+    svr = manifest['svr']
+    engine = SVREngine(
+        load(svr['support_vectors']), load(svr['dual_coef']), svr['intercept'],
+        kernel=svr['kernel'], gamma=svr['gamma'], coef0=svr['coef0'], degree=svr['degree'],
+        dtype=np.dtype(os.getenv('SVR_ENGINE_DTYPE', 'float64')),
+        max_block_bytes=int(os.getenv('SVR_ENGINE_BLOCK_BYTES', str(DEFAULT_BLOCK_BYTES)))
+    )
+
+    bundle = ModelBundle(
+        engine, None, TargetScaler(**manifest['target']), {'artifact': artifact_dir},
+        version=version or manifest['version'],
+        identity=manifest['source_identity'],
+        categorical_columns=manifest['categorical_columns']
+    )
+    bundle.feature_encoder = encoder
+    bundle.svr_engine = engine
+    smoke = manifest['smoke_test']
+    bundle.reference_rows = (
+        load(smoke['numeric']), load(smoke['categorical']).astype(object), load(smoke['expected'])
+    )
+    bundle.timings['load_seconds'] = round(time.perf_counter() - started, 4)
+
+    logger.info(f"Model artifact {bundle.version} opened from {artifact_dir}: {bundle.timings}")
+    return bundle
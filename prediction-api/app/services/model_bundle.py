@@ -0,0 +1,294 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.services.input_schema import InputSchema
+from app.services.feature_encoder import FeatureEncoder
+from app.services.svr_engine import SVREngine
+from app.services.prediction_cache import model_identity
+from app.utils.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Liste complète des colonnes attendues (basée sur l'entraînement)
+EXPECTED_COLUMNS = [
+    'potential', 'crossing', 'finishing', 'heading_accuracy', 'short_passing',
+    'volleys', 'dribbling', 'curve', 'free_kick_accuracy', 'long_passing',
+    'ball_control', 'acceleration', 'sprint_speed', 'agility', 'reactions',
+    'balance', 'shot_power', 'jumping', 'stamina', 'strength', 'long_shots',
+    'aggression', 'interceptions', 'positioning', 'vision', 'penalties',
+    'marking', 'standing_tackle', 'sliding_tackle', 'gk_diving', 'gk_handling',
+    'gk_kicking', 'gk_positioning', 'gk_reflexes', 'preferred_foot',
+    'attacking_work_rate', 'defensive_work_rate'
+]
+DEFAULT_CATEGORICAL_COLUMNS = ['preferred_foot', 'attacking_work_rate', 'defensive_work_rate']
+
+
+class ModelBundle:
+    """One loaded model version: transformer, model, target pipeline and the
+    structures compiled from them (input schema, NumPy encoder and engine).
+
+    A bundle is never modified once built, so a request holding a reference
+    keeps scoring with a consistent set of artifacts during a hot swap.
+    """
+
+    def __init__(self, model, transformer, target_pipeline, paths: Dict[str, str],
+                 version: str = 'custom', identity: Optional[str] = None,
+                 categorical_columns: Optional[List[str]] = None):
+        self.model = model
+        self.transformer = transformer
+        self.target_pipeline = target_pipeline
+        self.paths = dict(paths)
+        self.version = version
+        self.identity = identity or model_identity(
+            [paths['model'], paths['transformer'], paths['target_pipeline']]
+        )
+        self.timings = {}
+        self.categorical_columns = categorical_columns
+        self.expected_columns = None
+        self.numerical_columns = None
+        # (numeric, categorical, predictions attendues) livrées avec un artefact exporté
+        self.reference_rows = None
+
+        self.extract_expected_columns()
+        self.input_schema = InputSchema(self.expected_columns, self.categorical_columns)
+        self.feature_encoder = None
+        self.svr_engine = None
+
+    @classmethod
+    def load(cls, paths: Dict[str, str], version: str = 'custom') -> 'ModelBundle':
+        """Load the joblib artifacts and compile the fast inference paths"""
+        if 'artifact' in paths:
+            from app.services.model_artifact import open_artifact
+            return open_artifact(paths['artifact'], version)
+
+        started = time.perf_counter()
+        bundle = cls(
+            joblib.load(paths['model']),
+            joblib.load(paths['transformer']),
+            joblib.load(paths['target_pipeline']),
+            paths,
+            version
+        )
+        bundle.timings['load_seconds'] = round(time.perf_counter() - started, 4)
+
+        started = time.perf_counter()
+        bundle.feature_encoder = bundle.build_feature_encoder()
+        bundle.svr_engine = bundle.build_svr_engine()
+        bundle.timings['compile_seconds'] = round(time.perf_counter() - started, 4)
+
+        logger.info(f"Model bundle {version} loaded: {bundle.timings}")
+        return bundle
+
+    def extract_expected_columns(self):
+        """Extract expected columns from the transformer"""
+        try:
+            # Les colonnes catégorielles sont généralement dans le one-hot encoder
+            if self.categorical_columns is not None:
+                # Colonnes déjà connues (artefact exporté)
+                pass
+            elif hasattr(self.transformer, 'named_steps'):
+                # Pour les pipelines sklearn
+                for name, step in self.transformer.named_steps.items():
+                    if hasattr(step, 'get_feature_names_out'):
+                        if 'onehot' in name.lower() or 'categorical' in name.lower():
+                            # Extraire les colonnes originales des noms de features
+                            features = step.get_feature_names_out()
+                            self.categorical_columns = list(set(
+                                [f.split('_')[0] for f in features if '_' in f]
+                            ))
+            elif hasattr(self.transformer, 'transformers'):
+                # Pour les ColumnTransformer
+                for name, transformer, columns in self.transformer.transformers:
+                    if 'onehot' in str(transformer).lower() or 'categorical' in str(transformer).lower():
+                        self.categorical_columns = list(columns)
+        except Exception as e:
+            logger.warning(f"Could not extract columns from transformer: {e}")
+
+        # Si on n'a pas pu extraire, utiliser les valeurs par défaut
+        if self.categorical_columns is None:
+            self.categorical_columns = list(DEFAULT_CATEGORICAL_COLUMNS)
+
+        self.expected_columns = list(EXPECTED_COLUMNS)
+
+        # Colonnes numériques = toutes sauf catégorielles
+        self.numerical_columns = [
+            col for col in self.expected_columns
+            if col not in self.categorical_columns
+        ]
+
+    def build_feature_encoder(self) -> Optional[FeatureEncoder]:
+        """Compile the fitted transformer into a NumPy encoder, checked against sklearn"""
+        try:
+            encoder = FeatureEncoder.from_transformer(
+                self.transformer,
+                self.input_schema.numerical_columns,
+                self.input_schema.categorical_columns
+            )
+            numeric, categorical = self.parity_rows()
+            frame = self.input_schema.to_frame(numeric, categorical)
+            report = encoder.parity_report(self.transformer, frame, numeric, categorical)
+
+            if not report['ok']:
+                logger.warning(f"Feature encoder parity check failed, using sklearn transform: {report}")
+                return None
+
+            logger.info(f"Feature encoder compiled (parity on {report['rows']} rows, max error {report['max_abs_error']})")
+            return encoder
+
+        except Exception as e:
+            logger.warning(f"Could not compile feature encoder, using sklearn transform: {e}")
+            return None
+
+    def build_svr_engine(self) -> Optional[SVREngine]:
+        """Optional NumPy SVR engine (SVR_ENGINE=numpy), checked against model.predict"""
+        if os.getenv('SVR_ENGINE', 'sklearn').lower() != 'numpy':
+            return None
+
+        try:
+            dtype = np.dtype(os.getenv('SVR_ENGINE_DTYPE', 'float64'))
+            block_bytes = int(os.getenv('SVR_ENGINE_BLOCK_BYTES', str(32 * 1024 * 1024)))
+            default_tolerance = '1e-4' if dtype == np.float32 else '1e-8'
+            tolerance = float(os.getenv('SVR_ENGINE_TOLERANCE', default_tolerance))
+
+            engine = SVREngine.from_model(self.model, dtype=dtype, max_block_bytes=block_bytes)
+            report = engine.accuracy_report(self.model, self.transform_rows(*self.parity_rows()))
+
+            if report['max_abs_error'] > tolerance:
+                logger.warning(f"SVR engine outside tolerance {tolerance}, using model.predict: {report}")
+                return None
+
+            logger.info(f"SVR engine enabled ({engine.n_support} support vectors): {report}")
+            return engine
+
+        except Exception as e:
+            logger.warning(f"Could not build SVR engine, using model.predict: {e}")
+            return None
+
+    def parity_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows used for load-time parity checks: sample.csv plus synthetic edge cases"""
+        if self.reference_rows is not None:
+            return self.reference_rows[0], self.reference_rows[1]
+
+        schema = self.input_schema
+        records = []
+
+        sample_path = os.getenv('PARITY_SAMPLE_PATH') or os.path.join(
+            os.path.dirname(__file__), '../../data/sample.csv'
+        )
+        if os.path.exists(sample_path):
+            records.extend(pd.read_csv(sample_path).to_dict('records'))
+        else:
+            logger.warning(f"Parity sample not found: {sample_path}, using synthetic rows only")
+
+        # Chaque catégorie connue, une catégorie inconnue et les valeurs par défaut
+        records.append({})
+        for col in schema.categorical_columns:
+            for category in self.known_categories(col) + ['__unknown__']:
+                records.append({col: category, 'potential': 99.0, 'gk_diving': 1.0})
+
+        rows = [schema.encode(record) for record in records]
+        numeric = np.vstack([row[0] for row in rows])
+        categorical = np.vstack([row[1] for row in rows])
+
+        # Valeurs manquantes côté numérique pour vérifier l'imputation
+        numeric[-1, :] = np.nan
+        return numeric, categorical
+
+    def known_categories(self, column: str) -> List[str]:
+        """Categories learned by the one-hot encoder for a column"""
+        try:
+            for name, fitted, columns in self.transformer.transformers_:
+                if column in list(columns) and hasattr(fitted, 'steps'):
+                    encoder = fitted.steps[-1][1]
+                    if hasattr(encoder, 'categories_'):
+                        return [str(c) for c in encoder.categories_[list(columns).index(column)]]
+        except Exception:
+            pass
+        return []
+
+    def transform_rows(self, numeric: np.ndarray, categorical: np.ndarray) -> np.ndarray:
+        """Map prepared (numeric, categorical) rows to the model feature matrix"""
+        with stage_timer('transform'):
+            if self.feature_encoder is not None:
+                return self.feature_encoder.transform(numeric, categorical)
+            return self.transformer.transform(self.input_schema.to_frame(numeric, categorical))
+
+    def score_transformed(self, transformed_data: np.ndarray) -> np.ndarray:
+        """Predict on transformed features and inverse the target scaling"""
+        predictor = self.svr_engine if self.svr_engine is not None else self.model
+        with stage_timer('predict'):
+            predictions = predictor.predict(transformed_data)
+        with stage_timer('inverse_transform'):
+            final_predictions = np.round(
+                self.target_pipeline.inverse_transform(predictions.reshape(-1, 1)), 2
+            )
+        return final_predictions[:, 0]
+
+    def score_rows(self, numeric: np.ndarray, categorical: np.ndarray) -> np.ndarray:
+        """Transform prepared rows, predict and inverse the target scaling"""
+        return self.score_transformed(self.transform_rows(numeric, categorical))
+
+    def warmup(self, rows: int = 256):
+        """Run synthetic rows through every scoring path before taking traffic"""
+        started = time.perf_counter()
+        numeric, categorical = self.parity_rows()
+        repeat = -(-rows // len(numeric))
+        numeric = np.tile(numeric, (repeat, 1))[:rows]
+        categorical = np.tile(categorical, (repeat, 1))[:rows]
+
+        # Une ligne seule puis un lot : les deux formes servies en production
+        self.score_rows(numeric[:1], categorical[:1])
+        self.score_rows(numeric, categorical)
+        self.timings['warmup_seconds'] = round(time.perf_counter() - started, 4)
+
+    def smoke_test(self, reference: Optional['ModelBundle'] = None) -> Dict:
+        """Check the bundle predicts sane values; compare with the active one if given"""
+        started = time.perf_counter()
+        if self.reference_rows is not None:
+            # Artefact exporté : prédictions du chemin sklearn enregistrées à l'export
+            numeric, categorical, expected = self.reference_rows
+            predictions = self.score_rows(numeric, categorical)
+        else:
+            numeric, categorical = self.parity_rows()
+            predictions = self.score_rows(numeric, categorical)
+
+            # Le chemin sklearn d'origine sert de référence aux chemins compilés
+            expected = np.round(self.target_pipeline.inverse_transform(
+                self.model.predict(
+                    self.transformer.transform(self.input_schema.to_frame(numeric, categorical))
+                ).reshape(-1, 1)
+            ), 2)[:, 0]
+
+        report = {
+            'rows': len(predictions),
+            'finite': bool(np.isfinite(predictions).all()),
+            'max_abs_error': float(np.max(np.abs(predictions - expected))),
+            'min': float(np.min(predictions)),
+            'max': float(np.max(predictions))
+        }
+        if reference is not None:
+            report['max_abs_change'] = float(np.max(np.abs(
+                predictions - reference.score_rows(numeric, categorical)
+            )))
+
+        tolerance = float(os.getenv('MODEL_SMOKE_TOLERANCE', '0.01'))
+        report['ok'] = report['finite'] and report['max_abs_error'] <= tolerance
+        self.timings['smoke_test_seconds'] = round(time.perf_counter() - started, 4)
+        return report
+
+    def describe(self) -> Dict:
+        return {
+            'version': self.version,
+            'format': 'artifact' if 'artifact' in self.paths else 'joblib',
+            'identity': self.identity,
+            'files': {kind: os.path.basename(path) for kind, path in self.paths.items()},
+            'feature_encoder': self.feature_encoder is not None,
+            'svr_engine': self.svr_engine is not None,
+            'timings': dict(self.timings)
+        }
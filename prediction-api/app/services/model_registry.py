@@ -0,0 +1,92 @@
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 02_03_2025__18_25_41_full_transformer.pkl -> (horodatage, type d'artefact)
+ARTIFACT_PATTERN = re.compile(
+    r'^(?P<stamp>\d{2}_\d{2}_\d{4}__\d{2}_\d{2}_\d{2})_(?P<kind>full_transformer|target_pipeline|best_model)\.pkl$'
+)
+TIMESTAMP_FORMAT = '%d_%m_%Y__%H_%M_%S'
+# Répertoire produit par export_model.py à côté des pickles d'une version
+ARTIFACT_SUFFIX = '_artifact'
+
+
+def parse_timestamp(stamp: str) -> datetime:
+    return datetime.strptime(stamp, TIMESTAMP_FORMAT)
+
+
+class ModelRegistry:
+    """Timestamped model bundles found in a models directory.
+
+    Training writes the transformer and target pipeline under one timestamp
+    and the model a little later under its own; each model is paired with
+    the most recent preprocessing artifacts saved before it. A version is
+    named after its model timestamp; when it has been exported to the
+    memory-mappable format, the export is loaded instead of the pickles.
+    """
+
+    def __init__(self, models_dir: str, prefer_artifacts: Optional[bool] = None):
+        self.models_dir = models_dir
+        if prefer_artifacts is None:
+            prefer_artifacts = os.getenv('MODEL_PREFER_ARTIFACTS', 'true').lower() in ('1', 'true', 'yes')
+        self.prefer_artifacts = prefer_artifacts
+
+    def scan(self) -> List[Dict]:
+        """Complete versions, oldest first"""
+        artifacts = {'full_transformer': {}, 'target_pipeline': {}, 'best_model': {}}
+        try:
+            filenames = os.listdir(self.models_dir)
+        except OSError as e:
+            logger.warning(f"Model registry unavailable ({self.models_dir}): {e}")
+            return []
+
+        for filename in filenames:
+            match = ARTIFACT_PATTERN.match(filename)
+            if match:
+                artifacts[match.group('kind')][match.group('stamp')] = os.path.join(self.models_dir, filename)
+
+        # Prétraitements complets (transformer + cible sous le même horodatage)
+        preprocessing = sorted(
+            set(artifacts['full_transformer']) & set(artifacts['target_pipeline']),
+            key=parse_timestamp
+        )
+
+        versions = []
+        for stamp in sorted(artifacts['best_model'], key=parse_timestamp):
+            trained_at = parse_timestamp(stamp)
+            candidates = [p for p in preprocessing if parse_timestamp(p) <= trained_at]
+            if not candidates:
+                logger.warning(f"No preprocessing artifacts for model {stamp}, skipped")
+                continue
+
+            preprocessing_stamp = candidates[-1]
+            paths = {
+                'model': artifacts['best_model'][stamp],
+                'transformer': artifacts['full_transformer'][preprocessing_stamp],
+                'target_pipeline': artifacts['target_pipeline'][preprocessing_stamp]
+            }
+
+            # Version exportée au format mappable : préférée aux pickles
+            artifact_dir = os.path.join(self.models_dir, f'{stamp}{ARTIFACT_SUFFIX}')
+            if self.prefer_artifacts and os.path.isfile(os.path.join(artifact_dir, 'manifest.json')):
+                paths = {'artifact': artifact_dir}
+
+            versions.append({
+                'version': stamp,
+                'trained_at': trained_at.isoformat(),
+                'preprocessing': preprocessing_stamp,
+                'format': 'artifact' if 'artifact' in paths else 'joblib',
+                'paths': paths
+            })
+        return versions
+
+    def get(self, version: Optional[str] = None) -> Optional[Dict]:
+        """A given version, or the most recent one"""
+        versions = self.scan()
+        if version is None:
+            return versions[-1] if versions else None
+        return next((v for v in versions if v['version'] == version), None)
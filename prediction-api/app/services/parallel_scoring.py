@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Version (nom, chemins) -> bundle chargé dans le processus worker : ni service, ni cache, ni poller
+_worker_bundle = None
+
+
+def _load_worker_bundle(version: Tuple[str, Dict]):
+    global _worker_bundle
+    from app.services.model_bundle import ModelBundle
+    _worker_bundle = ModelBundle.load(version[1], version[0])
+
+
+def _init_worker(version: Optional[Tuple[str, Dict]] = None):
+    """Load the model bundle of the parent's version once per worker process"""
+    if version is not None:
+        _load_worker_bundle(version)
+
+
+def score_shard(bundle, numeric: np.ndarray, categorical: np.ndarray) -> np.ndarray:
+    """Transform and score one shard of prepared rows with a loaded bundle"""
+    return bundle.score_rows(numeric, categorical)
+
+
+def _score_shard(shard: Tuple[Tuple[str, Dict], np.ndarray, np.ndarray]) -> np.ndarray:
+    version, numeric, categorical = shard
+    if _worker_bundle is None or _worker_bundle.paths != version[1]:
+        # Le parent a basculé sur une autre version depuis le démarrage du pool
+        _load_worker_bundle(version)
+    return score_shard(_worker_bundle, numeric, categorical)
+
+
+class ParallelScorer:
+    """Score large batches as row shards across a process pool.
+
+    Workers only load the ``ModelBundle`` of the version they are asked to
+    score with (memory-mapped for exported artifacts), never the prediction
+    service and its caches; shards are scored independently and reassembled
+    in input order. ``version`` is the (name, artifact paths) loaded when
+    the pool starts and used when ``score`` is not given one.
+    """
+
+    def __init__(self, workers: int, shard_rows: int = 10000, start_method: Optional[str] = None,
+                 version: Optional[Tuple[str, Dict]] = None):
+        if workers < 1:
+            raise ValueError("workers doit être >= 1")
+
+        self.workers = workers
+        self.shard_rows = max(1, shard_rows)
+        self.start_method = start_method or os.getenv('BATCH_PROCESS_START_METHOD', 'spawn')
+        self.version = version
+        self._executor = None
+
+    def executor(self) -> ProcessPoolExecutor:
+        """Create the pool on first use"""
+        if self._executor is None:
+            context = multiprocessing.get_context(self.start_method)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context,
+                initializer=_init_worker, initargs=(self.version,)
+            )
+            logger.info(f"Process pool started ({self.workers} workers, {self.start_method})")
+        return self._executor
+
+    def shards(self, numeric: np.ndarray, categorical: np.ndarray,
+               version: Optional[Tuple[str, Dict]] = None) -> List[Tuple]:
+        return [
+            (version, numeric[start:start + self.shard_rows], categorical[start:start + self.shard_rows])
+            for start in range(0, len(numeric), self.shard_rows)
+        ]
+
+    def score(self, numeric: np.ndarray, categorical: np.ndarray,
+              version: Optional[Tuple[str, Dict]] = None) -> np.ndarray:
+        """Score rows in parallel; output order matches input order.
+
+        ``version`` is the (name, artifact paths) of the bundle to score
+        with; workers still on another version load it first.
+        """
+        if len(numeric) == 0:
+            return np.empty(0, dtype=np.float64)
+        version = version or self.version
+        if version is None:
+            raise ValueError("Version de modèle requise pour le scoring parallèle")
+
+        # map() conserve l'ordre des shards
+        results = self.executor().map(_score_shard, self.shards(numeric, categorical, version))
+        return np.concatenate(list(results))
+
+    def warmup(self):
+        """Start every worker now instead of on the first large batch"""
+        executor = self.executor()
+        list(executor.map(_noop, range(self.workers)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _noop(_):
+    return _worker_bundle is not None
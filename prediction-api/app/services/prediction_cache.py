@@ -0,0 +1,279 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MAX_VARIABLES = 900
+
+
+def feature_fingerprint(numeric: np.ndarray, categorical: np.ndarray) -> str:
+    """Canonical hash of one normalised feature vector"""
+    # +0.0 ramène -0.0 à 0.0 pour que deux vecteurs égaux aient la même empreinte
+    values = np.ascontiguousarray(numeric, dtype=np.float64) + 0.0
+    digest = hashlib.blake2b(values.tobytes(), digest_size=16)
+    digest.update('\x1f'.join(str(value) for value in categorical).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def unique_rows(numeric: np.ndarray, categorical: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct feature vectors of a prepared matrix.
+
+    Returns the position of the first occurrence of each distinct row and,
+    for every row, the index of its distinct row. Rows are compared on the
+    exact float64 bits (after -0.0 -> 0.0) and on categorical values, like
+    ``feature_fingerprint``.
+    """
+    n_rows = len(numeric)
+    if n_rows == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    keys = [(np.ascontiguousarray(numeric, dtype=np.float64) + 0.0).view(np.int64)]
+    if categorical.shape[1]:
+        # Catégories encodées en entiers pour comparer des lignes de taille fixe
+        keys.append(np.column_stack([
+            pd.factorize(categorical[:, j], use_na_sentinel=False)[0] for j in range(categorical.shape[1])
+        ]).astype(np.int64))
+    matrix = np.ascontiguousarray(np.hstack(keys)).reshape(n_rows, -1)
+    rows = matrix.view(np.dtype((np.void, matrix.dtype.itemsize * matrix.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first, inverse.reshape(-1)
+
+
+def model_identity(paths: Iterable[str]) -> str:
+    """Identity of a loaded model bundle (path, size and mtime of every file)"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f'{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns};'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ReuseStats:
+    """How many rows of one batch were scored, reused in-file or served by the cache"""
+
+    def __init__(self):
+        self.rows = 0
+        self.unique_rows = 0
+        self.cached_rows = 0
+        self.scored_rows = 0
+
+    def add(self, rows: int, unique_rows: int, cached_rows: int, scored_rows: int):
+        self.rows += rows
+        self.unique_rows += unique_rows
+        self.cached_rows += cached_rows
+        self.scored_rows += scored_rows
+
+    def to_dict(self) -> Dict:
+        return {
+            'rows': self.rows,
+            'unique_rows': self.unique_rows,
+            'cached_rows': self.cached_rows,
+            'scored_rows': self.scored_rows,
+            # Lignes identiques à une autre ligne du fichier
+            'duplicate_ratio': round(1 - self.unique_rows / self.rows, 4) if self.rows else 0.0,
+            # Vecteurs distincts déjà scorés par ce modèle (envois précédents, /single)
+            'cache_ratio': round(self.cached_rows / self.unique_rows, 4) if self.unique_rows else 0.0,
+            # Part des lignes servies sans passer par le modèle
+            'reuse_ratio': round(1 - self.scored_rows / self.rows, 4) if self.rows else 0.0
+        }
+
+
+class PredictionCache:
+    """Bounded in-process LRU of predictions, with an optional shared SQLite tier.
+
+    Entries are scoped to a model identity: switching identity empties the
+    LRU, and the SQLite tier only serves rows written for the same model, so
+    several workers can share one file across model updates. Rows of every
+    model are kept (workers of a rollout or an A/B test use different ones)
+    until they are older than ``disk_ttl_seconds``; beyond ``max_disk_rows``
+    the oldest rows are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 10000, db_path: Optional[str] = None,
+                 identity: str = '', max_disk_rows: int = 1000000,
+                 disk_ttl_seconds: float = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.identity = identity
+        self.max_disk_rows = max_disk_rows
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'disk_hits': 0, 'disk_writes': 0,
+                          'disk_evictions': 0}
+
+        if self.db_path:
+            self.init_db()
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def init_db(self):
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                ' model TEXT NOT NULL, key TEXT NOT NULL, prediction REAL NOT NULL,'
+                ' created_at REAL NOT NULL, PRIMARY KEY (model, key))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_predictions_created ON predictions (created_at)')
+
+    def set_identity(self, identity: str):
+        """Invalidate in-process entries when the loaded model changes"""
+        with self._lock:
+            if identity != self.identity:
+                self.identity = identity
+                self._entries.clear()
+
+        if self.db_path:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Drop expired rows of the shared tier, then the oldest ones beyond max_disk_rows.
+
+        Rows of other models are left alone while they are fresh: another
+        worker may still serve that model.
+        """
+        try:
+            with closing(self.connect()) as conn, conn:
+                removed = conn.execute(
+                    'DELETE FROM predictions WHERE created_at < ?', (time.time() - self.disk_ttl_seconds,)
+                ).rowcount
+                excess = conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] - self.max_disk_rows
+                if excess > 0:
+                    removed += conn.execute(
+                        'DELETE FROM predictions WHERE rowid IN'
+                        ' (SELECT rowid FROM predictions ORDER BY created_at LIMIT ?)', (excess,)
+                    ).rowcount
+            with self._lock:
+                self._count('disk_evictions', removed)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not purge prediction cache: {e}")
+
+    def _count(self, name: str, amount: int = 1):
+        self._counters[name] += amount
+
+    def _remember(self, key: str, value: float):
+        """Insert into the LRU (caller holds the lock)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._count('evictions')
+
+    def get(self, key: str, identity: Optional[str] = None) -> Optional[float]:
+        return self.get_many([key], identity).get(key)
+
+    def put(self, key: str, value: float, identity: Optional[str] = None):
+        self.put_many({key: value}, identity)
+
+    def get_many(self, keys: List[str], identity: Optional[str] = None) -> Dict[str, float]:
+        """Look keys up in the LRU, then in the shared tier.
+
+        ``identity`` is the model the caller scores with; a lookup made for
+        another model than the current one is always a miss.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            if identity is not None and identity != self.identity:
+                self._count('misses', len(keys))
+                return found
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+
+        if missing and self.db_path:
+            disk = self._read_disk(missing)
+            if disk:
+                with self._lock:
+                    for key, value in disk.items():
+                        self._remember(key, value)
+                    self._count('disk_hits', len(disk))
+                found.update(disk)
+
+        with self._lock:
+            self._count('hits', len(found))
+            self._count('misses', len(keys) - len(found))
+        return found
+
+    def put_many(self, values: Dict[str, float], identity: Optional[str] = None):
+        if not values:
+            return
+
+        with self._lock:
+            # Valeurs calculées par un modèle remplacé entre-temps : ne pas les mélanger
+            if identity is not None and identity != self.identity:
+                return
+            for key, value in values.items():
+                self._remember(key, value)
+
+        if self.db_path:
+            try:
+                now = time.time()
+                with closing(self.connect()) as conn, conn:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO predictions (model, key, prediction, created_at)'
+                        ' VALUES (?, ?, ?, ?)',
+                        [(self.identity, key, value, now) for key, value in values.items()]
+                    )
+                with self._lock:
+                    self._count('disk_writes', len(values))
+                    self._writes_since_prune += len(values)
+                    # Élagage amorti : au plus 10 % de lignes au-delà de la borne entre deux passes
+                    prune = self._writes_since_prune >= max(self.max_disk_rows // 10, 1)
+                    if prune:
+                        self._writes_since_prune = 0
+                if prune:
+                    self.prune_disk()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not write prediction cache: {e}")
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, float]:
+        found = {}
+        try:
+            with closing(self.connect()) as conn:
+                for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                    chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f'SELECT key, prediction FROM predictions'
+                        f' WHERE model = ? AND created_at >= ? AND key IN ({placeholders})',
+                        (self.identity, time.time() - self.disk_ttl_seconds, *chunk)
+                    )
+                    found.update(rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read prediction cache: {e}")
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['max_entries'] = self.max_entries
+        stats['shared_tier'] = bool(self.db_path)
+        stats['max_disk_rows'] = self.max_disk_rows if self.db_path else None
+        stats['model_identity'] = self.identity
+        return stats
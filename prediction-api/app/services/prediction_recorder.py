@@ -0,0 +1,241 @@
+import atexit
+import json
+import math
+import os
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Même format que les colonnes DateTime SQLAlchemy sur SQLite (auth-api)
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+class PredictionRecorder:
+    """Write-behind log of predictions into the shared prediction_history table.
+
+    Requests only append to an in-memory buffer; a background thread
+    writes it with one bulk INSERT per ``flush_rows`` records or every
+    ``flush_seconds``. Batch results are queued as one item and expanded
+    to rows by the writer. ``close`` (registered with atexit) writes what
+    is left before the process exits.
+    """
+
+    def __init__(self, db_path: str, flush_rows: int = 500, flush_seconds: float = 2.0,
+                 max_buffer: int = 100000):
+        self.db_path = db_path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self._buffer = deque()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._counters = {'recorded': 0, 'written': 0, 'flushes': 0, 'dropped': 0, 'skipped': 0, 'errors': 0}
+
+        self.init_db()
+        self._thread = threading.Thread(target=self._run, name='prediction-recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA busy_timeout=10000')
+        return conn
+
+    def init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            # Table normalement créée par auth-api : même schéma si ce service démarre le premier
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS prediction_history ('
+                ' id VARCHAR(36) NOT NULL PRIMARY KEY, user_id VARCHAR(36) NOT NULL,'
+                ' input_data JSON NOT NULL, prediction_result FLOAT NOT NULL, created_at DATETIME,'
+                ' FOREIGN KEY(user_id) REFERENCES users (id))'
+            )
+            # Même index que auth-api : (created_at, id) départage les lignes d'un même lot
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_prediction_history_user_created_id'
+                ' ON prediction_history (user_id, created_at, id)'
+            )
+            conn.execute('DROP INDEX IF EXISTS ix_prediction_history_user_created')
+
+    def record(self, user_id: Optional[str], input_data: Dict, prediction: float):
+        """Queue one single prediction"""
+        self._append(user_id, ('single', input_data, prediction), 1)
+
+    def record_batch(self, user_id: Optional[str], results: Union[List[Dict], pd.DataFrame]):
+        """Queue batch results (each record keeps its inputs; 'prediction' is the result).
+
+        Records, a result frame or a stored result (anything with ``iter_records``).
+        """
+        if len(results):
+            self._append(user_id, ('batch', results, None), len(results))
+
+    def _append(self, user_id: Optional[str], item, rows: int):
+        if not user_id:
+            return
+        created_at = datetime.utcnow().strftime(DATETIME_FORMAT)
+        with self._condition:
+            if self._closed:
+                return
+            if self._pending + rows > self.max_buffer:
+                # Base indisponible depuis trop longtemps : borner la mémoire
+                self._counters['dropped'] += rows
+                logger.warning(f"Prediction history buffer full, {rows} records dropped")
+                return
+            self._buffer.append((user_id, created_at, item, rows))
+            self._pending += rows
+            self._counters['recorded'] += rows
+            if self._pending >= self.flush_rows:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closed and self._pending < self.flush_rows:
+                    self._condition.wait(self.flush_seconds)
+                closed = self._closed
+            errors = self._counters['errors']
+            try:
+                self.flush()
+            except Exception as e:
+                # Le thread d'écriture ne doit jamais s'arrêter : les éléments sont déjà remis en file
+                logger.error(f"Prediction history writer error: {e}", exc_info=True)
+            if closed:
+                return
+            if self._counters['errors'] != errors:
+                # Base verrouillée ou absente : attendre avant de réessayer
+                with self._condition:
+                    if not self._closed:
+                        self._condition.wait(self.flush_seconds)
+
+    def _history_row(self, user_id: str, created_at: str, inputs: Dict, prediction) -> Optional[tuple]:
+        """One prediction_history row, or None when the prediction is missing or not a number"""
+        try:
+            value = float(prediction)
+            if not math.isfinite(value):
+                return None
+            return str(uuid.uuid4()), user_id, json.dumps(inputs, default=str), value, created_at
+        except (TypeError, ValueError):
+            return None
+
+    def _item_rows(self, user_id: str, created_at: str, kind: str, data, prediction) -> List[tuple]:
+        """Rows of one queued item (rows that cannot be stored are skipped and counted)"""
+        if kind == 'single':
+            results = [(data, prediction)]
+        else:
+            if isinstance(data, pd.DataFrame):
+                # Résultat colonnaire : converti ici, hors du chemin de la requête
+                data = data.astype(object).where(data.notna(), None).to_dict('records')
+            elif hasattr(data, 'iter_records'):
+                data = data.iter_records()
+            results = (
+                ({key: value for key, value in result.items() if key != 'prediction'}, result.get('prediction'))
+                for result in data
+            )
+
+        rows, skipped = [], 0
+        for inputs, value in results:
+            row = self._history_row(user_id, created_at, inputs, value)
+            if row is None:
+                skipped += 1
+            else:
+                rows.append(row)
+        if skipped:
+            logger.warning(f"Prediction history: {skipped} records without a numeric prediction skipped")
+            with self._condition:
+                self._counters['skipped'] += skipped
+        return rows
+
+    def flush(self) -> int:
+        """Write everything buffered so far; failed rows are kept for the next attempt"""
+        with self._flush_lock:
+            with self._condition:
+                items = list(self._buffer)
+                self._buffer.clear()
+                self._pending = 0
+            if not items:
+                return 0
+
+            try:
+                rows = []
+                for user_id, created_at, (kind, data, prediction), count in items:
+                    try:
+                        rows.extend(self._item_rows(user_id, created_at, kind, data, prediction))
+                    except Exception as e:
+                        # Résultat illisible (ex. résultat stocké supprimé) : seul cet élément est perdu
+                        logger.warning(f"Prediction history: unreadable {kind} result skipped ({count} records): {e}")
+                        with self._condition:
+                            self._counters['skipped'] += count
+
+                with closing(self.connect()) as conn, conn:
+                    conn.executemany(
+                        'INSERT INTO prediction_history (id, user_id, input_data, prediction_result, created_at)'
+                        ' VALUES (?, ?, ?, ?, ?)',
+                        rows
+                    )
+            except Exception as e:
+                kept = sum(item[3] for item in items)
+                logger.warning(f"Prediction history flush failed ({kept} records kept): {e}")
+                with self._condition:
+                    self._buffer.extendleft(reversed(items))
+                    self._pending += kept
+                    self._counters['errors'] += 1
+                return 0
+
+            with self._condition:
+                self._counters['written'] += len(rows)
+                self._counters['flushes'] += 1
+            return len(rows)
+
+    def close(self):
+        """Stop the writer thread after a last flush"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=30)
+        # Dernière tentative si le thread n'a pas pu tout écrire
+        self.flush()
+
+    def stats(self) -> Dict:
+        with self._condition:
+            stats = dict(self._counters)
+            stats['buffered'] = self._pending
+        stats['db_path'] = self.db_path
+        return stats
+
+
+def create_prediction_recorder() -> Optional[PredictionRecorder]:
+    """Recorder on the shared database (PREDICTION_HISTORY_DB empty disables it)"""
+    db_path = os.getenv('PREDICTION_HISTORY_DB', os.path.join(
+        os.path.dirname(__file__),
+        '../../data/database.sqlite'
+    ))
+    if not db_path:
+        return None
+    try:
+        return PredictionRecorder(
+            db_path,
+            flush_rows=int(os.getenv('PREDICTION_HISTORY_FLUSH_ROWS', '500')),
+            flush_seconds=float(os.getenv('PREDICTION_HISTORY_FLUSH_SECONDS', '2')),
+            max_buffer=int(os.getenv('PREDICTION_HISTORY_MAX_BUFFER', '100000'))
+        )
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Prediction history disabled ({db_path}): {e}")
+        return None
+
+
+# Global instance
+prediction_recorder = create_prediction_recorder()
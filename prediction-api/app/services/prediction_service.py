@@ -1,41 +1,78 @@
-import joblib
 import pandas as pd
 import numpy as np
 import os
-from typing import Dict, List, Any
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 import logging
 import traceback
+from app.services.micro_batcher import MicroBatcher
+from app.services.input_schema import default_categorical_value, DEFAULT_NUMERIC_VALUE
+from app.services.model_bundle import ModelBundle
+from app.services.model_registry import ModelRegistry, ARTIFACT_PATTERN, parse_timestamp
+from app.services.model_artifact import read_manifest
+from app.services.parallel_scoring import ParallelScorer
+from app.services.prediction_cache import PredictionCache, ReuseStats, feature_fingerprint, unique_rows
+from app.services.similarity_index import SimilarityIndex
+from app.services import batch_io
+from app.utils.serialization import json_column, frame_columns, frame_json_columns
+from app.utils.metrics import ROWS_TOTAL, stage_timer
+from app.utils.payload_log import log_payload
 
 logger = logging.getLogger(__name__)
 
+# Colonnes candidates pour l'identifiant, le nom et l'image des joueurs (par priorité)
+POSSIBLE_ID_COLUMNS = ['player_fifa_api_id', 'player_id', 'id', 'sofifa_id']
+POSSIBLE_NAME_COLUMNS = ['player_name', 'name', 'short_name', 'long_name']
+POSSIBLE_IMAGE_COLUMNS = ['player_img', 'image']
+
+def _active(name: str):
+    """Read-only view of an attribute of the active model bundle"""
+    return property(lambda self: getattr(self.bundle, name) if self.bundle is not None else None)
+
+
 class PredictionService:
+    # Artefacts du bundle actif ; les chemins de prédiction lisent self.bundle une seule fois
+    model = _active('model')
+    transformer = _active('transformer')
+    target_pipeline = _active('target_pipeline')
+    expected_columns = _active('expected_columns')
+    categorical_columns = _active('categorical_columns')
+    numerical_columns = _active('numerical_columns')
+    input_schema = _active('input_schema')
+    feature_encoder = _active('feature_encoder')
+    svr_engine = _active('svr_engine')
+    model_identity = _active('identity')
+    
     def __init__(self):
-        self.model = None
-        self.transformer = None
-        self.target_pipeline = None
-        self.expected_columns = None
-        self.categorical_columns = None
-        self.numerical_columns = None
+        self.bundle = None
+        self.registry = ModelRegistry(os.getenv('MODEL_REGISTRY_DIR') or os.path.join(
+            os.path.dirname(__file__), '../../shared/models'
+        ))
+        self.model_status = {'state': 'idle'}
+        self.rejected_versions = set()
+        self._swap_lock = threading.Lock()
+        self.batcher = None
+        self.parallel_scorer = None
+        self.parallel_min_rows = None
+        self.prediction_cache = None
+        # Un seul score par vecteur distinct d'un fichier (BATCH_DEDUP=false pour tout rescorer)
+        self.batch_dedup = os.getenv('BATCH_DEDUP', 'true').lower() in ('1', 'true', 'yes')
         self.load_models()
+        self.init_batcher()
+        self.init_parallel_scorer()
+        self.init_prediction_cache()
+        self.init_registry_poller()
     
     def load_models(self):
         """Load ML models and transformers"""
         try:
-            model_path = os.getenv('MODEL_PATH')
-            transformer_path = os.getenv('TRANSFORMER_PATH')
-            target_pipeline_path = os.getenv('TARGET_PIPELINE_PATH')
-            
-            if not all([model_path, transformer_path, target_pipeline_path]):
-                raise ValueError("Model paths not configured")
-            
-            self.model = joblib.load(model_path)
-            self.transformer = joblib.load(transformer_path)
-            self.target_pipeline = joblib.load(target_pipeline_path)
+            spec = self.configured_version()
+            bundle = ModelBundle.load(spec['paths'], spec['version'])
+            bundle.warmup(int(os.getenv('MODEL_WARMUP_ROWS', '256')))
+            self.bundle = bundle
             
-            # Extraire les colonnes attendues par le transformer
-            self.extract_expected_columns()
-            
-            logger.info("All models loaded successfully")
+            logger.info(f"All models loaded successfully (version {bundle.version})")
             logger.info(f"Expected columns: {self.expected_columns}")
             logger.info(f"Categorical columns: {self.categorical_columns}")
             logger.info(f"Numerical columns: {self.numerical_columns}")
@@ -44,150 +81,183 @@ class PredictionService:
             logger.error(f"Error loading models: {e}")
             raise
     
-    def extract_expected_columns(self):
-        """Extract expected columns from the transformer"""
+    def configured_version(self) -> Dict:
+        """Bundle to load at startup: exported artifact or explicit env paths,
+        else MODEL_VERSION or the latest registry version"""
+        artifact_path = os.getenv('MODEL_ARTIFACT_PATH')
+        if artifact_path:
+            return {'version': read_manifest(artifact_path)['version'], 'paths': {'artifact': artifact_path}}
+        
+        paths = {
+            'model': os.getenv('MODEL_PATH'),
+            'transformer': os.getenv('TRANSFORMER_PATH'),
+            'target_pipeline': os.getenv('TARGET_PIPELINE_PATH')
+        }
+        if any(paths.values()):
+            if not all(paths.values()):
+                raise ValueError("Model paths not configured")
+            match = ARTIFACT_PATTERN.match(os.path.basename(paths['model']))
+            return {'version': match.group('stamp') if match else 'custom', 'paths': paths}
+        
+        spec = self.registry.get(os.getenv('MODEL_VERSION') or None)
+        if spec is None:
+            raise ValueError("Model paths not configured")
+        return spec
+    
+    def activate(self, bundle: ModelBundle):
+        """Make a loaded bundle the active one (single reference swap)"""
+        with self._swap_lock:
+            previous = self.bundle
+            self.bundle = bundle
+            if self.prediction_cache is not None:
+                self.prediction_cache.set_identity(self.cache_identity(bundle))
+        
+        logger.info(f"Model version {previous.version if previous else None} -> {bundle.version}")
+    
+    def load_version(self, version: Optional[str] = None, background: bool = True) -> Dict:
+        """Load, warm up and smoke-test a registry version, then swap it in"""
+        spec = self.registry.get(version)
+        if spec is None:
+            raise ValueError(f"Version de modèle inconnue: {version}")
+        
+        with self._swap_lock:
+            if self.model_status['state'] == 'loading':
+                raise RuntimeError("Un chargement de modèle est déjà en cours")
+            self.model_status = {'state': 'loading', 'candidate': spec['version'], 'started_at': time.time()}
+        
+        if background:
+            threading.Thread(target=self.load_candidate, args=(spec,), name='model-loader', daemon=True).start()
+        else:
+            self.load_candidate(spec)
+        return dict(self.model_status)
+    
+    def load_candidate(self, spec: Dict):
+        """Loader body: the active bundle keeps serving until the swap"""
         try:
-            # Les colonnes catégorielles sont généralement dans le one-hot encoder
-            if hasattr(self.transformer, 'named_steps'):
-                # Pour les pipelines sklearn
-                for name, step in self.transformer.named_steps.items():
-                    if hasattr(step, 'get_feature_names_out'):
-                        if 'onehot' in name.lower() or 'categorical' in name.lower():
-                            # Extraire les colonnes originales des noms de features
-                            features = step.get_feature_names_out()
-                            # Nettoyer pour obtenir les colonnes originales
-                            self.categorical_columns = list(set(
-                                [f.split('_')[0] for f in features if '_' in f]
-                            ))
-            elif hasattr(self.transformer, 'transformers'):
-                # Pour les ColumnTransformer
-                for name, transformer, columns in self.transformer.transformers:
-                    if 'onehot' in str(transformer).lower() or 'categorical' in str(transformer).lower():
-                        self.categorical_columns = columns
+            bundle = ModelBundle.load(spec['paths'], spec['version'])
+            bundle.warmup(int(os.getenv('MODEL_WARMUP_ROWS', '256')))
+            report = bundle.smoke_test(reference=self.bundle)
+            if not report['ok']:
+                raise ValueError(f"Smoke test échoué: {report}")
             
-            # Si on n'a pas pu extraire, utiliser les valeurs par défaut
-            if self.categorical_columns is None:
-                self.categorical_columns = ['preferred_foot', 'attacking_work_rate', 'defensive_work_rate']
-            
-            # Liste complète des colonnes attendues (basée sur l'entraînement)
-            self.expected_columns = [
-                'potential', 'crossing', 'finishing', 'heading_accuracy', 'short_passing',
-                'volleys', 'dribbling', 'curve', 'free_kick_accuracy', 'long_passing',
-                'ball_control', 'acceleration', 'sprint_speed', 'agility', 'reactions',
-                'balance', 'shot_power', 'jumping', 'stamina', 'strength', 'long_shots',
-                'aggression', 'interceptions', 'positioning', 'vision', 'penalties',
-                'marking', 'standing_tackle', 'sliding_tackle', 'gk_diving', 'gk_handling',
-                'gk_kicking', 'gk_positioning', 'gk_reflexes', 'preferred_foot',
-                'attacking_work_rate', 'defensive_work_rate'
-            ]
-            
-            # Colonnes numériques = toutes sauf catégorielles
-            self.numerical_columns = [
-                col for col in self.expected_columns 
-                if col not in self.categorical_columns
-            ]
+            self.activate(bundle)
+            self.model_status = {'state': 'idle', 'last_swap': {
+                'version': bundle.version, 'at': time.time(), 'smoke_test': report
+            }}
             
         except Exception as e:
-            logger.warning(f"Could not extract columns from transformer: {e}")
-            # Valeurs par défaut
-            self.expected_columns = [
-                'potential', 'crossing', 'finishing', 'heading_accuracy', 'short_passing',
-                'volleys', 'dribbling', 'curve', 'free_kick_accuracy', 'long_passing',
-                'ball_control', 'acceleration', 'sprint_speed', 'agility', 'reactions',
-                'balance', 'shot_power', 'jumping', 'stamina', 'strength', 'long_shots',
-                'aggression', 'interceptions', 'positioning', 'vision', 'penalties',
-                'marking', 'standing_tackle', 'sliding_tackle', 'gk_diving', 'gk_handling',
-                'gk_kicking', 'gk_positioning', 'gk_reflexes', 'preferred_foot',
-                'attacking_work_rate', 'defensive_work_rate'
-            ]
-            self.categorical_columns = ['preferred_foot', 'attacking_work_rate', 'defensive_work_rate']
-            self.numerical_columns = [
-                col for col in self.expected_columns 
-                if col not in self.categorical_columns
+            logger.error(f"Model version {spec['version']} rejected: {e}", exc_info=True)
+            self.rejected_versions.add(spec['version'])
+            self.model_status = {'state': 'failed', 'candidate': spec['version'], 'error': str(e)}
+    
+    def init_registry_poller(self):
+        """Optionally watch the registry and roll out newer versions (MODEL_REGISTRY_POLL_SECONDS > 0)"""
+        interval = float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', '0'))
+        if interval <= 0:
+            return
+        
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_registry()
+                except Exception as e:
+                    logger.warning(f"Model registry poll failed: {e}")
+        
+        threading.Thread(target=poll, name='model-registry-poller', daemon=True).start()
+        logger.info(f"Model registry polling every {interval}s ({self.registry.models_dir})")
+    
+    def check_registry(self):
+        """Load the latest registry version if it is newer than the active one"""
+        latest = self.registry.get()
+        if latest is None or latest['version'] in self.rejected_versions:
+            return
+        
+        try:
+            if parse_timestamp(self.bundle.version) >= parse_timestamp(latest['version']):
+                return
+        except ValueError:
+            # Version active hors registre (chemins personnalisés) : on bascule
+            pass
+        if self.model_status['state'] != 'loading':
+            self.load_version(latest['version'], background=False)
+    
+    def models_info(self) -> Dict:
+        """Active version, loader status and available registry versions"""
+        return {
+            'active': self.bundle.describe() if self.bundle is not None else None,
+            'status': dict(self.model_status),
+            'versions': [
+                {key: version[key] for key in ('version', 'trained_at', 'preprocessing', 'format')}
+                for version in self.registry.scan()
             ]
+        }
+    
+    def init_prediction_cache(self):
+        """Prediction cache keyed on the normalised feature vector (PREDICTION_CACHE_SIZE=0 disables it)"""
+        max_entries = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))
+        if max_entries <= 0:
+            return
+        
+        self.prediction_cache = PredictionCache(
+            max_entries=max_entries,
+            db_path=os.getenv('PREDICTION_CACHE_DB') or None,
+            max_disk_rows=int(os.getenv('PREDICTION_CACHE_DB_MAX_ROWS', '1000000')),
+            disk_ttl_seconds=float(os.getenv('PREDICTION_CACHE_DB_TTL_HOURS', '168')) * 3600
+        )
+        self.prediction_cache.set_identity(self.cache_identity())
+        logger.info(f"Prediction cache enabled ({max_entries} entries, shared tier: {self.prediction_cache.db_path})")
+    
+    def cache_identity(self, bundle: Optional[ModelBundle] = None) -> str:
+        """Model file identity plus the inference engine that produced the values"""
+        bundle = bundle or self.bundle
+        engine = f'numpy-{bundle.svr_engine.dtype.name}' if bundle.svr_engine is not None else 'sklearn'
+        return f'{bundle.identity}:{engine}'
+    
+    def init_parallel_scorer(self):
+        """Optional process pool for very large batches (BATCH_PROCESS_WORKERS > 0)"""
+        workers = int(os.getenv('BATCH_PROCESS_WORKERS', '0'))
+        if workers <= 0:
+            return
+        
+        self.parallel_min_rows = int(os.getenv('BATCH_PARALLEL_MIN_ROWS', '20000'))
+        self.parallel_scorer = ParallelScorer(
+            workers,
+            shard_rows=int(os.getenv('BATCH_SHARD_ROWS', '10000')),
+            version=(self.bundle.version, self.bundle.paths)
+        )
+        logger.info(f"Parallel batch scoring enabled ({workers} workers, from {self.parallel_min_rows} rows)")
+    
+    def init_batcher(self):
+        """Start the optional micro-batching queue for single predictions"""
+        if os.getenv('PREDICTION_BATCHING', 'false').lower() not in ('1', 'true', 'yes'):
+            return
+        
+        max_batch_size = int(os.getenv('PREDICTION_BATCH_MAX_SIZE', '32'))
+        max_wait_ms = float(os.getenv('PREDICTION_BATCH_MAX_WAIT_MS', '2'))
+        self.batcher = MicroBatcher(
+            self.score_single_rows,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name='prediction-batcher'
+        )
+        logger.info(f"Micro-batching enabled (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})")
+    
+    def prepare_single_row(self, data: Dict, bundle: Optional[ModelBundle] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Prepare single input data as (numeric row, categorical row) arrays"""
+        return (bundle or self.bundle).input_schema.encode(data)
     
     def prepare_single_input(self, data: Dict) -> pd.DataFrame:
         """Prepare single input data for prediction"""
         try:
-            logger.info(f"Données reçues dans prepare_single_input: {data}")
+            log_payload(logger, lambda: f"Données reçues dans prepare_single_input: {data}")
             
-            # Faire une copie pour ne pas modifier l'original
-            processed_data = {}
+            # Schéma compilé : défauts, mise à l'échelle 1-10 et normalisation sans DataFrame intermédiaire
+            bundle = self.bundle
+            numeric, categorical = self.prepare_single_row(data, bundle)
+            df = bundle.input_schema.to_frame(numeric, categorical)
             
-            # Traitement des valeurs scalaires (1-10 vers 1-100)
-            scaling_needed = ['acceleration', 'sprint_speed', 'agility']
-            
-            for key, value in data.items():
-                if key in processed_data:
-                    continue
-                    
-                # Gestion des valeurs scalaires
-                if key in scaling_needed:
-                    try:
-                        val = float(value)
-                        # Si la valeur est entre 1 et 10, multiplier par 10
-                        if 1 <= val <= 10:
-                            processed_data[key] = val * 10
-                        else:
-                            processed_data[key] = val
-                    except (ValueError, TypeError):
-                        processed_data[key] = 50.0  # Valeur par défaut
-                
-                # Conversion des types
-                elif key in self.categorical_columns:
-                    # Normaliser les chaînes de caractères
-                    if isinstance(value, str):
-                        processed_data[key] = value.lower().strip()
-                    else:
-                        processed_data[key] = str(value).lower().strip()
-                
-                else:
-                    # Conversion numérique avec gestion d'erreurs
-                    try:
-                        processed_data[key] = float(value)
-                    except (ValueError, TypeError):
-                        # Si c'est une colonne attendue mais valeur invalide, mettre une valeur par défaut
-                        if key in self.expected_columns:
-                            processed_data[key] = 50.0
-                        else:
-                            # Colonne non attendue, on l'ignore
-                            pass
-            
-            # Ajouter les colonnes manquantes avec des valeurs par défaut
-            for col in self.expected_columns:
-                if col not in processed_data:
-                    if col in self.categorical_columns:
-                        # Valeurs par défaut pour les catégorielles
-                        if col == 'preferred_foot':
-                            processed_data[col] = 'right'
-                        elif 'work_rate' in col:
-                            processed_data[col] = 'medium'
-                        else:
-                            processed_data[col] = 'unknown'
-                    else:
-                        # Valeur par défaut pour les numériques
-                        if col.startswith('gk_'):
-                            processed_data[col] = 50.0  # Moyen pour gardien
-                        else:
-                            processed_data[col] = 50.0  # Valeur moyenne
-            
-            # Créer le DataFrame avec l'ordre correct des colonnes
-            df = pd.DataFrame([processed_data])
-            
-            # Réorganiser les colonnes pour correspondre à l'ordre attendu
-            df = df[self.expected_columns]
-            
-            # Vérifier les types
-            for col in self.categorical_columns:
-                if col in df.columns:
-                    df[col] = df[col].astype(str)
-            
-            for col in self.numerical_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(50.0)
-            
-            logger.info(f"DataFrame préparé - Shape: {df.shape}")
-            logger.info(f"Colonnes: {df.columns.tolist()}")
+            logger.debug(f"DataFrame préparé - Shape: {df.shape}")
             
             return df
             
@@ -199,40 +269,44 @@ class PredictionService:
     def predict_single(self, data: Dict) -> Dict:
         """Make prediction for single input"""
         try:
-            logger.info(f"Début prédiction avec données: {data}")
+            log_payload(logger, lambda: f"Début prédiction avec données: {data}")
             
             # Validation basique
             if not data or not isinstance(data, dict):
                 raise ValueError("Données invalides ou vides")
             
-            # Préparer les données
-            input_df = self.prepare_single_input(data)
-            
-            # Vérifier que le DataFrame n'est pas vide
-            if input_df.empty:
-                raise ValueError("Le DataFrame préparé est vide")
-            
-            # Log pour débogage
-            logger.info(f"DataFrame avant transformation - Colonnes: {input_df.columns.tolist()}")
-            
-            # Transformer les données
-            transformed_data = self.transformer.transform(input_df)
-            logger.info(f"Données transformées shape: {transformed_data.shape}")
-            
-            # Faire la prédiction
-            prediction = self.model.predict(transformed_data)
-            logger.info(f"Prédiction brute: {prediction}")
-            
-            # Transformation inverse pour la cible
-            final_prediction = np.round(
-                self.target_pipeline.inverse_transform(prediction.reshape(-1, 1)), 2
-            )
-            logger.info(f"Prédiction finale: {final_prediction}")
+            # Une seule version du modèle pour toute la requête, même pendant une bascule
+            bundle = self.bundle
+            
+            # Préparer les données (lignes NumPy, sans DataFrame)
+            with stage_timer('prepare'):
+                numeric, categorical = self.prepare_single_row(data, bundle)
+            
+            # Même vecteur normalisé, même modèle : réutiliser la prédiction en cache
+            cache_key = None
+            final_prediction = None
+            if self.prediction_cache is not None:
+                with stage_timer('cache_lookup'):
+                    cache_identity = self.cache_identity(bundle)
+                    cache_key = feature_fingerprint(numeric, categorical)
+                    final_prediction = self.prediction_cache.get(cache_key, identity=cache_identity)
+            
+            # Transformer, prédire et inverser la cible (regroupé si le micro-batching est actif)
+            if final_prediction is None:
+                if self.batcher is not None:
+                    with stage_timer('batcher_wait'):
+                        final_prediction = self.batcher.submit((bundle, numeric, categorical))
+                else:
+                    final_prediction = bundle.score_rows(numeric[np.newaxis, :], categorical[np.newaxis, :])[0]
+                if cache_key is not None:
+                    self.prediction_cache.put(cache_key, float(final_prediction), identity=cache_identity)
+            ROWS_TOTAL.labels('single').inc()
+            log_payload(logger, lambda: f"Prédiction finale: {final_prediction}")
             
             return {
-                'prediction': float(final_prediction[0, 0]),
+                'prediction': float(final_prediction),
                 'success': True,
-                'columns_used': input_df.columns.tolist()
+                'columns_used': list(bundle.expected_columns)
             }
             
         except Exception as e:
@@ -243,6 +317,239 @@ class PredictionService:
                 'input_data': data if isinstance(data, dict) else str(data)
             }
     
+    def what_if(self, data: Dict, scenarios: Optional[List[Dict]] = None,
+                steps: Optional[List[float]] = None, attributes: Optional[List[str]] = None) -> Dict:
+        """Score attribute changes around one player in a single matrix pass.
+
+        ``scenarios`` are {attribute: delta} dicts applied together; ``steps``
+        sweeps each attribute of ``attributes`` (default: every numeric
+        attribute) on its own. Deltas are in rating points (0-100 scale) and
+        the changed values are clipped to that range.
+        """
+        if not data or not isinstance(data, dict):
+            raise ValueError("Données invalides ou vides")
+        scenarios = scenarios or []
+        steps = [float(step) for step in (steps or [])]
+        
+        bundle = self.bundle
+        columns = bundle.input_schema.numerical_columns
+        index = {col: i for i, col in enumerate(columns)}
+        
+        for scenario in scenarios:
+            unknown = [attr for attr in scenario if attr not in index]
+            if unknown:
+                raise ValueError(f"Attributs inconnus: {unknown}")
+        if steps:
+            attributes = list(attributes or columns)
+            unknown = [attr for attr in attributes if attr not in index]
+            if unknown:
+                raise ValueError(f"Attributs inconnus: {unknown}")
+        else:
+            attributes = []
+        
+        n_variants = 1 + len(scenarios) + len(attributes) * len(steps)
+        max_variants = int(os.getenv('WHATIF_MAX_VARIANTS', '5000'))
+        if n_variants > max_variants:
+            raise ValueError(f"Trop de variantes ({n_variants} > {max_variants})")
+        
+        with stage_timer('prepare'):
+            base, categorical = self.prepare_single_row(data, bundle)
+            
+            # Ligne 0 : joueur de base, puis scénarios, puis balayage attribut x pas
+            numeric = np.repeat(base[np.newaxis, :], n_variants, axis=0)
+            # Seules les valeurs modifiées sont bornées : la ligne 0 reste celle scorée par /single
+            for row, scenario in enumerate(scenarios, start=1):
+                for attr, delta in scenario.items():
+                    numeric[row, index[attr]] = min(max(numeric[row, index[attr]] + float(delta), 0.0), 100.0)
+            if steps:
+                sweep_rows = np.arange(1 + len(scenarios), n_variants)
+                sweep_cols = np.repeat([index[attr] for attr in attributes], len(steps))
+                numeric[sweep_rows, sweep_cols] = np.clip(
+                    numeric[sweep_rows, sweep_cols] + np.tile(steps, len(attributes)), 0.0, 100.0
+                )
+            categorical = np.repeat(categorical[np.newaxis, :], n_variants, axis=0)
+        
+        predictions = np.asarray(bundle.score_rows(numeric, categorical), dtype=np.float64).reshape(-1)
+        ROWS_TOTAL.labels('whatif').inc(n_variants)
+        
+        base_prediction = float(predictions[0])
+        result = {
+            'success': True,
+            'base_prediction': base_prediction,
+            'variants_scored': n_variants,
+            'scenarios': [
+                {
+                    'deltas': scenario,
+                    'prediction': float(prediction),
+                    'change': round(float(prediction) - base_prediction, 2)
+                }
+                for scenario, prediction in zip(scenarios, predictions[1:1 + len(scenarios)])
+            ]
+        }
+        
+        if steps:
+            # Tableau compact : une ligne par attribut, une colonne par pas
+            changes = np.round(predictions[1 + len(scenarios):].reshape(len(attributes), len(steps)) - base_prediction, 2)
+            best = changes.max(axis=1)
+            result['sensitivity'] = {
+                'attributes': attributes,
+                'steps': steps,
+                'base_values': [float(base[index[attr]]) for attr in attributes],
+                'changes': changes.tolist(),
+                'ranking': [attributes[i] for i in np.argsort(-best, kind='stable')]
+            }
+        return result
+    
+    def transform_rows(self, numeric: np.ndarray, categorical: np.ndarray,
+                       bundle: Optional[ModelBundle] = None) -> np.ndarray:
+        """Map prepared (numeric, categorical) rows to the model feature matrix"""
+        return (bundle or self.bundle).transform_rows(numeric, categorical)
+    
+    def score_transformed(self, transformed_data: np.ndarray, bundle: Optional[ModelBundle] = None) -> np.ndarray:
+        """Predict on transformed features and inverse the target scaling"""
+        return (bundle or self.bundle).score_transformed(transformed_data)
+    
+    def score_rows(self, numeric: np.ndarray, categorical: np.ndarray,
+                   bundle: Optional[ModelBundle] = None) -> np.ndarray:
+        """Transform prepared rows, predict and inverse the target scaling"""
+        return (bundle or self.bundle).score_rows(numeric, categorical)
+    
+    def score_frame(self, df: pd.DataFrame, bundle: Optional[ModelBundle] = None) -> np.ndarray:
+        """Score a prepared DataFrame (expected columns, cleaned types)"""
+        bundle = bundle or self.bundle
+        parallel = self.parallel_scorer is not None and len(df) >= self.parallel_min_rows
+        if bundle.feature_encoder is None and not parallel:
+            with stage_timer('transform'):
+                transformed = bundle.transformer.transform(df)
+            return bundle.score_transformed(transformed)
+        
+        numeric = df[bundle.input_schema.numerical_columns].to_numpy(dtype=np.float64)
+        categorical = df[bundle.input_schema.categorical_columns].to_numpy(dtype=object)
+        
+        if parallel:
+            # Shards répartis sur le pool de processus, réassemblés dans l'ordre
+            with stage_timer('parallel_score'):
+                return self.parallel_scorer.score(numeric, categorical, version=(bundle.version, bundle.paths))
+        return bundle.score_rows(numeric, categorical)
+    
+    def score_batch_frame(self, df: pd.DataFrame, bundle: Optional[ModelBundle] = None,
+                          reuse: Optional[ReuseStats] = None) -> np.ndarray:
+        """Score a prepared batch once per distinct feature vector.
+        
+        Rows with the same normalised vector (a player repeated across
+        snapshots) are scored once; vectors already scored by the same model
+        version (earlier uploads, /single calls) come from the prediction
+        cache and newly scored ones are added to it.
+        """
+        bundle = bundle or self.bundle
+        n_rows = len(df)
+        if not self.batch_dedup or n_rows == 0:
+            if reuse is not None:
+                reuse.add(n_rows, n_rows, 0, n_rows)
+            return self.score_frame(df, bundle)
+        
+        with stage_timer('dedup'):
+            numeric = df[bundle.input_schema.numerical_columns].to_numpy(dtype=np.float64)
+            categorical = df[bundle.input_schema.categorical_columns].to_numpy(dtype=object)
+            first, inverse = unique_rows(numeric, categorical)
+        
+        unique_predictions = np.empty(len(first), dtype=np.float64)
+        pending = np.arange(len(first))
+        keys = None
+        if self.prediction_cache is not None:
+            with stage_timer('cache_lookup'):
+                cache_identity = self.cache_identity(bundle)
+                keys = [feature_fingerprint(numeric[i], categorical[i]) for i in first]
+                found = self.prediction_cache.get_many(keys, identity=cache_identity)
+                if found:
+                    cached = np.array([key in found for key in keys])
+                    unique_predictions[cached] = [found[key] for key in keys if key in found]
+                    pending = np.flatnonzero(~cached)
+        
+        if len(pending):
+            # Seules les lignes jamais vues passent par le modèle
+            scored = np.asarray(self.score_frame(df.iloc[first[pending]], bundle), dtype=np.float64).reshape(-1)
+            unique_predictions[pending] = scored
+            if keys is not None:
+                self.prediction_cache.put_many(
+                    {keys[i]: float(value) for i, value in zip(pending, scored)}, identity=cache_identity
+                )
+        
+        if reuse is not None:
+            reuse.add(n_rows, len(first), len(first) - len(pending), len(pending))
+        return unique_predictions[inverse]
+    
+    def index_batch(self, index: Optional[SimilarityIndex], original_df: pd.DataFrame, df: pd.DataFrame,
+                    final_predictions: np.ndarray, bundle: Optional[ModelBundle] = None):
+        """Add scored players to a similarity index, in the transformed feature space.
+        
+        A player repeated in the batch is indexed once, with its last row;
+        indexing errors are logged and never fail the batch.
+        """
+        if index is None or len(df) == 0:
+            return
+        bundle = bundle or self.bundle
+        try:
+            with stage_timer('similarity_index'):
+                id_col, name_col, _ = self.identity_columns(original_df)
+                lookup = [col for col in (id_col, name_col) if col is not None]
+                resolved = dict(zip(lookup, frame_json_columns(original_df, lookup)))
+                keys = [None if value in (None, '') else value for value in resolved.get(id_col, [None] * len(df))]
+                names = resolved.get(name_col, [None] * len(df))
+                
+                rows = np.arange(len(df))
+                if id_col is not None:
+                    # Dernier instantané de chaque joueur seulement
+                    ids = pd.Series(keys, dtype=object)
+                    rows = rows[~(ids.notna() & ids.map(str).duplicated(keep='last')).to_numpy()]
+                numeric = df[bundle.input_schema.numerical_columns].to_numpy(dtype=np.float64)[rows]
+                categorical = df[bundle.input_schema.categorical_columns].to_numpy(dtype=object)[rows]
+                vectors = bundle.transform_rows(numeric, categorical)
+                if hasattr(vectors, 'toarray'):
+                    vectors = vectors.toarray()
+                index.add(
+                    vectors, [keys[i] for i in rows], [names[i] for i in rows],
+                    np.asarray(final_predictions, dtype=np.float64).reshape(-1)[rows],
+                    identity=self.cache_identity(bundle)
+                )
+        except Exception as e:
+            logger.warning(f"Similarity indexing skipped: {e}", exc_info=True)
+    
+    def embed_player(self, data: Dict, bundle: Optional[ModelBundle] = None) -> np.ndarray:
+        """Transformed feature vector of one player (similarity queries)"""
+        bundle = bundle or self.bundle
+        numeric, categorical = self.prepare_single_row(data, bundle)
+        vectors = bundle.transform_rows(numeric.reshape(1, -1), categorical.reshape(1, -1))
+        if hasattr(vectors, 'toarray'):
+            vectors = vectors.toarray()
+        return np.asarray(vectors, dtype=np.float32)[0]
+    
+    def score_single_rows(self, rows: List[Tuple[ModelBundle, np.ndarray, np.ndarray]]) -> List[Any]:
+        """Score several prepared single rows, one pipeline pass per model version"""
+        results = [None] * len(rows)
+        groups = {}
+        for position, (bundle, numeric, categorical) in enumerate(rows):
+            groups.setdefault(id(bundle), (bundle, []))[1].append(position)
+        
+        for bundle, positions in groups.values():
+            try:
+                numeric = np.vstack([rows[i][1] for i in positions])
+                categorical = np.vstack([rows[i][2] for i in positions])
+                for i, prediction in zip(positions, bundle.score_rows(numeric, categorical)):
+                    results[i] = float(prediction)
+                continue
+            except Exception as e:
+                logger.warning(f"Batched scoring failed, scoring rows individually: {e}")
+            
+            # Isoler l'erreur à la requête fautive
+            for i in positions:
+                _, numeric, categorical = rows[i]
+                try:
+                    results[i] = float(bundle.score_rows(numeric[np.newaxis, :], categorical[np.newaxis, :])[0])
+                except Exception as e:
+                    results[i] = e
+        return results
+    
     def clean_data_for_json(self, data):
         """Clean data to make it JSON serializable"""
         if isinstance(data, dict):
@@ -265,146 +572,253 @@ class PredictionService:
         else:
             return data
     
-    def predict_batch(self, file_path: str) -> List[Dict]:
-        """Make predictions for batch input (CSV file)"""
+    def prepare_batch_frame(self, frame: pd.DataFrame, bundle: Optional[ModelBundle] = None) -> pd.DataFrame:
+        """Build the model input frame (expected columns, defaults, cleaned types)"""
+        bundle = bundle or self.bundle
+        columns = {}
+        for col in bundle.expected_columns:
+            if col in bundle.categorical_columns:
+                if col in frame.columns:
+                    columns[col] = frame[col].astype(str)
+                else:
+                    columns[col] = default_categorical_value(col)
+            else:
+                if col not in frame.columns:
+                    columns[col] = DEFAULT_NUMERIC_VALUE
+                elif frame[col].dtype == np.float64:
+                    # Colonne déjà typée à la lecture : pas de reconversion
+                    values = frame[col]
+                    columns[col] = values.fillna(DEFAULT_NUMERIC_VALUE) if values.hasnans else values
+                else:
+                    columns[col] = pd.to_numeric(frame[col], errors='coerce').fillna(DEFAULT_NUMERIC_VALUE)
+        
+        return pd.DataFrame(columns, index=frame.index)
+    
+    def identity_columns(self, original_df: pd.DataFrame) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Id, name and image columns of an uploaded frame (first match by priority)"""
+        id_col = next((c for c in POSSIBLE_ID_COLUMNS if c in original_df.columns), None)
+        name_col = next((c for c in POSSIBLE_NAME_COLUMNS if c in original_df.columns), None)
+        image_col = next((c for c in POSSIBLE_IMAGE_COLUMNS if c in original_df.columns), None)
+        return id_col, name_col, image_col
+    
+    def build_batch_results(self, original_df: pd.DataFrame, df: pd.DataFrame,
+                            final_predictions: np.ndarray, start: int = 0,
+                            bundle: Optional[ModelBundle] = None) -> List[Dict]:
+        """Assemble JSON-ready result records column by column"""
+        keys, columns = self.build_batch_columns(original_df, df, final_predictions, start, bundle)
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+    
+    def build_batch_columns(self, original_df: pd.DataFrame, df: pd.DataFrame,
+                            final_predictions: np.ndarray, start: int = 0,
+                            bundle: Optional[ModelBundle] = None,
+                            json_ready: bool = True) -> Tuple[List[str], List[Any]]:
+        """Keys and value columns of the batch result records.
+        
+        ``json_ready=False`` keeps the attribute columns as numpy arrays (same
+        values once converted with json_column) for the result store.
+        """
+        expected_columns = (bundle or self.bundle).expected_columns
+        n_rows = len(df)
+        positions = range(start + 1, start + n_rows + 1)
+        
+        # Résoudre une seule fois les colonnes id / nom / image
+        id_col, name_col, image_col = self.identity_columns(original_df)
+        
+        lookup = [col for col in (id_col, name_col, image_col) if col is not None]
+        resolved = dict(zip(lookup, frame_json_columns(original_df, lookup)))
+        
+        player_ids = resolved.get(id_col, [None] * n_rows)
+        player_names = resolved.get(name_col, [None] * n_rows)
+        images = resolved.get(image_col, [''] * n_rows)
+        
+        predictions = np.asarray(final_predictions, dtype=np.float64).reshape(-1)
+        to_columns = frame_json_columns if json_ready else frame_columns
+        
+        keys = ['id', 'player_id', 'prediction', 'name', 'image']
+        columns = [
+            list(positions) if json_ready else np.arange(start + 1, start + n_rows + 1),
+            [value or f'player_{i}' for i, value in zip(positions, player_ids)],
+            json_column(predictions) if json_ready else predictions,
+            [value or f'Joueur {i}' for i, value in zip(positions, player_names)],
+            images
+        ]
+        
+        # Attributs du modèle puis colonnes originales supplémentaires (les clés déjà présentes gagnent)
+        model_cols = [c for c in expected_columns if c in df.columns and c not in keys]
+        extra_cols = [
+            c for c in original_df.columns
+            if c not in expected_columns and c not in keys
+        ]
+        keys.extend(model_cols)
+        columns.extend(to_columns(df, model_cols))
+        keys.extend(extra_cols)
+        columns.extend(to_columns(original_df, extra_cols))
+        
+        return keys, columns
+    
+    def build_batch_frame(self, original_df: pd.DataFrame, df: pd.DataFrame,
+                          final_predictions: np.ndarray, start: int = 0,
+                          bundle: Optional[ModelBundle] = None) -> pd.DataFrame:
+        """Same records as build_batch_results, as a typed frame for columnar output"""
+        expected_columns = (bundle or self.bundle).expected_columns
+        n_rows = len(df)
+        positions = np.arange(start + 1, start + n_rows + 1)
+        id_col, name_col, image_col = self.identity_columns(original_df)
+        
+        def with_default(col, template):
+            defaults = pd.Series([template.format(i) for i in positions], dtype=object)
+            if col is None:
+                return defaults
+            values = original_df[col].reset_index(drop=True)
+            missing = values.isna() | (values.astype(str) == '')
+            if not missing.any():
+                return values
+            # Valeurs par défaut textuelles : une seule colonne de chaînes
+            return values.astype(object).where(~missing, defaults).astype(str)
+        
+        columns = {
+            'id': positions,
+            'player_id': with_default(id_col, 'player_{}'),
+            'prediction': np.asarray(final_predictions, dtype=np.float64).reshape(-1),
+            'name': with_default(name_col, 'Joueur {}'),
+            'image': (original_df[image_col].reset_index(drop=True).fillna('') if image_col is not None
+                      else pd.Series([''] * n_rows, dtype=object))
+        }
+        for col in expected_columns:
+            if col in df.columns and col not in columns:
+                columns[col] = df[col].reset_index(drop=True)
+        for col in original_df.columns:
+            if col not in expected_columns and col not in columns:
+                columns[col] = original_df[col].reset_index(drop=True)
+        return pd.DataFrame(columns)
+    
+    def batch_input_columns(self, bundle: ModelBundle) -> List[str]:
+        """Columns read from columnar uploads: model inputs plus id/name/image"""
+        return list(bundle.expected_columns) + POSSIBLE_ID_COLUMNS + POSSIBLE_NAME_COLUMNS + POSSIBLE_IMAGE_COLUMNS
+    
+    def batch_csv_dtypes(self, bundle: ModelBundle) -> Dict[str, str]:
+        """Explicit CSV dtypes: categorical model columns as category"""
+        return batch_io.csv_dtypes(bundle.categorical_columns)
+    
+    def read_batch_file(self, file_path, file_format: str, bundle: ModelBundle) -> pd.DataFrame:
+        """Read an uploaded batch file (path, or upload stream for CSV); columnar formats only read the useful columns"""
+        if file_format == 'csv':
+            return batch_io.read_csv(file_path, self.batch_csv_dtypes(bundle))
+        columns = batch_io.projected_columns(file_path, file_format, self.batch_input_columns(bundle))
+        return batch_io.read_frame(file_path, file_format, columns)
+    
+    def score_batch_file(self, file_path, file_format: Optional[str] = None,
+                         reuse: Optional[ReuseStats] = None, index: Optional[SimilarityIndex] = None):
+        """Read, prepare and score a batch file: (original frame, model frame, predictions, bundle)"""
+        file_format = file_format or batch_io.detect_format(file_path) or 'csv'
+        bundle = self.bundle
+        
+        # Lire le fichier (les données originales ne sont pas modifiées)
+        with stage_timer('read_csv'):
+            original_df = self.read_batch_file(file_path, file_format, bundle)
+        logger.info(f"{file_format.upper()} chargé - Shape: {original_df.shape}")
+        log_payload(logger, lambda: f"Colonnes: {original_df.columns.tolist()}")
+        
+        # Colonnes attendues, valeurs par défaut et conversion des types
+        with stage_timer('prepare'):
+            df = self.prepare_batch_frame(original_df, bundle)
+        
+        # Transformer, prédire et inverser la cible (une fois par vecteur distinct)
+        final_predictions = self.score_batch_frame(df, bundle, reuse)
+        self.index_batch(index, original_df, df, final_predictions, bundle)
+        return original_df, df, final_predictions, bundle
+    
+    def predict_batch(self, file_path, file_format: Optional[str] = None,
+                      reuse: Optional[ReuseStats] = None, index: Optional[SimilarityIndex] = None) -> List[Dict]:
+        """Make predictions for batch input (CSV, Parquet, Arrow or Feather file)"""
         try:
             logger.info(f"Batch prediction pour le fichier: {file_path}")
+            original_df, df, final_predictions, bundle = self.score_batch_file(file_path, file_format, reuse, index)
             
-            # Lire le CSV
-            df = pd.read_csv(file_path)
-            logger.info(f"CSV chargé - Shape: {df.shape}, Colonnes: {df.columns.tolist()}")
-            
-            # Garder une copie des données originales
-            original_df = df.copy()
-            
-            # Vérifier et préparer les colonnes manquantes
-            for col in self.expected_columns:
-                if col not in df.columns:
-                    if col in self.categorical_columns:
-                        if col == 'preferred_foot':
-                            df[col] = 'right'
-                        elif 'work_rate' in col:
-                            df[col] = 'medium'
-                        else:
-                            df[col] = 'unknown'
-                    else:
-                        df[col] = 50.0
-            
-            # Réorganiser les colonnes
-            df = df[self.expected_columns]
-            
-            # Convertir les types
-            for col in self.categorical_columns:
-                if col in df.columns:
-                    df[col] = df[col].astype(str)
-            
-            for col in self.numerical_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(50.0)
-            
-            # Transformer les données
-            transformed_data = self.transformer.transform(df)
-            logger.info(f"Batch transformé - Shape: {transformed_data.shape}")
-            
-            # Faire les prédictions
-            predictions = self.model.predict(transformed_data)
-            
-            # Transformation inverse
-            final_predictions = np.round(
-                self.target_pipeline.inverse_transform(predictions.reshape(-1, 1)), 2
-            )
-            
-            # Préparer les résultats avec TOUTES les données
-            results = []
-            for i in range(len(df)):
-                player_id = None
-                player_name = None
-                
-                # Essayer de trouver l'ID et le nom dans différentes colonnes possibles
-                possible_id_cols = ['player_fifa_api_id', 'player_id', 'id', 'sofifa_id']
-                possible_name_cols = ['player_name', 'name', 'short_name', 'long_name']
-                
-                for id_col in possible_id_cols:
-                    if id_col in original_df.columns:
-                        player_id = original_df.iloc[i][id_col]
-                        break
-                
-                for name_col in possible_name_cols:
-                    if name_col in original_df.columns:
-                        player_name = original_df.iloc[i][name_col]
-                        break
-                
-                # Préparer les données complètes du joueur
-                player_data = {}
-                
-                # Ajouter les attributs transformés
-                for col in self.expected_columns:
-                    if col in df.columns:
-                        val = df.iloc[i][col]
-                        # Convertir les types pandas/numpy en types Python natifs
-                        if pd.isna(val):
-                            player_data[col] = None
-                        elif isinstance(val, (np.integer, np.int64)):
-                            player_data[col] = int(val)
-                        elif isinstance(val, (np.floating, np.float64)):
-                            if np.isnan(val) or np.isinf(val):
-                                player_data[col] = None
-                            else:
-                                player_data[col] = float(val)
-                        elif isinstance(val, str):
-                            player_data[col] = str(val)
-                        else:
-                            player_data[col] = val
-                
-                # Ajouter les données originales supplémentaires
-                for col in original_df.columns:
-                    if col not in self.expected_columns:
-                        val = original_df.iloc[i][col]
-                        # Nettoyer les données pour JSON
-                        if pd.isna(val):
-                            player_data[col] = None
-                        elif isinstance(val, (np.integer, np.int64)):
-                            player_data[col] = int(val)
-                        elif isinstance(val, (np.floating, np.float64)):
-                            if np.isnan(val) or np.isinf(val):
-                                player_data[col] = None
-                            else:
-                                player_data[col] = float(val)
-                        elif isinstance(val, pd.Timestamp):
-                            player_data[col] = val.isoformat()
-                        elif isinstance(val, str):
-                            player_data[col] = str(val)
-                        else:
-                            player_data[col] = val
-                
-                # Créer le résultat final
-                result = {
-                    'id': i + 1,
-                    'player_id': self.clean_data_for_json(player_id) or f'player_{i+1}',
-                    'prediction': float(final_predictions[i, 0]) if not np.isnan(final_predictions[i, 0]) else None,
-                    'name': self.clean_data_for_json(player_name) or f'Joueur {i+1}',
-                    'image': self.clean_data_for_json(original_df.iloc[i].get('player_img', original_df.iloc[i].get('image', '')))
-                }
-                
-                # Fusionner avec toutes les données du joueur
-                for key, value in player_data.items():
-                    if key not in result:  # Éviter les doublons
-                        result[key] = self.clean_data_for_json(value)
-                
-                results.append(result)
+            # Résultats avec TOUTES les données, construits par colonnes
+            with stage_timer('results'):
+                results = self.build_batch_results(original_df, df, final_predictions, bundle=bundle)
+            ROWS_TOTAL.labels('batch').inc(len(results))
             
             logger.info(f"Batch prédiction terminée - {len(results)} joueurs")
-            logger.info(f"Premier résultat: {results[0] if results else 'Aucun résultat'}")
-            
-            # Nettoyer tous les résultats pour JSON
-            cleaned_results = self.clean_data_for_json(results)
+            log_payload(logger, lambda: f"Premier résultat: {results[0] if results else 'Aucun résultat'}")
             
-            return cleaned_results
+            return results
             
         except Exception as e:
             logger.error(f"Batch prediction error: {e}", exc_info=True)
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise ValueError(f"Erreur de prédiction par lot: {str(e)}")
+    
+    def predict_batch_columns(self, file_path, file_format: Optional[str] = None,
+                              reuse: Optional[ReuseStats] = None,
+                              index: Optional[SimilarityIndex] = None) -> Tuple[List[str], List[Any]]:
+        """Batch results as keys and typed value columns (for the server-side result store)"""
+        try:
+            original_df, df, final_predictions, bundle = self.score_batch_file(file_path, file_format, reuse, index)
+            with stage_timer('results'):
+                keys, columns = self.build_batch_columns(original_df, df, final_predictions, bundle=bundle,
+                                                         json_ready=False)
+            ROWS_TOTAL.labels('batch').inc(len(df))
+            return keys, columns
+            
+        except Exception as e:
+            logger.error(f"Batch prediction error: {e}", exc_info=True)
+            raise ValueError(f"Erreur de prédiction par lot: {str(e)}")
+    
+    def predict_batch_frame(self, file_path, file_format: Optional[str] = None,
+                            reuse: Optional[ReuseStats] = None, index: Optional[SimilarityIndex] = None) -> pd.DataFrame:
+        """Batch predictions as a typed frame (for Parquet/Arrow/Feather responses)"""
+        try:
+            original_df, df, final_predictions, bundle = self.score_batch_file(file_path, file_format, reuse, index)
+            with stage_timer('results'):
+                frame = self.build_batch_frame(original_df, df, final_predictions, bundle=bundle)
+            ROWS_TOTAL.labels('batch').inc(len(frame))
+            return frame
+            
+        except Exception as e:
+            logger.error(f"Batch prediction error: {e}", exc_info=True)
+            raise ValueError(f"Erreur de prédiction par lot: {str(e)}")
+
+    def iter_batch_predictions(self, file_path, chunk_rows: int = 5000,
+                               source: str = 'stream', file_format: Optional[str] = None,
+                               reuse: Optional[ReuseStats] = None,
+                               index: Optional[SimilarityIndex] = None) -> Iterator[List[Dict]]:
+        """Yield batch prediction results chunk by chunk (constant memory)"""
+        logger.info(f"Batch prediction en streaming pour le fichier: {file_path} (chunks de {chunk_rows} lignes)")
+        
+        # Tout le fichier est scoré par la version active au démarrage
+        bundle = self.bundle
+        rows = ROWS_TOTAL.labels(source)
+        file_format = file_format or batch_io.detect_format(file_path) or 'csv'
+        if file_format == 'csv':
+            reader = batch_io.read_csv(file_path, self.batch_csv_dtypes(bundle), chunk_rows, bundle.expected_columns)
+        else:
+            columns = batch_io.projected_columns(file_path, file_format, self.batch_input_columns(bundle))
+            reader = batch_io.iter_frames(file_path, file_format, chunk_rows, columns)
+        start = 0
+        while True:
+            with stage_timer('read_csv'):
+                original_df = next(reader, None)
+            if original_df is None:
+                break
+            
+            try:
+                with stage_timer('prepare'):
+                    df = self.prepare_batch_frame(original_df, bundle)
+                final_predictions = self.score_batch_frame(df, bundle, reuse)
+                self.index_batch(index, original_df, df, final_predictions, bundle)
+                with stage_timer('results'):
+                    results = self.build_batch_results(original_df, df, final_predictions, start=start, bundle=bundle)
+            except Exception as e:
+                logger.error(f"Streaming batch prediction error at row {start}: {e}", exc_info=True)
+                raise ValueError(f"Erreur de prédiction par lot (ligne {start + 1}): {str(e)}")
+            
+            start += len(original_df)
+            rows.inc(len(results))
+            yield results
+        
+        logger.info(f"Batch prédiction en streaming terminée - {start} joueurs")
 
 # Global instance
 prediction_service = PredictionService()
\ No newline at end of file
@@ -1,16 +1,78 @@
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List
 import logging
+import numpy as np
+import pandas as pd
+from app.services.advice_cache import AdviceCache
 
 logger = logging.getLogger(__name__)
 
+
+class ThresholdTable:
+    """attribute_thresholds.json compiled into arrays aligned on one attribute order"""
+    
+    def __init__(self, thresholds: Dict):
+        self.thresholds = thresholds
+        self.attributes = [attr for attr, spec in thresholds.items() if 'seuil' in spec]
+        self.seuils = np.array([float(thresholds[attr]['seuil']) for attr in self.attributes], dtype=np.float64)
+        self.images = {attr: thresholds[attr].get('image', '') for attr in self.attributes}
+    
+    def gap_matrix(self, players: List[Dict]) -> np.ndarray:
+        """Threshold minus value for every player and attribute (NaN when missing or not numeric)"""
+        frame = pd.DataFrame.from_records(players, columns=self.attributes)
+        values = frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        return self.seuils[np.newaxis, :] - values
+    
+    def top_weaknesses(self, gaps: np.ndarray, top_k: int):
+        """Column indices of the top_k largest positive gaps per row, largest first, and their count"""
+        # NaN et attributs au-dessus du seuil exclus
+        masked = np.where(gaps > 0, gaps, -np.inf)
+        k = min(top_k, masked.shape[1])
+        if k < masked.shape[1]:
+            candidates = np.argpartition(-masked, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(masked.shape[1]), masked.shape)
+        order = np.argsort(-np.take_along_axis(masked, candidates, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(candidates, order, axis=1)
+        return top, np.take_along_axis(masked, top, axis=1) > 0
+
 class RecommendationService:
-    def __init__(self):
+    def __init__(self, gemini_client=None):
         self.gemini_client = None
         self.thresholds = None
+        self.threshold_table = None
+        self.thresholds_path = None
+        self._thresholds_mtime = None
+        self._thresholds_checked_at = 0.0
+        self.thresholds_check_seconds = float(os.getenv('THRESHOLDS_RELOAD_SECONDS', '5'))
+        self.advice_cache = None
+        self.advice_timeout = float(os.getenv('ADVICE_TIMEOUT_SECONDS', '10'))
+        # Attente totale d'un lot de conseils, quel que soit le nombre d'attributs
+        self.advice_deadline = float(os.getenv('ADVICE_DEADLINE_SECONDS', str(2 * self.advice_timeout)))
+        self.advice_concurrency = max(1, int(os.getenv('ADVICE_MAX_CONCURRENCY', '4')))
+        self._advice_executor = None
+        self._executor_lock = threading.Lock()
         self.load_thresholds()
-        self.init_gemini()
+        self.init_advice_cache()
+        
+        # Un client fourni (ex. stub local en test) remplace genai.Client
+        if gemini_client is not None:
+            self.gemini_client = gemini_client
+        else:
+            self.init_gemini()
+    
+    def init_advice_cache(self):
+        """Advice cache with TTL, persisted on disk unless ADVICE_CACHE_PATH is empty"""
+        ttl = float(os.getenv('ADVICE_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+        db_path = os.getenv('ADVICE_CACHE_PATH', os.path.join(
+            os.path.dirname(__file__),
+            '../../data/advice_cache.sqlite'
+        ))
+        self.advice_cache = AdviceCache(ttl_seconds=ttl, db_path=db_path or None)
     
     def init_gemini(self):
         """Initialize Gemini AI client"""
@@ -19,7 +81,10 @@ class RecommendationService:
             if api_key and api_key != "dev-mode-no-gemini":
                 # Import conditionnel pour éviter l'erreur
                 from google import genai
-                self.gemini_client = genai.Client(api_key=api_key)
+                # Délai HTTP par appel (ms) : un appel bloqué libère son worker
+                self.gemini_client = genai.Client(
+                    api_key=api_key, http_options={'timeout': int(self.advice_timeout * 1000)}
+                )
                 logger.info("Gemini AI client initialized")
         except ImportError:
             logger.warning("Google Generative AI not installed, using fallback recommendations")
@@ -29,36 +94,123 @@ class RecommendationService:
     def load_thresholds(self):
         """Load attribute thresholds"""
         try:
-            thresholds_path = os.path.join(
+            thresholds_path = os.getenv('THRESHOLDS_PATH', os.path.join(
                 os.path.dirname(__file__), 
                 '../../data/attribute_thresholds.json'
-            )
+            ))
+            self.thresholds_path = thresholds_path
+            mtime = os.stat(thresholds_path).st_mtime_ns
             with open(thresholds_path, 'r') as f:
-                self.thresholds = json.load(f)
+                thresholds = json.load(f)
+            table = ThresholdTable(thresholds)
+            # Dictionnaire et tableaux remplacés ensemble
+            self.thresholds, self.threshold_table = thresholds, table
+            self._thresholds_mtime = mtime
         except Exception as e:
             logger.error(f"Error loading thresholds: {e}")
-            self.thresholds = {}
+            # Fichier en cours d'écriture : garder la version précédente
+            if self.thresholds is None:
+                self.thresholds = {}
+                self.threshold_table = ThresholdTable({})
+    
+    def refresh_thresholds(self):
+        """Reload the thresholds file when it changed on disk (checked every few seconds)"""
+        now = time.monotonic()
+        if self.thresholds_path is None or now - self._thresholds_checked_at < self.thresholds_check_seconds:
+            return
+        self._thresholds_checked_at = now
+        try:
+            mtime = os.stat(self.thresholds_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._thresholds_mtime:
+            logger.info(f"Thresholds file changed, reloading {self.thresholds_path}")
+            self.load_thresholds()
+    
+    def fetch_gemini_advice(self, attribute: str) -> str:
+        """Ask Gemini for training advice (raises on failure)"""
+        prompt = f"""
+        As a professional football coach, provide concise training advice (max 50 words) 
+        to improve a player's {attribute}. Focus on practical exercises and techniques.
+        """
+        
+        response = self.gemini_client.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=prompt,
+        )
+        return response.text.strip()
     
     def generate_training_advice(self, attribute: str) -> str:
         """Generate training advice using Gemini AI or fallback"""
-        # Essayer Gemini si disponible
-        if self.gemini_client:
-            try:
-                prompt = f"""
-                As a professional football coach, provide concise training advice (max 50 words) 
-                to improve a player's {attribute}. Focus on practical exercises and techniques.
-                """
-                
-                response = self.gemini_client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=prompt,
+        return self.generate_training_advice_many([attribute])[attribute]
+    
+    def generate_training_advice_many(self, attributes: List[str]) -> Dict[str, str]:
+        """Advice for several attributes: cache first, concurrent Gemini calls for misses"""
+        attributes = list(dict.fromkeys(attributes))
+        if not self.gemini_client:
+            return {attribute: self.get_fallback_advice(attribute) for attribute in attributes}
+        
+        advice = self.advice_cache.get_many(attributes)
+        missing = [attribute for attribute in attributes if attribute not in advice]
+        if missing:
+            advice.update(self.fetch_gemini_advice_many(missing))
+        return advice
+    
+    def advice_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._advice_executor is None:
+                self._advice_executor = ThreadPoolExecutor(
+                    max_workers=self.advice_concurrency, thread_name_prefix='gemini-advice'
                 )
-                return response.text.strip()
-            except Exception as e:
-                logger.warning(f"Gemini AI failed, using fallback: {e}")
+            return self._advice_executor
+    
+    def fetch_gemini_advice_many(self, attributes: List[str]) -> Dict[str, str]:
+        """Fetch advice concurrently (bounded), falling back per attribute on error or timeout.
+        
+        Each call gets ``advice_timeout`` from its start and the whole fetch
+        ``advice_deadline``, whatever the number of attributes. Calls still
+        queued at the deadline are cancelled and never reach Gemini.
+        """
+        deadline = time.monotonic() + self.advice_deadline
+        started = {}
         
-        # Fallback vers les recommandations prédéfinies
-        return self.get_fallback_advice(attribute)
+        def call(attribute):
+            if time.monotonic() >= deadline:
+                # L'appelant a déjà répondu avec le repli : ne pas occuper un worker
+                raise TimeoutError('advice deadline exceeded')
+            started[attribute] = time.monotonic()
+            return self.fetch_gemini_advice(attribute)
+        
+        executor = self.advice_executor()
+        futures = [(attribute, executor.submit(call, attribute)) for attribute in attributes]
+        advice = {}
+        
+        for attribute, future in futures:
+            while True:
+                now = time.monotonic()
+                if attribute in started:
+                    limit = min(started[attribute] + self.advice_timeout, deadline)
+                else:
+                    # Pas encore démarré (file pleine) : attendre par tranches pour suivre son propre délai
+                    limit = min(now + 0.05, deadline)
+                try:
+                    text = future.result(timeout=max(0.0, limit - now))
+                    self.advice_cache.put(attribute, text)
+                    advice[attribute] = text
+                    break
+                except FutureTimeoutError:
+                    now = time.monotonic()
+                    if now >= deadline or (attribute in started and now >= started[attribute] + self.advice_timeout):
+                        logger.warning(f"Gemini advice timed out for {attribute}, using fallback")
+                        future.cancel()
+                        advice[attribute] = self.get_fallback_advice(attribute)
+                        break
+                except Exception as e:
+                    logger.warning(f"Gemini AI failed, using fallback: {e}")
+                    advice[attribute] = self.get_fallback_advice(attribute)
+                    break
+        
+        return advice
     
     def get_fallback_advice(self, attribute: str) -> str:
         """Get predefined training advice"""
@@ -106,26 +258,82 @@ class RecommendationService:
     def get_recommendations(self, player_data: Dict, prediction: float) -> List[Dict]:
         """Get personalized recommendations for player"""
         recommendations = []
+        self.refresh_thresholds()
+        thresholds = self.thresholds
         
-        for attribute, value in player_data.items():
-            if (attribute in self.thresholds and 
-                value < self.thresholds[attribute]['seuil']):
-                
-                advice = self.generate_training_advice(attribute)
-                
-                recommendations.append({
-                    'attribute': attribute,
-                    'current_value': value,
-                    'threshold': self.thresholds[attribute]['seuil'],
-                    'recommendation': advice,
-                    'image': self.thresholds[attribute].get('image', ''),
-                    'improvement_needed': self.thresholds[attribute]['seuil'] - value
-                })
+        weak_attributes = [
+            (attribute, value) for attribute, value in player_data.items()
+            if attribute in thresholds and value < thresholds[attribute]['seuil']
+        ]
+        
+        # Conseils récupérés en une fois (cache puis appels Gemini concurrents)
+        advice = self.generate_training_advice_many([attribute for attribute, _ in weak_attributes])
+        
+        for attribute, value in weak_attributes:
+            recommendations.append({
+                'attribute': attribute,
+                'current_value': value,
+                'threshold': thresholds[attribute]['seuil'],
+                'recommendation': advice[attribute],
+                'image': thresholds[attribute].get('image', ''),
+                'improvement_needed': thresholds[attribute]['seuil'] - value
+            })
         
         # Sort by improvement needed (descending)
         recommendations.sort(key=lambda x: x['improvement_needed'], reverse=True)
         
         return recommendations
+    
+    def get_recommendations_batch(self, players: List[Dict], top_k: int = 3,
+                                  include_advice: bool = True) -> Dict:
+        """Top-k weaknesses of many players from one gap matrix.
+
+        Advice text and images are returned once per attribute and
+        referenced by attribute name from each player's weaknesses.
+        """
+        self.refresh_thresholds()
+        table = self.threshold_table
+        if not players or not table.attributes or top_k <= 0:
+            return {'players': [{'index': i, 'weaknesses': [], 'weak_count': 0} for i in range(len(players))],
+                    'advice': {}, 'images': {}}
+        
+        gaps = table.gap_matrix(players)
+        weak_counts = np.count_nonzero(gaps > 0, axis=1)
+        top, valid = table.top_weaknesses(gaps, top_k)
+        
+        rows = np.arange(len(players))[:, np.newaxis]
+        top_gaps = gaps[rows, top]
+        top_seuils = table.seuils[top]
+        
+        # Conversion en listes Python une fois, puis assemblage sans scalaires NumPy
+        names = np.asarray(table.attributes, dtype=object)[top].tolist()
+        columns = zip(names, (top_seuils - top_gaps).tolist(), top_seuils.tolist(), top_gaps.tolist(),
+                      valid.tolist(), weak_counts.tolist())
+        
+        results = []
+        for i, (attributes, values, seuils, needed, keep, weak_count) in enumerate(columns):
+            weaknesses = [
+                {
+                    'attribute': attribute,
+                    'current_value': value,
+                    'threshold': seuil,
+                    'improvement_needed': gap
+                }
+                for attribute, value, seuil, gap, ok in zip(attributes, values, seuils, needed, keep) if ok
+            ]
+            result = {'index': i, 'weaknesses': weaknesses, 'weak_count': weak_count}
+            player_id = players[i].get('player_id', players[i].get('id'))
+            if player_id is not None:
+                result['player_id'] = player_id
+            results.append(result)
+        
+        used = [table.attributes[j] for j in np.unique(top[valid])]
+        advice = self.generate_training_advice_many(used) if include_advice else {}
+        return {
+            'players': results,
+            'advice': advice,
+            'images': {attribute: table.images[attribute] for attribute in used}
+        }
 
 # Global instance
 recommendation_service = RecommendationService()
\ No newline at end of file
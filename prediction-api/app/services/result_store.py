@@ -0,0 +1,315 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from app.utils.serialization import json_column
+
+logger = logging.getLogger(__name__)
+
+FILTER_OPERATORS = ('eq', 'ne', 'gt', 'gte', 'lt', 'lte', 'in')
+
+
+class ColumnIndex:
+    """Sorted row order of one result column, built once and reused by every query.
+
+    Only the permutation is kept (int32 when it fits): range filters and
+    equality are binary searches through it over the column itself, so an
+    index adds 4 bytes per row rather than a sorted copy of the values.
+    Numeric columns are ordered by value (NaN last); text columns are
+    factorised into sorted categories and ordered by category code.
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = _numeric_view(values)
+        self.numeric = self.values is not None
+        if self.numeric:
+            # argsort stable : à valeur égale, ordre d'origine des lignes (NaN en dernier)
+            order = np.argsort(self.values, kind='stable')
+            self.valid = len(order) - (int(np.count_nonzero(np.isnan(self.values))) if self.values.dtype.kind == 'f' else 0)
+        else:
+            text = pd.Series(values, dtype=object)
+            codes, categories = pd.factorize(text.map(str).where(text.notna()), sort=True)
+            self.categories = np.asarray(categories, dtype=object)
+            # Valeurs manquantes (code -1) après toutes les catégories
+            codes = np.where(codes < 0, len(self.categories), codes)
+            self.values = codes.astype(np.int32 if len(self.categories) < 2 ** 31 else np.int64)
+            order = np.argsort(self.values, kind='stable')
+            self.valid = int(np.count_nonzero(self.values < len(self.categories)))
+        self.order = order.astype(np.int32) if len(order) < 2 ** 31 else order
+        self._descending = None
+
+    def sorted_positions(self, descending: bool = False) -> np.ndarray:
+        """Row positions sorted by value; missing values stay last in both directions"""
+        if not descending:
+            return self.order
+        if self._descending is None:
+            valid = self.order[:self.valid]
+            # Ordre décroissant stable : égalités dans l'ordre d'origine
+            keys = self.values[valid].astype(np.float64, copy=False)
+            valid = valid[np.argsort(-keys, kind='stable')]
+            self._descending = np.concatenate([valid, self.order[self.valid:]])
+        return self._descending
+
+    def _search(self, target: float, side: str) -> int:
+        """Insertion point of target in the sorted valid values (like np.searchsorted)"""
+        low, high = 0, self.valid
+        while low < high:
+            middle = (low + high) // 2
+            value = self.values[self.order[middle]]
+            if value < target or (side == 'right' and value == target):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def positions(self, operator: str, value: Any) -> np.ndarray:
+        """Row positions matching ``column <operator> value`` (unordered)"""
+        if operator == 'in':
+            values = value if isinstance(value, (list, tuple)) else [value]
+            return np.concatenate([self.positions('eq', item) for item in values]) if values else np.zeros(0, dtype=np.intp)
+        if operator == 'ne':
+            excluded = np.ones(len(self.order), dtype=bool)
+            excluded[self.positions('eq', value)] = False
+            return np.flatnonzero(excluded)
+
+        target = _to_float(value) if self.numeric else self._code(value, operator)
+        bounds = {
+            'eq': ('left', 'right'),
+            'gt': ('right', None),
+            'gte': ('left', None),
+            'lt': (None, 'left'),
+            'lte': (None, 'right')
+        }
+        if operator not in bounds:
+            raise ValueError(f"Opérateur inconnu: {operator} (attendu: {', '.join(FILTER_OPERATORS)})")
+        low_side, high_side = bounds[operator]
+        low = self._search(target, low_side) if low_side else 0
+        high = self._search(target, high_side) if high_side else self.valid
+        return self.order[low:max(low, high)]
+
+    def _code(self, value: Any, operator: str) -> float:
+        """Position of a text value among the sorted categories (x.5 when absent)"""
+        text = str(value)
+        index = int(np.searchsorted(self.categories, text))
+        if index < len(self.categories) and self.categories[index] == text:
+            return index
+        if operator == 'eq':
+            return -1
+        # Valeur absente : borne entre deux catégories pour les comparaisons d'ordre
+        return index - 0.5
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Valeur numérique attendue: {value!r}")
+
+
+def _numeric_view(values: np.ndarray) -> Optional[np.ndarray]:
+    """The column itself when it is a numeric array, a float64 copy for
+    all-number object columns, None for text (and boolean) columns"""
+    if values.dtype.kind in 'iuf':
+        return values
+    if values.dtype.kind != 'O':
+        return None
+    present = [value for value in values if value is not None]
+    if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in present):
+        return None
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _stored_column(values: Any) -> np.ndarray:
+    """Numeric arrays are kept typed; lists and other columns as JSON-ready objects"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iufb':
+        # Copie des vues : une colonne extraite d'un bloc pandas garderait tout le bloc en mémoire
+        return values if values.base is None else values.copy()
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'O':
+        return values
+    column = np.empty(len(values), dtype=object)
+    column[:] = json_column(values) if isinstance(values, np.ndarray) else values
+    return column
+
+
+class StoredResult:
+    """One batch result kept column by column.
+
+    Numeric columns stay typed numpy arrays (8 bytes per value); values are
+    converted to JSON-ready Python objects only for the rows of a page.
+    """
+
+    def __init__(self, result_id: str, user_id: Optional[str], keys: List[str], columns: List[Any],
+                 meta: Optional[Dict] = None):
+        self.result_id = result_id
+        self.user_id = user_id
+        self.keys = list(keys)
+        self.columns = {key: _stored_column(values) for key, values in zip(keys, columns)}
+        self.rows = len(columns[0]) if columns else 0
+        self.meta = meta or {}
+        self.created_at = time.time()
+        self.last_access = time.monotonic()
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def index(self, column: str) -> ColumnIndex:
+        if column not in self.columns:
+            raise KeyError(column)
+        with self._lock:
+            index = self._indexes.get(column)
+            if index is None:
+                index = ColumnIndex(self.columns[column])
+                self._indexes[column] = index
+            return index
+
+    def build_indexes(self, columns: List[str]):
+        """Index the given columns ahead of the first query"""
+        for column in columns:
+            if column in self.columns:
+                self.index(column)
+
+    def matching(self, filters: List[Tuple[str, str, Any]]) -> Optional[np.ndarray]:
+        """Boolean mask of the rows matching every filter (None: no filter)"""
+        if not filters:
+            return None
+        mask = np.ones(self.rows, dtype=bool)
+        for column, operator, value in filters:
+            selected = np.zeros(self.rows, dtype=bool)
+            selected[self.index(column).positions(operator, value)] = True
+            mask &= selected
+        return mask
+
+    def query(self, filters: List[Tuple[str, str, Any]], sort_by: Optional[str] = None,
+              descending: bool = False, offset: int = 0, limit: int = 100) -> Tuple[int, np.ndarray]:
+        """Total matching rows and the positions of one page"""
+        mask = self.matching(filters)
+        if sort_by is None:
+            positions = np.arange(self.rows) if mask is None else np.flatnonzero(mask)
+        else:
+            # Ordre trié précalculé : filtrer sans retrier
+            positions = self.index(sort_by).sorted_positions(descending)
+            if mask is not None:
+                positions = positions[mask[positions]]
+        return len(positions), positions[offset:offset + limit]
+
+    def top(self, column: str, k: int, filters: List[Tuple[str, str, Any]],
+            descending: bool = True) -> Tuple[int, np.ndarray]:
+        """Best (or worst) k rows on a numeric column, read off the sorted index"""
+        index = self.index(column)
+        if not index.numeric:
+            raise ValueError(f"La colonne {column} n'est pas numérique")
+        # Valeurs manquantes exclues ; à égalité, ordre d'origine des lignes
+        positions = index.sorted_positions(descending)[:index.valid]
+        mask = self.matching(filters)
+        if mask is not None:
+            positions = positions[mask[positions]]
+        return len(positions), positions[:k]
+
+    def records(self, positions: np.ndarray) -> List[Dict]:
+        # Conversion en objets Python limitée aux lignes de la page
+        columns = [json_column(self.columns[key][positions]) for key in self.keys]
+        return [dict(zip(self.keys, values)) for values in zip(*columns)]
+
+    def iter_records(self, chunk_rows: int = 5000) -> Iterator[Dict]:
+        for start in range(0, self.rows, chunk_rows):
+            yield from self.records(np.arange(start, min(start + chunk_rows, self.rows)))
+
+    def summary(self) -> Dict:
+        return {
+            'result_id': self.result_id,
+            'total_players': self.rows,
+            'columns': self.keys,
+            'created_at': self.created_at,
+            **self.meta
+        }
+
+
+class ResultStore:
+    """In-process store of batch results, bounded in rows and age.
+
+    Results are evicted least recently used first once ``max_rows`` rows
+    are held, and dropped ``ttl_seconds`` after their last access.
+    """
+
+    def __init__(self, max_rows: int = 1000000, ttl_seconds: float = 3600,
+                 indexed_columns: Optional[List[str]] = None):
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self.indexed_columns = indexed_columns if indexed_columns is not None else ['prediction']
+        self._results = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._counters = {'stored': 0, 'evicted': 0, 'expired': 0, 'queries': 0}
+
+    def put(self, user_id: Optional[str], keys: List[str], columns: List[Any],
+            meta: Optional[Dict] = None) -> StoredResult:
+        result = StoredResult(uuid.uuid4().hex, user_id, keys, columns, meta)
+        if len(result) > self.max_rows:
+            raise ValueError(f"Résultat trop grand pour être conservé ({len(result)} > {self.max_rows} lignes)")
+        result.build_indexes(self.indexed_columns)
+
+        with self._lock:
+            self._purge_expired()
+            self._results[result.result_id] = result
+            self._rows += len(result)
+            self._counters['stored'] += 1
+            while self._rows > self.max_rows:
+                _, evicted = self._results.popitem(last=False)
+                self._rows -= len(evicted)
+                self._counters['evicted'] += 1
+        return result
+
+    def get(self, result_id: str, user_id: Optional[str] = None) -> Optional[StoredResult]:
+        with self._lock:
+            self._purge_expired()
+            result = self._results.get(result_id)
+            if result is None or (user_id is not None and result.user_id != user_id):
+                return None
+            self._results.move_to_end(result_id)
+            result.last_access = time.monotonic()
+            self._counters['queries'] += 1
+            return result
+
+    def delete(self, result_id: str, user_id: Optional[str] = None) -> bool:
+        with self._lock:
+            result = self._results.get(result_id)
+            if result is None or (user_id is not None and result.user_id != user_id):
+                return False
+            del self._results[result_id]
+            self._rows -= len(result)
+            return True
+
+    def _purge_expired(self):
+        """Drop results not read for ttl_seconds (caller holds the lock)"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        for result_id in [rid for rid, result in self._results.items() if result.last_access < cutoff]:
+            self._rows -= len(self._results.pop(result_id))
+            self._counters['expired'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(results=len(self._results), rows=self._rows, max_rows=self.max_rows)
+        return stats
+
+
+def create_result_store() -> ResultStore:
+    indexed = os.getenv('RESULT_STORE_INDEXED_COLUMNS', 'prediction')
+    return ResultStore(
+        max_rows=int(os.getenv('RESULT_STORE_MAX_ROWS', '1000000')),
+        ttl_seconds=float(os.getenv('RESULT_STORE_TTL_SECONDS', '3600')),
+        indexed_columns=[col.strip() for col in indexed.split(',') if col.strip()]
+    )
+
+
+# Global instance
+result_store = create_result_store()
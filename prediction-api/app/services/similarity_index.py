@@ -0,0 +1,394 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SimilarityIndex:
+    """k-nearest-neighbour index over transformed player features (Euclidean).
+
+    Small corpora are searched exactly, block by block. From ``ivf_min_rows``
+    players an inverted-file index is used: k-means partitions, of which
+    the ``n_probe`` closest to the query are scanned. New players are
+    appended to their nearest partition; the partitions are retrained (and
+    rebuilt) once the corpus has doubled since the last training. Scoring a
+    known player_id again replaces its vector.
+    """
+
+    def __init__(self, identity: str = '', ivf_min_rows: int = 20000, n_probe: int = 16,
+                 block_rows: int = 16384, max_rows: int = 500000, seed: int = 0,
+                 on_add: Optional[Callable[['SimilarityIndex'], None]] = None):
+        self.identity = identity
+        self.ivf_min_rows = ivf_min_rows
+        self.n_probe = n_probe
+        self.block_rows = block_rows
+        self.max_rows = max_rows
+        self.seed = seed
+        self.on_add = on_add
+        self.last_access = time.monotonic()
+        self._lock = threading.RLock()
+        self._counters = {'added': 0, 'updated': 0, 'dropped': 0, 'queries': 0, 'trainings': 0}
+        self.reset(identity)
+
+    def reset(self, identity: str = ''):
+        with self._lock:
+            self.identity = identity
+            self._rows = 0
+            self._vectors = None
+            self._sq_norms = None
+            self._keys = np.empty(0, dtype=object)
+            self._names = np.empty(0, dtype=object)
+            self._predictions = np.empty(0, dtype=np.float64)
+            self._positions = {}
+            self._centroids = None
+            self._assign = np.empty(0, dtype=np.int32)
+            self._slot = np.empty(0, dtype=np.int64)
+            self._trained_rows = 0
+            # Par partition : lignes, vecteurs et normes contigus, avec capacité de réserve
+            self._list_rows = []
+            self._list_vectors = []
+            self._list_norms = []
+            self._list_sizes = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def method(self) -> str:
+        return 'ivf' if self._centroids is not None else 'exact'
+
+    def _grow(self, needed: int, dim: int):
+        """Amortised growth of the row buffers (caller holds the lock)"""
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        keys = np.empty(capacity, dtype=object)
+        names = np.empty(capacity, dtype=object)
+        predictions = np.zeros(capacity, dtype=np.float64)
+        assign = np.zeros(capacity, dtype=np.int32)
+        slot = np.zeros(capacity, dtype=np.int64)
+        if self._rows:
+            vectors[:self._rows] = self._vectors[:self._rows]
+            sq_norms[:self._rows] = self._sq_norms[:self._rows]
+            keys[:self._rows] = self._keys[:self._rows]
+            names[:self._rows] = self._names[:self._rows]
+            predictions[:self._rows] = self._predictions[:self._rows]
+            assign[:self._rows] = self._assign[:self._rows]
+            slot[:self._rows] = self._slot[:self._rows]
+        self._vectors, self._sq_norms, self._keys = vectors, sq_norms, keys
+        self._names, self._predictions = names, predictions
+        self._assign, self._slot = assign, slot
+
+    def add(self, vectors: np.ndarray, keys: Sequence[Any], names: Sequence[Optional[str]],
+            predictions: np.ndarray, identity: str = ''):
+        """Insert scored players (a known player id replaces the previous vector)"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(vectors) == 0:
+            return
+        with self._lock:
+            self.last_access = time.monotonic()
+            if identity != self.identity or (self._vectors is not None and self._vectors.shape[1] != vectors.shape[1]):
+                # Autre modèle : l'espace transformé n'est plus le même
+                self.reset(identity)
+
+            rows = np.empty(len(vectors), dtype=np.int64)
+            appended = 0
+            for i, key in enumerate(keys):
+                # Identifiants comparés sous forme texte (123 et "123" : même joueur)
+                key = None if key is None else str(key)
+                row = self._positions.get(key) if key is not None else None
+                if row is None:
+                    if self._rows + appended >= self.max_rows:
+                        rows[i] = -1
+                        continue
+                    row = self._rows + appended
+                    appended += 1
+                    if key is not None:
+                        self._positions[key] = row
+                    self._counters['added'] += 1
+                else:
+                    self._counters['updated'] += 1
+                rows[i] = row
+
+            kept = rows >= 0
+            if not kept.all():
+                self._counters['dropped'] += int(np.count_nonzero(~kept))
+                logger.warning(f"Similarity index full ({self.max_rows} players), {np.count_nonzero(~kept)} ignored")
+            # Même joueur plusieurs fois dans l'appel : sa dernière ligne l'emporte
+            last = len(rows) - 1 - np.unique(rows[::-1], return_index=True)[1]
+            selected = np.sort(last[rows[last] >= 0])
+            rows, vectors = rows[selected], vectors[selected]
+            self._grow(self._rows + appended, vectors.shape[1])
+
+            previous_rows = self._rows
+            self._vectors[rows] = vectors
+            self._sq_norms[rows] = np.einsum('ij,ij->i', vectors, vectors)
+            self._keys[rows] = np.asarray(keys, dtype=object)[selected]
+            self._names[rows] = np.asarray(names, dtype=object)[selected]
+            self._predictions[rows] = np.asarray(predictions, dtype=np.float64).reshape(-1)[selected]
+            self._rows += appended
+
+            if self._rows >= self.ivf_min_rows:
+                if self._centroids is None or self._rows >= 2 * self._trained_rows:
+                    self._train()
+                    self._build_lists()
+                else:
+                    # Mise à jour incrémentale : seules les lignes ajoutées ou modifiées bougent
+                    for row in rows[rows < previous_rows]:
+                        self._remove_from_list(int(row))
+                    self._assign[rows] = self._nearest_centroids(vectors)
+                    self._append_to_lists(rows)
+
+        if self.on_add is not None:
+            self.on_add(self)
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        centroid_norms = np.einsum('ij,ij->i', self._centroids, self._centroids)
+        nearest = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), self.block_rows):
+            block = vectors[start:start + self.block_rows]
+            nearest[start:start + len(block)] = np.argmin(centroid_norms - 2.0 * block @ self._centroids.T, axis=1)
+        return nearest
+
+    def _train(self, iterations: int = 10):
+        """k-means (Lloyd) on a sample, then assignment of every row (caller holds the lock)"""
+        n_rows = self._rows
+        n_lists = int(min(1024, max(16, np.sqrt(n_rows))))
+        rng = np.random.default_rng(self.seed)
+        sample = self._vectors[rng.choice(n_rows, size=min(n_rows, 64 * n_lists), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            self._centroids = centroids
+            labels = self._nearest_centroids(sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            sums = np.zeros_like(centroids, dtype=np.float64)
+            np.add.at(sums, labels, sample)
+            filled = counts > 0
+            centroids = centroids.copy()
+            centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+            # Partition vide : réensemencée sur un point du corpus
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+
+        self._centroids = centroids
+        self._assign[:n_rows] = self._nearest_centroids(self._vectors[:n_rows])
+        self._trained_rows = n_rows
+        self._counters['trainings'] += 1
+        logger.info(f"Similarity index trained: {n_rows} players, {n_lists} partitions")
+
+    def _build_lists(self):
+        """Rebuild every partition list after a training (caller holds the lock)"""
+        n_lists = len(self._centroids)
+        dim = self._vectors.shape[1]
+        self._list_rows = [np.empty(0, dtype=np.int64)] * n_lists
+        self._list_vectors = [np.empty((0, dim), dtype=np.float32)] * n_lists
+        self._list_norms = [np.empty(0, dtype=np.float32)] * n_lists
+        self._list_sizes = np.zeros(n_lists, dtype=np.int64)
+        self._append_to_lists(np.arange(self._rows))
+
+    def _append_to_lists(self, rows: np.ndarray):
+        """Append rows to the list of their assigned partition (caller holds the lock)"""
+        if len(rows) == 0:
+            return
+        parts = self._assign[rows]
+        order = np.argsort(parts, kind='stable')
+        rows, parts = rows[order], parts[order]
+        for group in np.split(rows, np.flatnonzero(np.diff(parts)) + 1):
+            part = int(self._assign[group[0]])
+            size = int(self._list_sizes[part])
+            needed = size + len(group)
+            if needed > len(self._list_rows[part]):
+                # Capacité doublée : ajouts amortis en O(1) par joueur
+                capacity = max(needed, 2 * len(self._list_rows[part]), 16)
+                self._list_rows[part] = np.resize(self._list_rows[part][:size], capacity)
+                vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+                vectors[:size] = self._list_vectors[part][:size]
+                self._list_vectors[part] = vectors
+                self._list_norms[part] = np.resize(self._list_norms[part][:size], capacity)
+            self._list_rows[part][size:needed] = group
+            self._list_vectors[part][size:needed] = self._vectors[group]
+            self._list_norms[part][size:needed] = self._sq_norms[group]
+            self._slot[group] = np.arange(size, needed)
+            self._list_sizes[part] = needed
+
+    def _remove_from_list(self, row: int):
+        """Drop a row from its partition, the last entry taking its slot (caller holds the lock)"""
+        part, slot = int(self._assign[row]), int(self._slot[row])
+        last = int(self._list_sizes[part]) - 1
+        if slot != last:
+            moved = int(self._list_rows[part][last])
+            self._list_rows[part][slot] = moved
+            self._list_vectors[part][slot] = self._list_vectors[part][last]
+            self._list_norms[part][slot] = self._list_norms[part][last]
+            self._slot[moved] = slot
+        self._list_sizes[part] = last
+
+    def _partition(self, part: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        size = int(self._list_sizes[part])
+        return self._list_rows[part][:size], self._list_vectors[part][:size], self._list_norms[part][:size]
+
+    def _top(self, rows: np.ndarray, vectors: np.ndarray, sq_norms: np.ndarray, query: np.ndarray,
+             k: int, exclude: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        distances = sq_norms - 2.0 * (vectors @ query)
+        if exclude is not None:
+            distances[rows == exclude] = np.inf
+        if k < len(distances):
+            keep = np.argpartition(distances, k - 1)[:k]
+            return rows[keep], distances[keep]
+        return rows, distances
+
+    def search(self, vector: np.ndarray, k: int = 10, exclude: Optional[int] = None,
+               exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the k nearest players and their Euclidean distances, closest first"""
+        query = np.ascontiguousarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self.last_access = time.monotonic()
+            self._counters['queries'] += 1
+            if self._rows == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+            candidates = []
+            if self._centroids is not None and not exact:
+                centroid_distances = np.einsum('ij,ij->i', self._centroids, self._centroids) - 2.0 * (self._centroids @ query)
+                n_probe = min(self.n_probe, len(self._centroids))
+                probed = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+                candidates = [self._top(*self._partition(i), query, k, exclude) for i in probed if self._list_sizes[i]]
+                if sum(len(rows) for rows, _ in candidates) < k:
+                    candidates = []
+
+            if not candidates:
+                # Recherche exacte par blocs : mémoire bornée quel que soit le corpus
+                for start in range(0, self._rows, self.block_rows):
+                    stop = min(start + self.block_rows, self._rows)
+                    candidates.append(self._top(np.arange(start, stop), self._vectors[start:stop],
+                                                self._sq_norms[start:stop], query, k, exclude))
+
+            rows = np.concatenate([rows for rows, _ in candidates])
+            distances = np.concatenate([distances for _, distances in candidates])
+            finite = np.isfinite(distances)
+            rows, distances = rows[finite], distances[finite]
+            rows = rows[np.lexsort((rows, distances))[:k]]
+            # Distances exactes des k retenus (le développement |x|² - 2x.q perd en précision en float32)
+            distances = np.linalg.norm(self._vectors[rows].astype(np.float64) - query, axis=1)
+        order = np.lexsort((rows, distances))
+        return rows[order], distances[order]
+
+    def row_of(self, key: Any) -> Optional[int]:
+        with self._lock:
+            return self._positions.get(str(key))
+
+    def vector(self, row: int) -> np.ndarray:
+        with self._lock:
+            return self._vectors[row].copy()
+
+    def players(self, rows: np.ndarray) -> List[Dict]:
+        with self._lock:
+            return [
+                {'player_id': self._keys[row], 'name': self._names[row], 'prediction': float(self._predictions[row])}
+                for row in rows
+            ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(
+                players=self._rows,
+                method=self.method,
+                partitions=len(self._centroids) if self._centroids is not None else 0,
+                n_probe=self.n_probe
+            )
+        return stats
+
+
+class SimilarityIndexes:
+    """One similarity index per user, bounded like the result store.
+
+    Players scored by someone stay private to them. Indexes not used for
+    ``ttl_seconds`` are dropped, and once more than ``max_players`` players
+    are indexed in total, the least recently used users' indexes are
+    evicted (a single user never holds more than ``max_players``).
+    """
+
+    def __init__(self, max_players: int = 500000, ttl_seconds: float = 3600, **options):
+        self.max_players = max_players
+        self.ttl_seconds = ttl_seconds
+        self.options = dict(options, max_rows=min(options.get('max_rows', max_players), max_players))
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'evicted': 0, 'expired': 0}
+
+    def for_user(self, user_id: Optional[str]) -> Optional[SimilarityIndex]:
+        """Index fed by the user's batches, created on first use"""
+        if not user_id:
+            return None
+        with self._lock:
+            self._purge_expired()
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = self._indexes[user_id] = SimilarityIndex(on_add=self._trim, **self.options)
+            self._indexes.move_to_end(user_id)
+            index.last_access = time.monotonic()
+            return index
+
+    def get(self, user_id: Optional[str]) -> Optional[SimilarityIndex]:
+        with self._lock:
+            self._purge_expired()
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+            return index
+
+    def _trim(self, added: SimilarityIndex):
+        """Evict least recently used users until the player budget is met"""
+        with self._lock:
+            total = sum(len(index) for index in self._indexes.values())
+            for user_id in list(self._indexes):
+                if total <= self.max_players:
+                    break
+                index = self._indexes[user_id]
+                if index is added:
+                    continue
+                total -= len(index)
+                del self._indexes[user_id]
+                self._counters['evicted'] += 1
+
+    def _purge_expired(self):
+        """Drop indexes unused for ttl_seconds (caller holds the lock)"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        for user_id in [uid for uid, index in self._indexes.items() if index.last_access < cutoff]:
+            del self._indexes[user_id]
+            self._counters['expired'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            indexes = list(self._indexes.values())
+            stats = dict(self._counters)
+        stats.update(users=len(indexes), players=sum(len(index) for index in indexes), max_players=self.max_players)
+        return stats
+
+
+def create_similarity_indexes() -> Optional[SimilarityIndexes]:
+    """Per-user indexes, only when SIMILARITY_INDEX=true (off by default)"""
+    if os.getenv('SIMILARITY_INDEX', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    return SimilarityIndexes(
+        max_players=int(os.getenv('SIMILARITY_MAX_PLAYERS', '500000')),
+        ttl_seconds=float(os.getenv('SIMILARITY_TTL_SECONDS', '3600')),
+        ivf_min_rows=int(os.getenv('SIMILARITY_IVF_MIN_ROWS', '20000')),
+        n_probe=int(os.getenv('SIMILARITY_N_PROBE', '16'))
+    )
+
+
+# Global instance
+similarity_indexes = create_similarity_indexes()
@@ -0,0 +1,121 @@
+import numpy as np
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_KERNELS = ('rbf', 'linear', 'poly', 'sigmoid')
+DEFAULT_BLOCK_BYTES = 32 * 1024 * 1024
+
+
+class SVREngine:
+    """Blocked NumPy inference for a fitted sklearn SVR.
+
+    The support vectors, dual coefficients, intercept and kernel parameters
+    are extracted once. ``predict`` evaluates the kernel matrix block by
+    block so that memory stays bounded by ``max_block_bytes`` whatever the
+    number of rows, and can run in float32 for extra speed.
+    """
+
+    def __init__(self, support_vectors: np.ndarray, dual_coef: np.ndarray, intercept: float,
+                 kernel: str = 'rbf', gamma: float = 1.0, coef0: float = 0.0, degree: int = 3,
+                 dtype=np.float64, max_block_bytes: int = DEFAULT_BLOCK_BYTES):
+        if kernel not in SUPPORTED_KERNELS:
+            raise ValueError(f"Noyau non supporté: {kernel}")
+
+        self.dtype = np.dtype(dtype)
+        self.kernel = kernel
+        self.gamma = float(gamma)
+        self.coef0 = float(coef0)
+        self.degree = int(degree)
+        self.intercept = float(intercept)
+        self.support_vectors = np.ascontiguousarray(support_vectors, dtype=self.dtype)
+        self.dual_coef = np.ascontiguousarray(np.ravel(dual_coef), dtype=self.dtype)
+        self.sv_sq_norms = np.einsum('ij,ij->i', self.support_vectors, self.support_vectors)
+
+        row_bytes = max(1, self.n_support * self.dtype.itemsize)
+        self.block_rows = max(1, int(max_block_bytes) // row_bytes)
+
+    @classmethod
+    def from_model(cls, model, dtype=np.float64, max_block_bytes: int = DEFAULT_BLOCK_BYTES) -> 'SVREngine':
+        """Extract the fitted parameters of an sklearn SVR"""
+        if not hasattr(model, 'support_vectors_') or not hasattr(model, 'dual_coef_'):
+            raise ValueError("Le modèle n'est pas un SVR ajusté")
+        if callable(model.kernel):
+            raise ValueError("Noyau personnalisé non supporté")
+
+        support_vectors = model.support_vectors_
+        dual_coef = model.dual_coef_
+        if hasattr(support_vectors, 'toarray'):
+            support_vectors = support_vectors.toarray()
+        if hasattr(dual_coef, 'toarray'):
+            dual_coef = dual_coef.toarray()
+        if dual_coef.shape[0] != 1:
+            raise ValueError("Seuls les modèles de régression (une sortie) sont supportés")
+
+        return cls(
+            support_vectors, dual_coef[0], model.intercept_[0],
+            kernel=model.kernel, gamma=model._gamma, coef0=model.coef0, degree=model.degree,
+            dtype=dtype, max_block_bytes=max_block_bytes
+        )
+
+    @property
+    def n_support(self) -> int:
+        return self.support_vectors.shape[0]
+
+    def _kernel_block(self, block: np.ndarray) -> np.ndarray:
+        # Produit scalaire dans un tampon réutilisé pour toutes les opérations du bloc
+        k = block @ self.support_vectors.T
+
+        if self.kernel == 'rbf':
+            # ||x - sv||² = ||x||² + ||sv||² - 2 x·sv
+            k *= -2.0
+            k += np.einsum('ij,ij->i', block, block)[:, np.newaxis]
+            k += self.sv_sq_norms[np.newaxis, :]
+            np.maximum(k, 0.0, out=k)
+            k *= -self.gamma
+            np.exp(k, out=k)
+        elif self.kernel == 'poly':
+            k *= self.gamma
+            k += self.coef0
+            np.power(k, self.degree, out=k)
+        elif self.kernel == 'sigmoid':
+            k *= self.gamma
+            k += self.coef0
+            np.tanh(k, out=k)
+
+        return k
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Raw SVR output (same as model.predict), computed in bounded-memory blocks"""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[1] != self.support_vectors.shape[1]:
+            raise ValueError(
+                f"X a {X.shape[1]} features, le modèle en attend {self.support_vectors.shape[1]}"
+            )
+
+        output = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], self.block_rows):
+            stop = min(start + self.block_rows, X.shape[0])
+            block = np.ascontiguousarray(X[start:stop], dtype=self.dtype)
+            output[start:stop] = self._kernel_block(block) @ self.dual_coef
+
+        output += self.intercept
+        return output
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.decision_function(X)
+
+    def accuracy_report(self, model, X: np.ndarray) -> Dict:
+        """Compare engine output with model.predict on the same rows"""
+        expected = model.predict(X)
+        actual = self.predict(X)
+        errors = np.abs(expected - actual)
+        return {
+            'rows': int(len(X)),
+            'dtype': self.dtype.name,
+            'max_abs_error': float(errors.max()) if len(errors) else 0.0,
+            'mean_abs_error': float(errors.mean()) if len(errors) else 0.0
+        }
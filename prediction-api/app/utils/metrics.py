@@ -0,0 +1,203 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Bornes par défaut (secondes) : de la prédiction unitaire au gros lot
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class Histogram:
+    """Thread-safe histogram with fixed, cumulative buckets"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one observation"""
+        # Premier seuil >= value (value <= bound)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict:
+        """Return count, sum and cumulative bucket counts"""
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total_count = self._count
+
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets[_number(bound)] = cumulative
+        buckets['+Inf'] = total_count
+
+        return {
+            'count': total_count,
+            'sum': total_sum,
+            'buckets': buckets
+        }
+
+
+class Counter:
+    """Thread-safe monotonic counter"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def value(self) -> float:
+        with self._lock:
+            return self._value
+
+
+class MetricFamily:
+    """A named metric with one child (Counter or Histogram) per label set"""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Sequence[str],
+                 factory: Callable):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for these label values (created on first use)"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} attend les labels {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._families = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, help_text, 'counter', labelnames, Counter))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._register(MetricFamily(name, help_text, 'histogram', labelnames, lambda: Histogram(buckets)))
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], Dict[Tuple[str, ...], float]],
+              labelnames: Sequence[str] = ()):
+        """Gauge read at scrape time; ``callback`` maps label values to a number"""
+        with self._lock:
+            self._gauges[name] = (help_text, tuple(labelnames), callback)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)"""
+        lines = []
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda f: f.name)
+            gauges = sorted(self._gauges.items())
+
+        for family in families:
+            lines.append(f'# HELP {family.name} {family.help_text}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            for values, child in family.children():
+                labels = list(zip(family.labelnames, values))
+                if family.kind == 'counter':
+                    lines.append(f'{family.name}{_labels(labels)} {_number(child.value())}')
+                    continue
+
+                snapshot = child.snapshot()
+                for bound, count in snapshot['buckets'].items():
+                    lines.append(f'{family.name}_bucket{_labels(labels + [("le", bound)])} {count}')
+                lines.append(f'{family.name}_sum{_labels(labels)} {_number(snapshot["sum"])}')
+                lines.append(f'{family.name}_count{_labels(labels)} {snapshot["count"]}')
+
+        for name, (help_text, labelnames, callback) in gauges:
+            try:
+                samples = callback()
+            except Exception:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for values, value in sorted(samples.items()):
+                if value is None:
+                    continue
+                lines.append(f'{name}{_labels(list(zip(labelnames, values)))} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+# Global instance
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'prediction_stage_seconds', 'Time spent in each prediction pipeline stage', ('stage',)
+)
+ROWS_TOTAL = REGISTRY.counter(
+    'prediction_rows_total', 'Rows scored, by entry point', ('source',)
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block into prediction_stage_seconds{stage=...}"""
+    histogram = STAGE_SECONDS.labels(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started)
@@ -0,0 +1,18 @@
+import logging
+import os
+import random
+from typing import Callable
+
+# Fraction des requêtes dont le contenu est journalisé en INFO (0 = uniquement en DEBUG)
+PAYLOAD_LOG_SAMPLE_RATE = float(os.getenv('PAYLOAD_LOG_SAMPLE_RATE', '0'))
+
+
+def log_payload(logger: logging.Logger, build_message: Callable[[], str]):
+    """Log a payload/DataFrame dump at DEBUG, or at INFO for a sampled fraction of calls.
+
+    The message is only formatted when it is actually emitted.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(build_message())
+    elif PAYLOAD_LOG_SAMPLE_RATE > 0 and random.random() < PAYLOAD_LOG_SAMPLE_RATE:
+        logger.info(build_message())
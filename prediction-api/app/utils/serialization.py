@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from typing import Any, List
+
+
+def clean_scalar(value: Any) -> Any:
+    """Convert one pandas/numpy scalar to a JSON-serializable Python value"""
+    if isinstance(value, str):
+        return value
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value) if np.isfinite(value) else None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def json_column(values: np.ndarray) -> List[Any]:
+    """Convert a whole column to JSON-serializable Python values in one pass.
+
+    NaN/inf become None, numpy scalars become int/float/bool, timestamps
+    become ISO strings.
+    """
+    values = np.asarray(values)
+    kind = values.dtype.kind
+
+    if kind == 'f':
+        cleaned = values.astype(object)
+        cleaned[~np.isfinite(values)] = None
+        return cleaned.tolist()
+    if kind in 'iub':
+        return values.tolist()
+    if kind == 'M':
+        stamps = pd.DatetimeIndex(values)
+        return [None if pd.isna(stamp) else stamp.isoformat() for stamp in stamps]
+    return [clean_scalar(value) for value in values]
+
+
+def row_dtype(frame: pd.DataFrame) -> np.dtype:
+    """Dtype pandas uses for a row of frame (e.g. ints upcast to float)"""
+    return frame.iloc[:0].to_numpy().dtype
+
+
+def frame_columns(frame: pd.DataFrame, columns: List[str]) -> List[np.ndarray]:
+    """Arrays of several columns, as seen through row access.
+
+    Row access (``frame.iloc[i][col]``) casts every value to the common row
+    dtype, so an all-numeric frame yields floats even for integer columns.
+    The same cast is applied here to keep the serialized output unchanged.
+    """
+    dtype = row_dtype(frame)
+    cast = dtype != np.dtype(object)
+    return [frame[col].to_numpy(dtype=dtype) if cast else frame[col].to_numpy() for col in columns]
+
+
+def frame_json_columns(frame: pd.DataFrame, columns: List[str]) -> List[List[Any]]:
+    """JSON-clean values of several columns, as seen through row access"""
+    return [json_column(values) for values in frame_columns(frame, columns)]
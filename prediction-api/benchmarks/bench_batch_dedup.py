@@ -0,0 +1,67 @@
+"""Batch scoring with repeated players: every row vs once per distinct vector.
+
+Usage (from prediction-api/): python -m benchmarks.bench_batch_dedup [--players 2000 --snapshots 5]
+
+Each player appears --snapshots times with identical attributes, as in
+scouting exports. The re-upload run changes --edited rows first, so only
+those are scored again; the rest comes from the prediction cache.
+"""
+import argparse
+import time
+
+from benchmarks.common import synthetic_players
+from app.services.prediction_cache import ReuseStats
+from app.services.prediction_service import prediction_service
+
+
+def timed(label: str, func):
+    started = time.perf_counter()
+    reuse = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<30} {elapsed:7.2f}s  {reuse}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--snapshots', type=int, default=5)
+    parser.add_argument('--edited', type=int, default=50)
+    args = parser.parse_args()
+
+    service = prediction_service
+    bundle = service.bundle
+    players = synthetic_players(args.players)
+    frame = service.prepare_batch_frame(players.loc[players.index.repeat(args.snapshots)].reset_index(drop=True), bundle)
+    print(f"{len(frame)} rows, {args.players} distinct players")
+
+    def score(dedup: bool, edit: bool = False):
+        def run():
+            service.batch_dedup = dedup
+            reuse = ReuseStats()
+            data = frame
+            if edit:
+                data = frame.copy()
+                data.loc[:args.edited - 1, 'crossing'] = 1.0
+            service.score_batch_frame(data, bundle, reuse)
+            return reuse.to_dict()
+        return run
+
+    cache, service.prediction_cache = service.prediction_cache, None
+    try:
+        full = timed('every row', score(False))
+        dedup = timed('once per distinct vector', score(True))
+    finally:
+        service.prediction_cache = cache
+    print(f"speed-up (in-file): {full / dedup:.1f}x")
+
+    if cache is not None:
+        cache.clear()
+        timed('first upload (cache on)', score(True))
+        reupload = timed(f're-upload, {args.edited} rows edited', score(True, edit=True))
+        print(f"speed-up (re-upload): {full / reupload:.1f}x")
+    service.batch_dedup = True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Recommendations for a whole /batch result: per-player loop vs one gap matrix.
+
+Usage (from prediction-api/): python -m benchmarks.bench_batch_recommendations [--rows 10000] [--top-k 3]
+
+Advice comes from the fallback texts (no Gemini), so both sides measure
+the threshold comparison, ranking and payload assembly only.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import synthetic_players
+from app.services.recommendation_service import recommendation_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args()
+
+    service = recommendation_service
+    players = synthetic_players(args.rows).to_dict('records')
+
+    started = time.perf_counter()
+    per_player = [service.get_recommendations(player, 0)[:args.top_k] for player in players]
+    loop = time.perf_counter() - started
+    loop_bytes = len(json.dumps(per_player, default=str))
+
+    started = time.perf_counter()
+    batch = service.get_recommendations_batch(players, top_k=args.top_k)
+    vectorized = time.perf_counter() - started
+    batch_bytes = len(json.dumps(batch, default=str))
+
+    print(f"{'mode':>12} {'seconds':>9} {'players/s':>11} {'JSON MB':>8}")
+    print(f"{'per player':>12} {loop:>9.3f} {args.rows / loop:>11.0f} {loop_bytes / 1e6:>8.2f}")
+    print(f"{'batch':>12} {vectorized:>9.3f} {args.rows / vectorized:>11.0f} {batch_bytes / 1e6:>8.2f}")
+    print(f"speed-up: {loop / vectorized:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
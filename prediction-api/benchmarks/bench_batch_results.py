@@ -0,0 +1,48 @@
+"""Rows/sec of predict_batch result assembly, legacy loop vs columnar pass.
+
+Usage (from prediction-api/): python -m benchmarks.bench_batch_results [--sizes 1000 10000 50000]
+
+Both outputs are serialised like Flask's jsonify (sorted keys) and must be
+byte-identical.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import synthetic_players
+from benchmarks.reference import legacy_build_batch_results
+from app.services.prediction_service import prediction_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--skip-legacy-above', type=int, default=50000)
+    args = parser.parse_args()
+
+    service = prediction_service
+    print(f"{'rows':>8} {'legacy rows/s':>15} {'columnar rows/s':>16} {'speed-up':>9} identical")
+    for n_rows in args.sizes:
+        original_df = synthetic_players(n_rows)
+        df = service.prepare_batch_frame(original_df)
+        predictions = service.score_frame(df)
+
+        started = time.perf_counter()
+        results = service.build_batch_results(original_df, df, predictions)
+        columnar = time.perf_counter() - started
+
+        if n_rows > args.skip_legacy_above:
+            print(f"{n_rows:>8} {'-':>15} {n_rows / columnar:>16.0f} {'-':>9} -")
+            continue
+
+        started = time.perf_counter()
+        expected = legacy_build_batch_results(service, original_df, df, predictions.reshape(-1, 1))
+        legacy = time.perf_counter() - started
+
+        identical = json.dumps(results, sort_keys=True) == json.dumps(expected, sort_keys=True)
+        print(f"{n_rows:>8} {n_rows / legacy:>15.0f} {n_rows / columnar:>16.0f} "
+              f"{legacy / columnar:>8.1f}x {identical}")
+
+
+if __name__ == '__main__':
+    main()
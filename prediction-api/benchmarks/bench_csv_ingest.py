@@ -0,0 +1,85 @@
+"""Batch CSV ingestion at scale: inferred read + copy vs typed, projected read.
+
+Usage (from prediction-api/): python -m benchmarks.bench_csv_ingest [--rows 1000000]
+
+The input is shared/data/sample.csv repeated up to --rows rows. Each
+variant reads the file and builds the model input frame; time is the
+wall clock of one pass and memory the peak RSS it adds (parser buffers
+included) plus the size of the frames kept. Each variant runs in a
+forked process so one variant's heap does not inflate the next.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.common import SAMPLE_CSV
+from benchmarks.reference import legacy_read_batch_csv
+from app.services import batch_io
+from app.services.prediction_service import prediction_service
+
+
+def scaled_csv(rows: int) -> str:
+    sample = pd.read_csv(SAMPLE_CSV)
+    repeats = -(-rows // len(sample))
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-csv-'), f'players_{rows}.csv')
+    pd.concat([sample] * repeats, ignore_index=True).iloc[:rows].to_csv(path, index=False)
+    return path
+
+
+def frame_bytes(*frames) -> int:
+    return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames)
+
+
+def _measure(func, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    frames = func()
+    elapsed = time.perf_counter() - started
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) * 1024
+    queue.put((elapsed, peak, frame_bytes(*frames)))
+
+
+def run(label: str, func):
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(func, queue))
+    process.start()
+    elapsed, peak, kept = queue.get()
+    process.join()
+    print(f"{label:<28} {elapsed:7.2f}s  peak RSS +{peak / 2**20:8.1f} MiB  kept={kept / 2**20:8.1f} MiB")
+    return elapsed, peak
+
+
+def typed(path: str, engine: str):
+    def read():
+        os.environ['CSV_ENGINE'] = engine
+        bundle = prediction_service.bundle
+        original_df = prediction_service.read_batch_file(path, 'csv', bundle)
+        return original_df, prediction_service.prepare_batch_frame(original_df, bundle)
+    return read
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    path = scaled_csv(args.rows)
+    print(f"{args.rows} rows, {os.path.getsize(path) / 2**20:.1f} MiB CSV")
+    try:
+        legacy = run('inferred read + copy', lambda: legacy_read_batch_csv(prediction_service, path))
+        engines = ['c'] + (['pyarrow'] if batch_io.columnar_available() else [])
+        for engine in engines:
+            elapsed, peak = run(f'read + prepare ({engine})', typed(path, engine))
+            print(f"  vs inferred: {legacy[0] / elapsed:.1f}x faster, peak memory x{peak / legacy[1]:.2f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Start-up time and memory of workers loading pickles vs a mapped artifact.
+
+Usage (from prediction-api/):
+    python -m benchmarks.bench_model_artifact [--workers 4]
+
+Each worker is a fresh process that loads the bundle and scores one row.
+Unique memory (USS) is the part a worker does not share with the others;
+with the artifact, the support vectors stay in the shared page cache.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.common import MODELS_DIR
+
+VERSION = '02_03_2025__18_26_55'
+
+
+def memory_kb():
+    """(RSS, USS) of the current process in kB, from /proc"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Private_Clean', 'Private_Dirty'):
+                values[key] = int(rest.split()[0])
+    return values['Rss'], values['Private_Clean'] + values['Private_Dirty']
+
+
+def worker(paths, queue):
+    from app.services.model_bundle import ModelBundle
+
+    baseline = memory_kb()[1]
+    started = time.perf_counter()
+    bundle = ModelBundle.load(paths, VERSION)
+    numeric, categorical = bundle.input_schema.encode({})
+    bundle.score_rows(numeric[None, :], categorical[None, :])
+    elapsed = time.perf_counter() - started
+    rss, uss = memory_kb()
+    queue.put((elapsed, rss, uss - baseline))
+
+
+def run(paths, workers):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    processes = [context.Process(target=worker, args=(paths, queue)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    # Import après common : variables d'environnement par défaut
+    from app.services.model_artifact import export_bundle
+    from app.services.model_bundle import ModelBundle
+    from app.services.model_registry import ModelRegistry
+
+    spec = ModelRegistry(MODELS_DIR, prefer_artifacts=False).get(VERSION)
+    artifact_dir = os.path.join(tempfile.mkdtemp(prefix='bench-artifact-'), 'artifact')
+    export_bundle(ModelBundle.load(spec['paths'], VERSION), artifact_dir)
+
+    print(f"{'format':>8} {'load ms (mean)':>15} {'RSS MB':>8} {'bundle USS MB':>14}")
+    for name, paths in (('joblib', spec['paths']), ('artifact', {'artifact': artifact_dir})):
+        results = run(paths, args.workers)
+        load_ms = sum(r[0] for r in results) / len(results) * 1000
+        rss = sum(r[1] for r in results) / len(results) / 1024
+        uss = sum(r[2] for r in results) / len(results) / 1024
+        print(f"{name:>8} {load_ms:>15.1f} {rss:>8.1f} {uss:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
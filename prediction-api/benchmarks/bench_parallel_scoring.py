@@ -0,0 +1,54 @@
+"""Scaling benchmark of process-pool batch scoring.
+
+Usage (from prediction-api/):
+    python -m benchmarks.bench_parallel_scoring [--rows 200000] [--workers 1 2 4 8]
+
+Every run is checked against serial scoring (same values, same order).
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_players
+from app.services.prediction_service import prediction_service
+from app.services.parallel_scoring import ParallelScorer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--shard-rows', type=int, default=10000)
+    parser.add_argument('--start-method', default='spawn')
+    args = parser.parse_args()
+
+    service = prediction_service
+    df = service.prepare_batch_frame(synthetic_players(args.rows))
+    numeric = df[service.input_schema.numerical_columns].to_numpy(dtype=np.float64)
+    categorical = df[service.input_schema.categorical_columns].to_numpy(dtype=object)
+
+    started = time.perf_counter()
+    expected = service.score_rows(numeric, categorical)
+    serial = time.perf_counter() - started
+    print(f"{args.rows} rows on {os.cpu_count()} CPUs, serial: {serial:.2f}s ({args.rows / serial:.0f} rows/s)")
+
+    print(f"{'workers':>8} {'seconds':>9} {'rows/s':>10} {'speed-up':>9} identical")
+    for workers in args.workers:
+        scorer = ParallelScorer(workers, shard_rows=args.shard_rows, start_method=args.start_method,
+                                version=(service.bundle.version, service.bundle.paths))
+        scorer.warmup()
+        try:
+            started = time.perf_counter()
+            result = scorer.score(numeric, categorical)
+            elapsed = time.perf_counter() - started
+        finally:
+            scorer.shutdown()
+
+        identical = np.array_equal(result, expected)
+        print(f"{workers:>8} {elapsed:>9.2f} {args.rows / elapsed:>10.0f} {serial / elapsed:>8.2f}x {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Microbenchmark of single-row preprocessing.
+
+Usage (from prediction-api/): python -m benchmarks.bench_prepare_single_input
+"""
+import argparse
+
+from benchmarks.common import measure, format_stats
+from benchmarks.reference import legacy_prepare_single_input
+from app.services.prediction_service import prediction_service
+
+PAYLOAD = {
+    'potential': 80, 'crossing': 65, 'finishing': 70, 'heading_accuracy': 55,
+    'short_passing': 72, 'dribbling': 75, 'acceleration': 7, 'sprint_speed': 8,
+    'agility': '6', 'stamina': 'n/a', 'preferred_foot': 'Left',
+    'attacking_work_rate': 'High', 'defensive_work_rate': ' Low '
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    service = prediction_service
+    legacy = measure(lambda: legacy_prepare_single_input(service, PAYLOAD), args.repeat)
+    frame = measure(lambda: service.prepare_single_input(PAYLOAD), args.repeat)
+    row = measure(lambda: service.prepare_single_row(PAYLOAD), args.repeat)
+
+    print(format_stats('legacy pandas path', legacy))
+    print(format_stats('prepare_single_input (frame)', frame))
+    print(format_stats('prepare_single_row (numpy)', row))
+    print(f"speed-up frame: x{legacy['mean'] / frame['mean']:.1f}  "
+          f"row: x{legacy['mean'] / row['mean']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Stored batch results: server-side page/sort/filter/top-k vs sorting every record.
+
+Usage (from prediction-api/): python -m benchmarks.bench_result_store [--rows 200000]
+
+Predictions are synthetic (no model call) so the benchmark isolates the
+result handling. The baseline mirrors what BatchResults does in the
+browser: filter and sort the whole list of records for every view.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.common import format_stats, measure, synthetic_players
+from app.services.prediction_service import prediction_service
+from app.services.result_store import ResultStore
+
+FILTERS = [('potential', 'gt', 80), ('preferred_foot', 'eq', 'left')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+
+    service = prediction_service
+    players = synthetic_players(args.rows)
+    df = service.prepare_batch_frame(players, service.bundle)
+    predictions = np.random.default_rng(0).normal(65, 8, args.rows).round(2)
+    keys, json_columns = service.build_batch_columns(players, df, predictions)
+    records = [dict(zip(keys, values)) for values in zip(*json_columns)]
+    _, columns = service.build_batch_columns(players, df, predictions, json_ready=False)
+
+    def stored_size(json_ready):
+        # Colonnes construites sous tracemalloc : objets Python (JSON) ou tableaux typés, plus les index
+        tracemalloc.start()
+        _, stored_columns = service.build_batch_columns(players, df, predictions, json_ready=json_ready)
+        stored = ResultStore(max_rows=args.rows).put('bench', keys, stored_columns)
+        stored.build_indexes(['potential', 'preferred_foot'])
+        del stored_columns
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return stored, size
+
+    print(f"JSON-ready columns + indexes: {stored_size(True)[1] / 2 ** 20:.1f} MiB")
+    print(f"typed columns + indexes: {stored_size(False)[1] / 2 ** 20:.1f} MiB")
+
+    started = time.perf_counter()
+    result = ResultStore(max_rows=args.rows).put('bench', keys, columns)
+    print(f"{args.rows} rows stored in {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    result.build_indexes(['potential', 'preferred_foot'])
+    print(f"potential/preferred_foot indexes built in {time.perf_counter() - started:.2f}s")
+
+    def browser_view():
+        rows = [r for r in records if r['potential'] > 80 and r['preferred_foot'] == 'left']
+        return sorted(rows, key=lambda r: -r['prediction'])[:100]
+
+    def store_view():
+        _, positions = result.query(FILTERS, 'prediction', True, 0, 100)
+        return result.records(positions)
+
+    assert [r['id'] for r in browser_view()] == [r['id'] for r in store_view()]
+    print(format_stats('filter+sort all records', measure(browser_view, repeat=5, warmup=1)))
+    print(format_stats('store query (page of 100)', measure(store_view, repeat=20, warmup=1)))
+
+    values = result.columns['prediction']
+    full = measure(lambda: np.argsort(-values, kind='stable')[:args.k], repeat=10, warmup=1)
+    partial = measure(lambda: result.top('prediction', args.k, []), repeat=10, warmup=1)
+    print(format_stats(f'top-{args.k} by full sort', full))
+    print(format_stats(f'top-{args.k} by argpartition', partial))
+
+
+if __name__ == '__main__':
+    main()
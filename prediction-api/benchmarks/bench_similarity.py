@@ -0,0 +1,59 @@
+"""Similar players: IVF partitions vs exact blocked k-NN on the transformed features.
+
+Usage (from prediction-api/): python -m benchmarks.bench_similarity [--rows 100000]
+
+Players are synthetic, prepared and transformed by the active model exactly
+as a scored batch is indexed. Recall is the share of the exact k nearest
+neighbours returned by the IVF search.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import format_stats, measure, synthetic_players
+from app.services.prediction_service import prediction_service
+from app.services.similarity_index import SimilarityIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-rows', type=int, default=25000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--n-probe', type=int, default=16)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    service = prediction_service
+    players = synthetic_players(args.rows)
+    players['player_fifa_api_id'] = np.arange(args.rows)
+    df = service.prepare_batch_frame(players, service.bundle)
+    predictions = np.random.default_rng(0).normal(65, 8, args.rows).round(2)
+
+    index = SimilarityIndex(n_probe=args.n_probe)
+    started = time.perf_counter()
+    for start in range(0, args.rows, args.batch_rows):
+        # Indexation incrémentale, lot par lot
+        stop = start + args.batch_rows
+        service.index_batch(index, players.iloc[start:stop], df.iloc[start:stop], predictions[start:stop])
+    print(f"{len(index)} players indexed in {time.perf_counter() - started:.2f}s "
+          f"({index.stats()['partitions']} partitions, {index.stats()['trainings']} trainings)")
+
+    rng = np.random.default_rng(1)
+    queries = [index.vector(row) for row in rng.choice(len(index), size=args.queries, replace=False)]
+    hits = 0
+    for query in queries:
+        expected, _ = index.search(query, args.k, exact=True)
+        found, _ = index.search(query, args.k)
+        hits += len(set(expected.tolist()) & set(found.tolist()))
+    print(f"IVF recall@{args.k}: {hits / (args.k * len(queries)):.3f} (n_probe={args.n_probe})")
+
+    cycle = iter(queries * 1000)
+    print(format_stats('exact blocked search', measure(lambda: index.search(next(cycle), args.k, exact=True),
+                                                       repeat=20, warmup=2)))
+    print(format_stats('IVF search', measure(lambda: index.search(next(cycle), args.k), repeat=200, warmup=5)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark of the NumPy SVR engine against model.predict.
+
+Usage (from prediction-api/):
+    python -m benchmarks.bench_svr_engine [--sizes 1 100 10000 1000000] [--max-baseline-rows 100000]
+
+model.predict on 1M rows takes minutes; above --max-baseline-rows only the
+engine is timed and accuracy is reported on the first rows.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_players
+from app.services.prediction_service import prediction_service
+from app.services.svr_engine import SVREngine
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def features(n_rows: int) -> np.ndarray:
+    service = prediction_service
+    df = synthetic_players(min(n_rows, 100000))
+    base = service.transform_rows(
+        df[service.input_schema.numerical_columns].to_numpy(dtype=np.float64),
+        df[service.input_schema.categorical_columns].to_numpy(dtype=object)
+    )
+    # Répéter le bloc pour les très grandes tailles
+    repeats = -(-n_rows // len(base))
+    return np.tile(base, (repeats, 1))[:n_rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10000, 1000000])
+    parser.add_argument('--max-baseline-rows', type=int, default=100000)
+    parser.add_argument('--accuracy-rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    model = prediction_service.model
+    target = prediction_service.target_pipeline
+    engines = {
+        'float64': SVREngine.from_model(model, dtype=np.float64),
+        'float32': SVREngine.from_model(model, dtype=np.float32)
+    }
+    print(f"SVR: {engines['float64'].n_support} support vectors, kernel={model.kernel}")
+
+    header = f"{'rows':>9} {'sklearn':>12} {'numpy f64':>12} {'numpy f32':>12} {'x f64':>7} {'x f32':>7}"
+    print(header)
+    for n_rows in args.sizes:
+        X = features(n_rows)
+        baseline = None
+        if n_rows <= args.max_baseline_rows:
+            _, baseline = timed(model.predict, X)
+        _, t64 = timed(engines['float64'].predict, X)
+        _, t32 = timed(engines['float32'].predict, X)
+
+        base_str = f"{baseline:11.4f}s" if baseline is not None else f"{'-':>12}"
+        ratio64 = f"{baseline / t64:7.1f}" if baseline else f"{'-':>7}"
+        ratio32 = f"{baseline / t32:7.1f}" if baseline else f"{'-':>7}"
+        print(f"{n_rows:>9} {base_str} {t64:11.4f}s {t32:11.4f}s {ratio64} {ratio32}")
+
+    print("\nAccuracy report")
+    X = features(args.accuracy_rows)
+    expected = model.predict(X)
+    expected_final = np.round(target.inverse_transform(expected.reshape(-1, 1)), 2)[:, 0]
+    for name, engine in engines.items():
+        report = engine.accuracy_report(model, X)
+        final = np.round(target.inverse_transform(engine.predict(X).reshape(-1, 1)), 2)[:, 0]
+        changed = float(np.mean(final != expected_final))
+        print(f"  {name}: rows={report['rows']} max_abs_error={report['max_abs_error']:.3e} "
+              f"mean_abs_error={report['mean_abs_error']:.3e} rounded_predictions_changed={changed:.4%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Full sensitivity sweep: one what-if matrix pass vs one predict_single per variant.
+
+Usage (from prediction-api/): python -m benchmarks.bench_whatif [--steps -10 -5 5 10]
+
+The per-variant loop bypasses the prediction cache (distinct rows) but
+still goes through the micro-batcher, like sequential /single calls.
+"""
+import argparse
+
+from benchmarks.common import format_stats, measure
+from app.services.prediction_service import prediction_service
+
+PLAYER = {'potential': 80, 'crossing': 65, 'finishing': 70, 'dribbling': 75, 'preferred_foot': 'left'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=float, nargs='+', default=[-10, -5, 5, 10])
+    args = parser.parse_args()
+
+    service = prediction_service
+    columns = service.numerical_columns
+    result = service.what_if(PLAYER, steps=args.steps)
+    print(f"{result['variants_scored']} variants ({len(columns)} attributes x {len(args.steps)} steps + base)")
+
+    sweep = measure(lambda: service.what_if(PLAYER, steps=args.steps), repeat=20, warmup=2)
+    print(format_stats('what_if sweep (one pass)', sweep))
+
+    variants = [dict(PLAYER, **{col: min(100.0, max(0.0, float(PLAYER.get(col, 50)) + step))})
+                for col in columns for step in args.steps]
+    cache, service.prediction_cache = service.prediction_cache, None
+    try:
+        loop = measure(lambda: [service.predict_single(v) for v in variants], repeat=3, warmup=1)
+    finally:
+        service.prediction_cache = cache
+    print(format_stats('predict_single per variant', loop))
+    print(f"speed-up: {loop['mean'] / sweep['mean']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import platform
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(ROOT_DIR, '..', 'shared', 'models')
+SAMPLE_CSV = os.path.join(ROOT_DIR, '..', 'shared', 'data', 'sample.csv')
+
+# Même bundle que les tests quand les chemins ne sont pas fournis
+os.environ.setdefault('MODEL_PATH', os.path.join(MODELS_DIR, '02_03_2025__18_26_55_best_model.pkl'))
+os.environ.setdefault('TRANSFORMER_PATH', os.path.join(MODELS_DIR, '02_03_2025__18_25_41_full_transformer.pkl'))
+os.environ.setdefault('TARGET_PIPELINE_PATH', os.path.join(MODELS_DIR, '02_03_2025__18_25_41_target_pipeline.pkl'))
+os.environ.setdefault('GEMINI_API_KEY', 'dev-mode-no-gemini')
+os.environ.setdefault('PARITY_SAMPLE_PATH', SAMPLE_CSV)
+os.environ.setdefault('JWT_SECRET', 'bench-secret-bench-secret-bench-secret')
+os.environ.setdefault('BATCH_JOBS_DIR', tempfile.mkdtemp(prefix='bench-jobs-'))
+# Conseils en mémoire seulement : chaque exécution part d'un cache vide
+os.environ.setdefault('ADVICE_CACHE_PATH', '')
+os.environ.setdefault('PREDICTION_HISTORY_DB', os.path.join(tempfile.mkdtemp(prefix='bench-history-'), 'database.sqlite'))
+os.environ.setdefault('THRESHOLDS_PATH', os.path.join(ROOT_DIR, '..', 'shared', 'data', 'attribute_thresholds.json'))
+
+logging.basicConfig(level=logging.WARNING)
+logging.getLogger('app').setLevel(logging.WARNING)
+
+
+CATEGORIES = {
+    'preferred_foot': ['left', 'right'],
+    'attacking_work_rate': ['high', 'medium', 'low', 'None'],
+    'defensive_work_rate': ['high', 'medium', 'low']
+}
+
+
+def synthetic_players(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic players with the same columns and dtypes as shared/data/sample.csv"""
+    rng = np.random.default_rng(seed)
+    template = pd.read_csv(SAMPLE_CSV, nrows=1, encoding='utf-8-sig')
+
+    columns = {}
+    for col in template.columns:
+        if col in CATEGORIES:
+            columns[col] = rng.choice(CATEGORIES[col], size=n_rows)
+        elif col == 'id':
+            columns[col] = np.arange(1, n_rows + 1)
+        elif col in ('player_fifa_api_id', 'player_api_id'):
+            columns[col] = rng.integers(1, 300000, size=n_rows)
+        elif col == 'player_img':
+            columns[col] = np.full(n_rows, 'https://example.org/player.png', dtype=object)
+        elif col == 'player_name':
+            columns[col] = np.array([f'Player {i}' for i in range(n_rows)], dtype=object)
+        elif col == 'date':
+            columns[col] = np.full(n_rows, '2016-02-18 00:00:00', dtype=object)
+        else:
+            columns[col] = rng.integers(5, 99, size=n_rows).astype(np.float64)
+
+    return pd.DataFrame(columns)
+
+
+def measure(func: Callable, repeat: int = 1000, warmup: int = 10) -> Dict:
+    """Time repeated calls of func and return per-call statistics (seconds)"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    return {
+        'calls': repeat,
+        'mean': sum(timings) / repeat,
+        'p50': timings[int(0.50 * (repeat - 1))],
+        'p95': timings[int(0.95 * (repeat - 1))],
+        'p99': timings[int(0.99 * (repeat - 1))]
+    }
+
+
+def format_stats(label: str, stats: Dict) -> str:
+    return (f"{label:<32} mean={stats['mean'] * 1e6:9.1f}us  "
+            f"p50={stats['p50'] * 1e6:9.1f}us  p95={stats['p95'] * 1e6:9.1f}us")
+
+
+class StubGeminiClient:
+    """Local stand-in for genai.Client: fixed latency, canned advice"""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+        self.models = self
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return SimpleNamespace(text='Stub advice: drills, repetition and recovery.')
+
+
+def environment() -> Dict:
+    """Machine description stored with results (baselines only compare on similar hosts)"""
+    import numpy as np
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def save_baseline(path: str, report: Dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def compare_baseline(path: str, report: Dict, tolerance: float = 0.25) -> List[str]:
+    """Regressions of report against a saved baseline (latency up or throughput down by > tolerance)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ('p50', 'p95'):
+            if metric in current and previous.get(metric):
+                ratio = current[metric] / previous[metric]
+                if ratio > 1 + tolerance:
+                    regressions.append(f"{name} {metric}: {previous[metric] * 1e3:.3f}ms -> {current[metric] * 1e3:.3f}ms (x{ratio:.2f})")
+        if 'throughput' in current and previous.get('throughput'):
+            ratio = current['throughput'] / previous['throughput']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{name} throughput: {previous['throughput']:.1f}/s -> {current['throughput']:.1f}/s (x{ratio:.2f})")
+    return regressions
@@ -0,0 +1,54 @@
+"""In-process load generator for Flask apps (test client, one per thread)."""
+import threading
+import time
+from typing import Callable, Dict
+
+
+def run_load(app, make_request: Callable, concurrency: int = 4, requests: int = 200) -> Dict:
+    """Send ``requests`` calls from ``concurrency`` threads; latency and throughput.
+
+    ``make_request(client, i)`` performs call number i and returns the
+    response; any status >= 400 counts as an error.
+    """
+    latencies = []
+    errors = [0]
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            response = make_request(client, i)
+            # Lire le corps complet (réponses en flux comprises)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        'requests': n,
+        'errors': errors[0],
+        'concurrency': concurrency,
+        'throughput': n / wall if wall > 0 else 0.0,
+        'mean': sum(latencies) / n if n else 0.0,
+        'p50': latencies[int(0.50 * (n - 1))] if n else 0.0,
+        'p95': latencies[int(0.95 * (n - 1))] if n else 0.0,
+        'p99': latencies[int(0.99 * (n - 1))] if n else 0.0
+    }
@@ -0,0 +1,151 @@
+"""Pre-optimisation implementations kept as parity references.
+
+The benchmarks time them against the current code paths and the tests use
+them to check that the optimised paths return exactly the same values.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+
+def legacy_prepare_single_input(service, data: Dict) -> pd.DataFrame:
+    """Original per-column pandas implementation of prepare_single_input"""
+    processed_data = {}
+    scaling_needed = ['acceleration', 'sprint_speed', 'agility']
+
+    for key, value in data.items():
+        if key in scaling_needed:
+            try:
+                val = float(value)
+                if 1 <= val <= 10:
+                    processed_data[key] = val * 10
+                else:
+                    processed_data[key] = val
+            except (ValueError, TypeError):
+                processed_data[key] = 50.0
+        elif key in service.categorical_columns:
+            if isinstance(value, str):
+                processed_data[key] = value.lower().strip()
+            else:
+                processed_data[key] = str(value).lower().strip()
+        else:
+            try:
+                processed_data[key] = float(value)
+            except (ValueError, TypeError):
+                if key in service.expected_columns:
+                    processed_data[key] = 50.0
+
+    for col in service.expected_columns:
+        if col not in processed_data:
+            if col in service.categorical_columns:
+                if col == 'preferred_foot':
+                    processed_data[col] = 'right'
+                elif 'work_rate' in col:
+                    processed_data[col] = 'medium'
+                else:
+                    processed_data[col] = 'unknown'
+            else:
+                processed_data[col] = 50.0
+
+    df = pd.DataFrame([processed_data])
+    df = df[service.expected_columns]
+
+    for col in service.categorical_columns:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+
+    for col in service.numerical_columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(50.0)
+
+    return df
+
+
+def legacy_build_batch_results(service, original_df: pd.DataFrame, df: pd.DataFrame,
+                               final_predictions) -> List[Dict]:
+    """Original row-by-row result assembly of predict_batch"""
+    results = []
+    for i in range(len(df)):
+        player_id = None
+        player_name = None
+
+        possible_id_cols = ['player_fifa_api_id', 'player_id', 'id', 'sofifa_id']
+        possible_name_cols = ['player_name', 'name', 'short_name', 'long_name']
+
+        for id_col in possible_id_cols:
+            if id_col in original_df.columns:
+                player_id = original_df.iloc[i][id_col]
+                break
+
+        for name_col in possible_name_cols:
+            if name_col in original_df.columns:
+                player_name = original_df.iloc[i][name_col]
+                break
+
+        player_data = {}
+
+        for col in service.expected_columns:
+            if col in df.columns:
+                val = df.iloc[i][col]
+                if pd.isna(val):
+                    player_data[col] = None
+                elif isinstance(val, (np.integer, np.int64)):
+                    player_data[col] = int(val)
+                elif isinstance(val, (np.floating, np.float64)):
+                    if np.isnan(val) or np.isinf(val):
+                        player_data[col] = None
+                    else:
+                        player_data[col] = float(val)
+                elif isinstance(val, str):
+                    player_data[col] = str(val)
+                else:
+                    player_data[col] = val
+
+        for col in original_df.columns:
+            if col not in service.expected_columns:
+                val = original_df.iloc[i][col]
+                if pd.isna(val):
+                    player_data[col] = None
+                elif isinstance(val, (np.integer, np.int64)):
+                    player_data[col] = int(val)
+                elif isinstance(val, (np.floating, np.float64)):
+                    if np.isnan(val) or np.isinf(val):
+                        player_data[col] = None
+                    else:
+                        player_data[col] = float(val)
+                elif isinstance(val, pd.Timestamp):
+                    player_data[col] = val.isoformat()
+                elif isinstance(val, str):
+                    player_data[col] = str(val)
+                else:
+                    player_data[col] = val
+
+        result = {
+            'id': i + 1,
+            'player_id': service.clean_data_for_json(player_id) or f'player_{i+1}',
+            'prediction': float(final_predictions[i, 0]) if not np.isnan(final_predictions[i, 0]) else None,
+            'name': service.clean_data_for_json(player_name) or f'Joueur {i+1}',
+            'image': service.clean_data_for_json(original_df.iloc[i].get('player_img', original_df.iloc[i].get('image', '')))
+        }
+
+        for key, value in player_data.items():
+            if key not in result:
+                result[key] = service.clean_data_for_json(value)
+
+        results.append(result)
+
+    return service.clean_data_for_json(results)
+
+
+def legacy_read_batch_csv(service, path: str):
+    """Original batch ingestion: inferred read_csv, full copy, per-column to_numeric"""
+    original_df = pd.read_csv(path)
+    df = original_df.copy()
+    for col in service.expected_columns:
+        if col not in df.columns:
+            df[col] = 'unknown' if col in service.categorical_columns else 50.0
+    for col in service.numerical_columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(50.0)
+    for col in service.categorical_columns:
+        df[col] = df[col].astype(str)
+    return original_df, df[service.expected_columns]
@@ -0,0 +1,157 @@
+"""Microbenchmarks and in-process load test of the prediction API.
+
+Usage (from prediction-api/):
+    python -m benchmarks.suite [--quick] [--output results.json]
+                               [--save-baseline baseline.json]
+                               [--compare baseline.json --tolerance 0.25]
+
+Micro: prepare_single_input, predict_single (cache miss and hit) and
+predict_batch at several sizes, on synthetic players shaped like
+shared/data/sample.csv. Load: /single, /batch and /recommendations
+through the Flask test client from several threads, with Gemini replaced
+by a local stub. The load generator shares the server's process (and
+GIL), so its figures compare runs with each other, not with production.
+
+With --compare, exits 1 when a p50/p95 grew or a throughput fell by more
+than the tolerance.
+"""
+import argparse
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+
+from benchmarks.common import (
+    ROOT_DIR, StubGeminiClient, compare_baseline, environment, format_stats, measure,
+    save_baseline, synthetic_players
+)
+from benchmarks.loadgen import run_load
+
+
+def load_app():
+    # app.py et le paquet app/ portent le même nom : charger le module par son chemin
+    spec = importlib.util.spec_from_file_location('prediction_app', os.path.join(ROOT_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def player_payloads(n_rows: int, seed: int = 0):
+    """JSON-ready player dicts (distinct values, so each one misses the prediction cache)"""
+    df = synthetic_players(n_rows, seed=seed)
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def csv_file(n_rows: int, directory: str) -> str:
+    path = os.path.join(directory, f'players_{n_rows}.csv')
+    if not os.path.exists(path):
+        synthetic_players(n_rows).to_csv(path, index=False)
+    return path
+
+
+def run_micro(results, quick: bool, workdir: str):
+    from app.services.prediction_service import prediction_service as service
+
+    repeat = 200 if quick else 2000
+    payloads = player_payloads(repeat + 20, seed=1)
+    sample = payloads[0]
+
+    results['micro.prepare_single_input'] = measure(lambda: service.prepare_single_input(sample), repeat=repeat)
+
+    # Échec de cache : une nouvelle ligne à chaque appel
+    misses = iter(payloads)
+    results['micro.predict_single.miss'] = measure(lambda: service.predict_single(next(misses)), repeat=repeat)
+    results['micro.predict_single.hit'] = measure(lambda: service.predict_single(sample), repeat=repeat)
+
+    sizes = (10, 100, 1000) if quick else (10, 100, 1000, 10000)
+    for n_rows in sizes:
+        path = csv_file(n_rows, workdir)
+        stats = measure(lambda: service.predict_batch(path), repeat=max(3, min(50, 20000 // n_rows)), warmup=1)
+        stats['rows_per_second'] = n_rows / stats['mean']
+        results[f'micro.predict_batch.{n_rows}'] = stats
+
+
+def run_load_tests(results, app, quick: bool, concurrency: int, workdir: str):
+    from flask_jwt_extended import create_access_token
+    from app.services.recommendation_service import recommendation_service
+
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {create_access_token(identity='bench-user')}"}
+
+    requests = 200 if quick else 2000
+    payloads = player_payloads(requests, seed=2)
+
+    def single(client, i):
+        return client.post('/api/predict/single', json=payloads[i], headers=headers)
+    results['load.single'] = run_load(app, single, concurrency, requests)
+
+    with open(csv_file(100, workdir), 'rb') as f:
+        batch_csv = f.read()
+
+    def batch(client, i):
+        data = {'file': (io.BytesIO(batch_csv), 'players.csv')}
+        return client.post('/api/predict/batch', data=data, headers=headers, content_type='multipart/form-data')
+    results['load.batch.100'] = run_load(app, batch, concurrency, max(20, requests // 10))
+
+    # Gemini remplacé par un stub local à latence fixe ; le cache de conseils se remplit au fil de l'eau
+    stub = StubGeminiClient(latency=0.05)
+    previous = recommendation_service.gemini_client
+    recommendation_service.gemini_client = stub
+    try:
+        def recommendations(client, i):
+            return client.post('/api/predict/recommendations', headers=headers,
+                               json={'player_data': payloads[i], 'prediction': 60})
+        stats = run_load(app, recommendations, concurrency, max(20, requests // 4))
+        stats['gemini_calls'] = stub.calls
+        results['load.recommendations'] = stats
+    finally:
+        recommendation_service.gemini_client = previous
+
+
+def print_results(results):
+    for name, stats in results.items():
+        line = format_stats(name, stats)
+        if 'throughput' in stats:
+            line += f"  p99={stats['p99'] * 1e6:9.1f}us  {stats['throughput']:8.1f} req/s  errors={stats['errors']}"
+        elif 'rows_per_second' in stats:
+            line += f"  {stats['rows_per_second']:10.0f} rows/s"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='fewer calls and sizes (smoke run)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--save-baseline', help='write the results as the new baseline')
+    parser.add_argument('--compare', help='baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    app = load_app()
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='bench-suite-')
+    run_micro(results, args.quick, workdir)
+    if not args.skip_load:
+        run_load_tests(results, app, args.quick, args.concurrency, workdir)
+
+    report = {'api': 'prediction-api', 'environment': environment(), 'results': results}
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            save_baseline(path, report)
+
+    if args.compare:
+        regressions = compare_baseline(args.compare, report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
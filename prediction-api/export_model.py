@@ -0,0 +1,51 @@
+"""Export model versions to the memory-mappable artifact format.
+
+Usage (from prediction-api/):
+    python export_model.py [--version 02_03_2025__18_26_55] [--models-dir ../shared/models] [--output DIR]
+
+Without --version every registry version is exported. Each export is
+written next to the pickles as <version>_artifact/, which the registry
+then loads instead of unpickling (MODEL_PREFER_ARTIFACTS=false disables).
+"""
+import argparse
+import os
+import time
+
+from app.services.model_artifact import export_bundle, open_artifact
+from app.services.model_bundle import ModelBundle
+from app.services.model_registry import ModelRegistry, ARTIFACT_SUFFIX
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', default=os.getenv('MODEL_REGISTRY_DIR', '../shared/models'))
+    parser.add_argument('--version', help='version to export (default: all)')
+    parser.add_argument('--output', help='output directory (single version only)')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.models_dir, prefer_artifacts=False)
+    versions = [registry.get(args.version)] if args.version else registry.scan()
+    if not versions or versions[0] is None:
+        parser.error(f"no model version found in {args.models_dir}")
+    if args.output and len(versions) > 1:
+        parser.error("--output requires --version")
+
+    for spec in versions:
+        output = args.output or os.path.join(args.models_dir, f"{spec['version']}{ARTIFACT_SUFFIX}")
+        bundle = ModelBundle.load(spec['paths'], spec['version'])
+        export_bundle(bundle, output)
+
+        # Relire l'export et vérifier qu'il prédit comme les pickles
+        started = time.perf_counter()
+        exported = open_artifact(output)
+        opened = time.perf_counter() - started
+        report = exported.smoke_test()
+        status = 'ok' if report['ok'] else 'MISMATCH'
+        print(f"{spec['version']} -> {output} (open {opened * 1000:.1f} ms, "
+              f"max error {report['max_abs_error']:.2e}, {status})")
+        if not report['ok']:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(ROOT_DIR, '..', 'shared', 'models')
+SAMPLE_CSV = os.path.join(ROOT_DIR, '..', 'shared', 'data', 'sample.csv')
+THRESHOLDS_JSON = os.path.join(ROOT_DIR, '..', 'shared', 'data', 'attribute_thresholds.json')
+
+# Les services chargent les modèles à l'import : pointer vers le bundle partagé
+os.environ.setdefault('MODEL_PATH', os.path.join(MODELS_DIR, '02_03_2025__18_26_55_best_model.pkl'))
+os.environ.setdefault('TRANSFORMER_PATH', os.path.join(MODELS_DIR, '02_03_2025__18_25_41_full_transformer.pkl'))
+os.environ.setdefault('TARGET_PIPELINE_PATH', os.path.join(MODELS_DIR, '02_03_2025__18_25_41_target_pipeline.pkl'))
+os.environ.setdefault('MODEL_REGISTRY_DIR', MODELS_DIR)
+os.environ.setdefault('PARITY_SAMPLE_PATH', SAMPLE_CSV)
+os.environ.setdefault('THRESHOLDS_PATH', THRESHOLDS_JSON)
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+os.environ.setdefault('GEMINI_API_KEY', 'dev-mode-no-gemini')
+os.environ.setdefault('SIMILARITY_INDEX', 'true')
+os.environ.setdefault('BATCH_JOBS_DIR', tempfile.mkdtemp(prefix='prediction-jobs-'))
+os.environ.setdefault('PREDICTION_HISTORY_DB', os.path.join(tempfile.mkdtemp(prefix='prediction-history-'), 'database.sqlite'))
+os.environ.setdefault('ADVICE_CACHE_PATH', os.path.join(tempfile.mkdtemp(prefix='advice-cache-'), 'advice.sqlite'))
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    # app.py et le paquet app/ portent le même nom : charger le module par son chemin
+    spec = importlib.util.spec_from_file_location('prediction_app', os.path.join(ROOT_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.app.config['TESTING'] = True
+    return module.app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def auth_headers(flask_app):
+    from flask_jwt_extended import create_access_token
+
+    with flask_app.app_context():
+        token = create_access_token(identity='test-user')
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,334 @@
+import io
+import os
+import tempfile
+import time
+import json
+
+import pandas as pd
+
+from tests.conftest import SAMPLE_CSV
+
+
+def _upload(path=SAMPLE_CSV, name='players.csv'):
+    with open(path, 'rb') as f:
+        return {'file': (io.BytesIO(f.read()), name)}
+
+
+def test_predict_single(client, auth_headers):
+    response = client.post('/api/predict/single', json={'potential': 80, 'dribbling': 70},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
+
+
+def test_whatif_sweep_matches_single_predictions(client, auth_headers):
+    player = {'potential': 80, 'dribbling': 70, 'finishing': 98}
+    response = client.post('/api/predict/whatif', headers=auth_headers, json={
+        'player_data': player,
+        'scenarios': [{'dribbling': 5, 'finishing': 5}],
+        'sweep': {'steps': [-5, 5], 'attributes': ['dribbling', 'finishing']}
+    })
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['variants_scored'] == 6
+
+    def single(data):
+        return client.post('/api/predict/single', json=data, headers=auth_headers).get_json()['prediction']
+
+    base = single(player)
+    assert result['base_prediction'] == base
+    # finishing +5 est borné à 100
+    assert result['scenarios'][0]['prediction'] == single(dict(player, dribbling=75, finishing=100))
+    table = result['sensitivity']
+    assert table['changes'][0][1] == round(single(dict(player, dribbling=75)) - base, 2)
+    assert table['changes'][1][0] == round(single(dict(player, finishing=93)) - base, 2)
+
+    response = client.post('/api/predict/whatif', headers=auth_headers,
+                           json={'player_data': player, 'scenarios': [{'height': 5}]})
+    assert response.status_code == 400
+
+
+def test_whatif_keeps_out_of_range_inputs_of_the_base_player(client, auth_headers):
+    # Valeur hors échelle : seules les valeurs modifiées sont bornées, comme /single le joueur de base
+    player = {'potential': 80, 'dribbling': 70, 'crossing': 130}
+    result = client.post('/api/predict/whatif', headers=auth_headers, json={
+        'player_data': player, 'sweep': {'steps': [5], 'attributes': ['dribbling']}
+    }).get_json()
+
+    def single(data):
+        return client.post('/api/predict/single', json=data, headers=auth_headers).get_json()['prediction']
+
+    base = single(player)
+    assert result['base_prediction'] == base
+    assert result['sensitivity']['changes'][0][0] == round(single(dict(player, dribbling=75)) - base, 2)
+
+
+def test_health_reports_active_model(client, auth_headers, monkeypatch):
+    health = client.get('/api/predict/health').get_json()
+    assert health['model']['active']['version'] == '02_03_2025__18_26_55'
+    assert 'load_seconds' in health['model']['active']['timings']
+
+    models = client.get('/api/predict/models', headers=auth_headers).get_json()
+    assert len(models['versions']) == 2
+    response = client.post('/api/predict/models/activate', json={'version': 'missing'}, headers=auth_headers)
+    assert response.status_code == 403
+
+    # Jeton d'administration requis pour basculer le modèle de tout le service
+    monkeypatch.setenv('MODEL_ADMIN_TOKEN', 'admin-secret')
+    response = client.post('/api/predict/models/activate', json={'version': 'missing'},
+                           headers={**auth_headers, 'X-Admin-Token': 'wrong'})
+    assert response.status_code == 403
+    response = client.post('/api/predict/models/activate', json={'version': 'missing'},
+                           headers={**auth_headers, 'X-Admin-Token': 'admin-secret'})
+    assert response.status_code == 404
+
+
+def test_metrics_exposes_stage_and_request_metrics(client, auth_headers):
+    client.post('/api/predict/single', json={'potential': 77}, headers=auth_headers)
+    client.post('/api/predict/batch', data=_upload(), headers=auth_headers, content_type='multipart/form-data')
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    for stage in ('prepare', 'transform', 'predict', 'inverse_transform', 'read_csv', 'results', 'serialize'):
+        assert f'prediction_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'prediction_rows_total{source="batch"}' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="/api/predict/single",method="POST",le="+Inf"}' in text
+    assert 'http_requests_total{endpoint="/api/predict/batch",method="POST",status="200"}' in text
+
+
+def test_predict_batch_buffered(client, auth_headers):
+    response = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['total_players'] == len(pd.read_csv(SAMPLE_CSV))
+
+
+def test_predict_batch_stream_ndjson_matches_buffered(client, auth_headers):
+    buffered = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data').get_json()
+    response = client.post('/api/predict/batch?stream=ndjson&chunk_size=2', data=_upload(),
+                           headers=auth_headers, content_type='multipart/form-data')
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    summary = lines.pop()
+    assert lines == buffered['predictions']
+    assert summary['success'] is True
+    assert summary['total_players'] == buffered['total_players']
+    assert summary['reuse']['rows'] == buffered['total_players']
+
+
+def test_predict_batch_stream_json_matches_buffered(client, auth_headers):
+    buffered = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data').get_json()
+    response = client.post('/api/predict/batch?stream=json&chunk_size=3', data=_upload(),
+                           headers=auth_headers, content_type='multipart/form-data')
+    streamed = json.loads(response.get_data(as_text=True))
+
+    # Même fichier, même modèle : le second envoi est servi par le cache
+    assert streamed.pop('reuse')['reuse_ratio'] == 1.0
+    buffered.pop('reuse')
+    assert streamed == buffered
+
+
+def test_predict_batch_scores_each_distinct_player_once(client, auth_headers, tmp_path):
+    # Mêmes joueurs répétés (instantanés identiques) et attributs jamais vus par le cache
+    frame = pd.read_csv(SAMPLE_CSV)
+    frame['potential'] = frame['potential'] + 0.25
+    repeated = pd.concat([frame] * 4, ignore_index=True)
+    path = tmp_path / 'repeated.csv'
+    repeated.to_csv(path, index=False)
+
+    first = client.post('/api/predict/batch', data=_upload(str(path), 'repeated.csv'), headers=auth_headers,
+                        content_type='multipart/form-data').get_json()
+    assert first['reuse'] == {
+        'rows': len(repeated), 'unique_rows': len(frame), 'cached_rows': 0, 'scored_rows': len(frame),
+        'duplicate_ratio': 0.75, 'cache_ratio': 0.0, 'reuse_ratio': 0.75
+    }
+    predictions = [row['prediction'] for row in first['predictions']]
+    assert predictions == predictions[:len(frame)] * 4
+
+    # Ré-envoi avec une ligne modifiée : seule celle-ci est rescorée
+    repeated.loc[0, 'crossing'] = 12.0
+    repeated.to_csv(path, index=False)
+    second = client.post('/api/predict/batch', data=_upload(str(path), 'repeated.csv'), headers=auth_headers,
+                         content_type='multipart/form-data').get_json()
+    assert second['reuse']['scored_rows'] == 1
+    assert second['reuse']['cached_rows'] == len(frame)
+    assert [row['prediction'] for row in second['predictions']][1:] == predictions[1:]
+
+
+def test_stored_batch_results_page_sort_filter_and_top(client, auth_headers):
+    buffered = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data').get_json()['predictions']
+    response = client.post('/api/predict/batch?store=true&limit=2', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['total_players'] == len(buffered)
+    assert body['predictions'] == buffered[:2]
+    url = body['results_url']
+
+    page = client.get(f'{url}?sort=prediction&limit=3&offset=1', headers=auth_headers).get_json()
+    by_prediction = sorted(buffered, key=lambda row: -row['prediction'])
+    assert page['predictions'] == by_prediction[1:4]
+
+    left = [row for row in buffered if row['preferred_foot'] == 'left' and row['potential'] > 70]
+    page = client.get(f'{url}?filter=preferred_foot:eq:left&filter=potential:gt:70&sort=potential&order=asc',
+                      headers=auth_headers).get_json()
+    assert page['matching_players'] == len(left)
+    assert page['predictions'] == sorted(left, key=lambda row: row['potential'])
+
+    top = client.get(f"{body['top_url']}?k=2", headers=auth_headers).get_json()
+    assert top['predictions'] == by_prediction[:2]
+
+    assert client.get(f'{url}?filter=potential:gt:abc', headers=auth_headers).status_code == 400
+    assert client.get(f'{url}?sort=unknown', headers=auth_headers).status_code == 400
+    assert client.delete(url, headers=auth_headers).status_code == 200
+    assert client.get(url, headers=auth_headers).status_code == 404
+
+
+def test_similar_players_from_scored_batch(client, auth_headers):
+    buffered = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data').get_json()['predictions']
+    query = buffered[0]
+
+    response = client.post('/api/predict/similar', json={'player_id': query['player_id'], 'k': 3},
+                           headers=auth_headers)
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['method'] == 'exact'
+    neighbors = body['neighbors']
+    assert len(neighbors) == 3
+    assert query['player_id'] not in [neighbor['player_id'] for neighbor in neighbors]
+    distances = [neighbor['distance'] for neighbor in neighbors]
+    assert distances == sorted(distances)
+    predictions = {row['player_id']: row['prediction'] for row in buffered}
+    assert all(neighbor['prediction'] == predictions[neighbor['player_id']] for neighbor in neighbors)
+
+    # Attributs bruts : le joueur lui-même est son plus proche voisin
+    player_data = {key: value for key, value in query.items() if key not in ('id', 'prediction', 'image')}
+    nearest = client.post('/api/predict/similar', json={'player_data': player_data, 'k': 1},
+                          headers=auth_headers).get_json()['neighbors'][0]
+    assert nearest['player_id'] == query['player_id']
+    assert nearest['distance'] < 1e-3
+
+    assert client.post('/api/predict/similar', json={'player_id': 'unknown'},
+                       headers=auth_headers).status_code == 404
+    assert client.post('/api/predict/similar', json={}, headers=auth_headers).status_code == 400
+
+
+def test_similar_players_when_indexing_disabled(client, auth_headers, monkeypatch):
+    monkeypatch.setattr('app.routes.prediction.similarity_indexes', None)
+    response = client.post('/api/predict/similar', json={'player_id': 'any'}, headers=auth_headers)
+    assert response.status_code == 404
+    assert 'disabled' in response.get_json()['error']
+
+
+def _columnar_upload(suffix):
+    buffer = io.BytesIO()
+    frame = pd.read_csv(SAMPLE_CSV)
+    if suffix == '.parquet':
+        frame.to_parquet(buffer, index=False)
+    else:
+        frame.to_feather(buffer)
+    return {'file': (io.BytesIO(buffer.getvalue()), f'players{suffix}')}
+
+
+def test_predict_batch_columnar_upload_matches_csv(client, auth_headers):
+    buffered = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data').get_json()
+    for suffix in ('.parquet', '.feather'):
+        response = client.post('/api/predict/batch', data=_columnar_upload(suffix), headers=auth_headers,
+                               content_type='multipart/form-data')
+        body = response.get_json()
+        assert response.status_code == 200
+        assert [row['prediction'] for row in body['predictions']] == \
+            [row['prediction'] for row in buffered['predictions']]
+
+
+def test_predict_batch_parquet_output(client, auth_headers):
+    buffered = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data').get_json()
+    response = client.post('/api/predict/batch?format=parquet', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/vnd.apache.parquet'
+    frame = pd.read_parquet(io.BytesIO(response.get_data()))
+    assert len(frame) == buffered['total_players']
+    assert frame['prediction'].round(2).tolist() == [row['prediction'] for row in buffered['predictions']]
+
+
+def test_predict_batch_rejects_unknown_format(client, auth_headers):
+    response = client.post('/api/predict/batch?format=xml', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+
+def _wait_for_job(client, headers, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/predict/jobs/{job_id}', headers=headers).get_json()['job']
+        if job['status'] in ('completed', 'failed', 'cancelled'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_batch_job_lifecycle(client, auth_headers):
+    buffered = client.post('/api/predict/batch', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data').get_json()
+
+    response = client.post('/api/predict/jobs', data=_upload(), headers=auth_headers,
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['id']
+
+    job = _wait_for_job(client, auth_headers, job_id)
+    assert job['status'] == 'completed'
+    assert job['rows_done'] == job['rows_total'] == buffered['total_players']
+
+    page = client.get(f'/api/predict/jobs/{job_id}/results?offset=1&limit=2',
+                      headers=auth_headers).get_json()
+    assert page['predictions'] == buffered['predictions'][1:3]
+
+    download = client.get(f'/api/predict/jobs/{job_id}/download', headers=auth_headers)
+    lines = [json.loads(line) for line in download.get_data(as_text=True).splitlines()]
+    assert lines == buffered['predictions']
+    # Même ordre de clés que la réponse /batch
+    assert [list(line) for line in lines] == [list(row) for row in buffered['predictions']]
+
+    listed = client.get('/api/predict/jobs', headers=auth_headers).get_json()
+    assert job_id in [item['id'] for item in listed['jobs']]
+
+
+def test_batch_job_is_private_to_its_owner(client, auth_headers, flask_app):
+    from flask_jwt_extended import create_access_token
+
+    job_id = client.post('/api/predict/jobs', data=_upload(), headers=auth_headers,
+                         content_type='multipart/form-data').get_json()['job']['id']
+    with flask_app.app_context():
+        other = {'Authorization': f"Bearer {create_access_token(identity='someone-else')}"}
+
+    assert client.get(f'/api/predict/jobs/{job_id}', headers=other).status_code == 404
+    assert client.post(f'/api/predict/jobs/{job_id}/cancel', headers=other).status_code == 404
+    _wait_for_job(client, auth_headers, job_id)
+
+
+def test_cancel_queued_batch_job(client, auth_headers):
+    from app.services.job_service import job_service
+
+    job = job_service.get(job_service.submit(_copy_sample(), 'players.csv', user_id='test-user')['id'])
+    cancelled = job_service.cancel(job['id'])
+    assert cancelled['status'] in ('cancelled', 'cancelling', 'completed')
+    assert _wait_for_job(client, auth_headers, job['id'])['status'] in ('cancelled', 'completed')
+
+
+def _copy_sample():
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(fd, 'wb') as out, open(SAMPLE_CSV, 'rb') as f:
+        out.write(f.read())
+    return path
@@ -0,0 +1,755 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.conftest import SAMPLE_CSV, MODELS_DIR, THRESHOLDS_JSON
+from benchmarks.reference import legacy_prepare_single_input, legacy_build_batch_results, legacy_read_batch_csv
+from benchmarks.common import compare_baseline, save_baseline
+from benchmarks.loadgen import run_load
+from app.services.micro_batcher import MicroBatcher
+from app.services.svr_engine import SVREngine
+from app.services.parallel_scoring import ParallelScorer
+from app.services.prediction_cache import PredictionCache, feature_fingerprint, unique_rows
+from app.services.model_registry import ModelRegistry
+from app.services.model_artifact import export_bundle, open_artifact
+from app.services.prediction_service import prediction_service, PredictionService
+from app.services.recommendation_service import RecommendationService
+from app.services.prediction_recorder import PredictionRecorder
+from app.services.similarity_index import SimilarityIndex, SimilarityIndexes
+from app.services.result_store import ResultStore
+from app.services.job_service import JobService
+from app.services import batch_io
+
+
+PLAYER = {
+    'potential': 80, 'crossing': 65, 'finishing': 70, 'dribbling': 75,
+    'acceleration': 7, 'sprint_speed': 85, 'agility': '6',
+    'preferred_foot': ' Left ', 'attacking_work_rate': 'High'
+}
+
+
+def _players(n):
+    return [dict(PLAYER, potential=60 + i, finishing=40 + 2 * i) for i in range(n)]
+
+
+# --- Micro-batching -------------------------------------------------------
+
+def test_micro_batcher_coalesces_concurrent_calls():
+    seen = []
+
+    def handler(items):
+        seen.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=8, max_wait_ms=50)
+    results = {}
+
+    def call(i):
+        results[i] = batcher.submit(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert results == {i: i * 2 for i in range(8)}
+    assert max(seen) > 1
+    stats = batcher.stats()
+    assert stats['batch_size']['count'] == len(seen)
+    assert stats['queue_wait_seconds']['count'] == 8
+
+
+def test_micro_batcher_isolates_errors():
+    def handler(items):
+        return [ValueError('bad') if item < 0 else item for item in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=4, max_wait_ms=1)
+    assert batcher.submit(3) == 3
+    with pytest.raises(ValueError):
+        batcher.submit(-1)
+    batcher.close()
+
+
+def test_batched_predict_single_matches_unbatched(monkeypatch):
+    players = _players(12)
+    expected = [prediction_service.predict_single(p) for p in players]
+
+    monkeypatch.setenv('PREDICTION_BATCHING', 'true')
+    monkeypatch.setenv('PREDICTION_BATCH_MAX_WAIT_MS', '20')
+    service = PredictionService()
+    results = [None] * len(players)
+
+    def call(i):
+        results[i] = service.predict_single(players[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(players))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    service.batcher.close()
+
+    assert results == expected
+
+
+# --- Compiled input schema ------------------------------------------------
+
+@pytest.mark.parametrize('payload', [
+    {},
+    PLAYER,
+    {'acceleration': 1, 'sprint_speed': 10, 'agility': 10.5},
+    {'acceleration': 0.5, 'sprint_speed': 'fast', 'agility': None},
+    {'potential': 'abc', 'crossing': None, 'finishing': float('nan'), 'volleys': True},
+    {'curve': float('inf'), 'stamina': ' 71 ', 'unknown_field': 3, 'other': 'x'},
+    {'preferred_foot': None, 'attacking_work_rate': 3, 'defensive_work_rate': '  MEDIUM'},
+])
+def test_prepare_single_input_matches_legacy_path(payload):
+    expected = legacy_prepare_single_input(prediction_service, payload)
+    result = prediction_service.prepare_single_input(payload)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_prepare_single_row_fills_preallocated_arrays():
+    numeric, categorical = prediction_service.prepare_single_row(PLAYER)
+    schema = prediction_service.input_schema
+
+    assert numeric.dtype == np.float64
+    assert numeric.shape == (len(schema.numerical_columns),)
+    assert numeric[schema.numerical_columns.index('acceleration')] == 70.0
+    assert numeric[schema.numerical_columns.index('stamina')] == 50.0
+    assert list(categorical) == ['left', 'high', 'medium']
+
+
+# --- Compiled feature encoder ---------------------------------------------
+
+def test_feature_encoder_is_compiled_at_load():
+    assert prediction_service.feature_encoder is not None
+
+
+def test_feature_encoder_matches_transformer_on_sample():
+    frame = pd.read_csv(SAMPLE_CSV)
+    rows = [prediction_service.prepare_single_row(r) for r in frame.to_dict('records')]
+    rows.append(prediction_service.prepare_single_row({'preferred_foot': 'both', 'attacking_work_rate': 'None'}))
+    numeric = np.vstack([r[0] for r in rows])
+    categorical = np.vstack([r[1] for r in rows])
+
+    expected = prediction_service.transformer.transform(
+        prediction_service.input_schema.to_frame(numeric, categorical)
+    )
+    actual = prediction_service.feature_encoder.transform(numeric, categorical)
+    np.testing.assert_array_equal(actual, expected)
+
+
+# --- SVR engine -----------------------------------------------------------
+
+@pytest.mark.parametrize('dtype,tolerance', [(np.float64, 1e-10), (np.float32, 1e-4)])
+def test_svr_engine_matches_model_predict(dtype, tolerance):
+    rng = np.random.default_rng(0)
+    model = prediction_service.model
+    X = rng.normal(size=(257, model.support_vectors_.shape[1]))
+
+    # Petits blocs pour couvrir le découpage
+    engine = SVREngine.from_model(model, dtype=dtype, max_block_bytes=64 * 1024)
+    assert engine.block_rows < len(X)
+    np.testing.assert_allclose(engine.predict(X), model.predict(X), rtol=0, atol=tolerance)
+
+
+# --- Columnar batch result assembly ---------------------------------------
+
+@pytest.mark.parametrize('frame', [
+    pd.read_csv(SAMPLE_CSV),
+    # Uniquement numérique : l'accès ligne par ligne convertit les entiers en flottants
+    pd.DataFrame({'player_id': [7, 0], 'potential': [80.0, np.nan], 'score': [np.inf, 60.0]}),
+    pd.DataFrame({
+        'name': ['A', np.nan], 'image': [None, 'x.png'], 'finishing': ['70', 'abc'],
+        'preferred_foot': ['Left', np.nan], 'date': pd.to_datetime(['2016-01-01', None]),
+        'note': [1.5, np.nan]
+    }),
+])
+def test_build_batch_results_matches_legacy_loop(frame):
+    df = prediction_service.prepare_batch_frame(frame)
+    predictions = prediction_service.score_frame(df)
+
+    expected = legacy_build_batch_results(prediction_service, frame, df, predictions.reshape(-1, 1))
+    results = prediction_service.build_batch_results(frame, df, predictions)
+    assert json.dumps(results, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+
+# --- Process-pool scoring -------------------------------------------------
+
+def test_parallel_scorer_preserves_input_order():
+    frame = pd.concat([pd.read_csv(SAMPLE_CSV)] * 7, ignore_index=True)
+    frame['potential'] = np.arange(len(frame)) % 40 + 50.0
+    df = prediction_service.prepare_batch_frame(frame)
+    numeric = df[prediction_service.input_schema.numerical_columns].to_numpy(dtype=np.float64)
+    categorical = df[prediction_service.input_schema.categorical_columns].to_numpy(dtype=object)
+
+    bundle = prediction_service.bundle
+    scorer = ParallelScorer(2, shard_rows=4, version=(bundle.version, bundle.paths))
+    try:
+        result = scorer.score(numeric, categorical)
+    finally:
+        scorer.shutdown()
+
+    np.testing.assert_array_equal(result, prediction_service.score_rows(numeric, categorical))
+
+
+# --- Prediction cache -----------------------------------------------------
+
+def test_feature_fingerprint_is_canonical():
+    a = prediction_service.prepare_single_row({'potential': 80, 'acceleration': 7, 'preferred_foot': 'Left'})
+    b = prediction_service.prepare_single_row({'preferred_foot': ' left', 'acceleration': '70', 'potential': 80.0})
+    c = prediction_service.prepare_single_row({'potential': 81})
+    assert feature_fingerprint(*a) == feature_fingerprint(*b)
+    assert feature_fingerprint(*a) != feature_fingerprint(*c)
+
+
+def test_unique_rows_groups_identical_vectors():
+    numeric = np.array([[1.0, 0.0], [1.0, -0.0], [2.0, 0.0], [1.0, 0.0]])
+    categorical = np.array([['left'], ['left'], ['left'], ['right']], dtype=object)
+    first, inverse = unique_rows(numeric, categorical)
+
+    assert len(first) == 3
+    assert inverse[0] == inverse[1]
+    assert len({inverse[0], inverse[2], inverse[3]}) == 3
+    np.testing.assert_array_equal(numeric[first][inverse] + 0.0, numeric + 0.0)
+
+
+def test_result_store_keeps_typed_columns_and_renders_like_json():
+    rng = np.random.default_rng(3)
+    frame = pd.concat([pd.read_csv(SAMPLE_CSV)] * 40, ignore_index=True)
+    frame['potential'] = rng.integers(40, 95, len(frame))
+    # Colonne supplémentaire (non préparée) avec valeurs manquantes
+    frame['market_value'] = rng.normal(10, 3, len(frame)).round(2)
+    frame.loc[::7, 'market_value'] = np.nan
+    df = prediction_service.prepare_batch_frame(frame)
+    predictions = rng.normal(65, 8, len(frame)).round(1)
+    keys, json_columns = prediction_service.build_batch_columns(frame, df, predictions)
+    _, columns = prediction_service.build_batch_columns(frame, df, predictions, json_ready=False)
+    records = [dict(zip(keys, values)) for values in zip(*json_columns)]
+
+    result = ResultStore().put('user', keys, columns)
+    assert result.columns['prediction'].dtype == np.float64
+    assert result.columns['potential'].dtype.kind in 'if'
+    assert result.records(np.arange(len(records))) == records
+
+    filters = [('potential', 'gte', 60), ('preferred_foot', 'eq', 'right'), ('market_value', 'lt', 11)]
+    expected = [r for r in records if r['potential'] >= 60 and r['preferred_foot'] == 'right'
+                and r['market_value'] is not None and r['market_value'] < 11]
+    total, positions = result.query(filters, 'prediction', True, 0, len(records))
+    assert total == len(expected)
+    assert result.records(positions) == sorted(expected, key=lambda r: -r['prediction'])
+
+    total, positions = result.top('market_value', 5, [], descending=False)
+    valued = [r for r in records if r['market_value'] is not None]
+    assert total == len(valued) < len(records)
+    assert result.records(positions) == sorted(valued, key=lambda r: r['market_value'])[:5]
+
+
+def test_similarity_index_ivf_recall_and_updates():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(scale=4.0, size=(40, 16))
+    vectors = (centers[rng.integers(0, 40, 6000)] + rng.normal(size=(6000, 16))).astype(np.float32)
+    ids = [f'p{i}' for i in range(6000)]
+
+    exact = SimilarityIndex(ivf_min_rows=10 ** 9, block_rows=1000)
+    ivf = SimilarityIndex(ivf_min_rows=2000, n_probe=8, block_rows=1000)
+    for start in range(0, 6000, 1500):
+        # Ajouts incrémentaux, comme des lots scorés successivement
+        for index in (exact, ivf):
+            index.add(vectors[start:start + 1500], ids[start:start + 1500], ids[start:start + 1500],
+                      np.arange(start, start + 1500, dtype=float), identity='v1')
+    assert exact.method == 'exact' and ivf.method == 'ivf' and len(ivf) == 6000
+
+    queries = rng.choice(6000, size=50, replace=False)
+    hits = 0
+    for row in queries:
+        expected, expected_distances = exact.search(vectors[row], k=10)
+        found, _ = ivf.search(vectors[row], k=10)
+        assert expected[0] == row and expected_distances[0] < 1e-3
+        assert np.all(np.diff(expected_distances) >= 0)
+        hits += len(set(expected) & set(found))
+    assert hits / (50 * 10) >= 0.9
+
+    # Joueur rescoré (deux fois dans le même lot) : dernier vecteur retenu, pas de doublon
+    ivf.add(np.vstack([vectors[:1] - 50, vectors[:1] + 50]), ['p0', 'p0'], ['p0', 'p0'], np.array([98.0, 99.0]),
+            identity='v1')
+    assert len(ivf) == 6000
+    # Nouveaux joueurs sans réentraînement : ajoutés à leur partition
+    ivf.add(vectors[:500] + 0.5, [f'n{i}' for i in range(500)], ids[:500], np.zeros(500), identity='v1')
+    assert len(ivf) == 6500 and ivf.stats()['trainings'] == 2
+    # Partitions mises à jour sur place : identiques à une reconstruction complète
+    partitions = [ivf._partition(part) for part in range(len(ivf._centroids))]
+    assert sorted(np.concatenate([rows for rows, _, _ in partitions]).tolist()) == list(range(6500))
+    for part, (rows, part_vectors, norms) in enumerate(partitions):
+        assert np.all(ivf._assign[rows] == part)
+        assert np.array_equal(part_vectors, ivf._vectors[rows]) and np.array_equal(norms, ivf._sq_norms[rows])
+    rows, distances = ivf.search(vectors[0] + 50, k=1, exact=True)
+    assert ivf.players(rows) == [{'player_id': 'p0', 'name': 'p0', 'prediction': 99.0}] and distances[0] < 1e-3
+
+    # Autre version du modèle : l'index repart de zéro
+    ivf.add(vectors[:10], ids[:10], ids[:10], np.zeros(10), identity='v2')
+    assert len(ivf) == 10 and ivf.method == 'exact'
+
+
+def test_similarity_indexes_bounded_per_user(monkeypatch):
+    indexes = SimilarityIndexes(max_players=100, ttl_seconds=60)
+    vectors = np.random.default_rng(0).normal(size=(60, 4)).astype(np.float32)
+    ids = list(range(60))
+    for user_id in ('alice', 'bob'):
+        indexes.for_user(user_id).add(vectors, ids, ids, np.zeros(60), identity='v1')
+    # Budget global dépassé : l'utilisateur le moins récent est évincé
+    assert indexes.get('alice') is None and len(indexes.get('bob')) == 60
+    assert indexes.stats() == {'evicted': 1, 'expired': 0, 'users': 1, 'players': 60, 'max_players': 100}
+
+    # Un seul utilisateur ne dépasse jamais le budget
+    indexes.for_user('carol').add(np.tile(vectors, (2, 1)), list(range(120)), list(range(120)), np.zeros(120),
+                                  identity='v1')
+    assert len(indexes.get('carol')) == 100 and indexes.get('bob') is None
+
+    # Index inutilisé au-delà du TTL : supprimé
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 61)
+    assert indexes.get('carol') is None and indexes.stats()['expired'] == 1
+
+
+def test_prediction_cache_lru_and_shared_tier(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite')
+    cache = PredictionCache(max_entries=2, db_path=db_path, identity='model-a')
+    cache.put_many({'k1': 1.0, 'k2': 2.0, 'k3': 3.0})
+    assert cache.stats()['evictions'] == 1
+
+    # Un autre worker retrouve k1 dans le niveau partagé
+    other = PredictionCache(max_entries=2, db_path=db_path, identity='model-a')
+    assert other.get('k1') == 1.0
+    assert other.stats()['disk_hits'] == 1
+
+    # Un autre modèle invalide les entrées
+    other.set_identity('model-b')
+    assert other.get('k1') is None
+    assert other.stats()['misses'] == 1
+
+    # ... sans effacer celles du modèle A, encore servi par d'autres workers (rollout, A/B)
+    assert PredictionCache(max_entries=2, db_path=db_path, identity='model-a').get('k1') == 1.0
+
+
+def test_prediction_cache_shared_tier_is_bounded(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'cache.sqlite')
+    cache = PredictionCache(max_entries=2, db_path=db_path, identity='model-a', max_disk_rows=10,
+                            disk_ttl_seconds=60)
+    now = time.time()
+    for i in range(25):
+        monkeypatch.setattr(time, 'time', lambda: now + i)
+        cache.put(f'k{i}', float(i))
+    with sqlite3.connect(db_path) as conn:
+        keys = {key for key, in conn.execute('SELECT key FROM predictions')}
+    # Élagage par lots : jamais plus de 10 % au-delà de la borne, les plus anciennes d'abord
+    assert len(keys) <= 11 and 'k24' in keys and 'k0' not in keys
+
+    # Au-delà du TTL, les lignes ne sont plus servies puis sont supprimées
+    monkeypatch.setattr(time, 'time', lambda: now + 200)
+    reader = PredictionCache(max_entries=2, db_path=db_path, identity='model-a', disk_ttl_seconds=60)
+    assert reader.get('k24') is None
+    reader.prune_disk()
+    assert reader.stats()['disk_evictions'] == len(keys)
+
+
+def test_predict_single_uses_cache():
+    cache = prediction_service.prediction_cache
+    payload = dict(PLAYER, potential=63.5)
+    before = cache.stats()
+    first = prediction_service.predict_single(payload)
+    second = prediction_service.predict_single(payload)
+    after = cache.stats()
+
+    assert first == second
+    assert after['hits'] == before['hits'] + 1
+    assert after['misses'] == before['misses'] + 1
+
+
+
+# --- Model registry and hot swap ------------------------------------------
+
+def test_model_registry_pairs_models_with_preprocessing():
+    versions = ModelRegistry(MODELS_DIR).scan()
+    assert [v['version'] for v in versions] == ['02_03_2025__18_26_55', '01_04_2025__04_51_56']
+    assert versions[0]['preprocessing'] == '02_03_2025__18_25_41'
+    assert versions[1]['paths']['transformer'].endswith('01_04_2025__04_49_42_full_transformer.pkl')
+
+
+def test_hot_swap_keeps_serving_requests():
+    service = PredictionService()
+    players = _players(8)
+    expected = [service.predict_single(p)['prediction'] for p in players]
+    errors = []
+    stop = threading.Event()
+
+    def traffic():
+        while not stop.is_set():
+            for player, value in zip(players, expected):
+                result = service.predict_single(player)
+                if not result['success'] or result['prediction'] != value:
+                    errors.append(result)
+
+    threads = [threading.Thread(target=traffic) for _ in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        for version in ('01_04_2025__04_51_56', '02_03_2025__18_26_55', '01_04_2025__04_51_56'):
+            status = service.load_version(version, background=False)
+            assert status['state'] == 'idle'
+            assert service.bundle.version == version
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    assert errors == []
+    assert 'warmup_seconds' in service.bundle.describe()['timings']
+
+
+def test_rejected_candidate_leaves_active_version(monkeypatch):
+    service = PredictionService()
+    active = service.bundle
+
+    monkeypatch.setenv('MODEL_SMOKE_TOLERANCE', '-1')
+    status = service.load_version('01_04_2025__04_51_56', background=False)
+    assert status['state'] == 'failed'
+    assert service.bundle is active
+    with pytest.raises(ValueError):
+        service.load_version('01_01_2000__00_00_00')
+
+
+
+# --- Memory-mapped model artifacts ----------------------------------------
+
+def test_exported_artifact_predicts_like_pickles(tmp_path):
+    output = str(tmp_path / 'artifact')
+    export_bundle(prediction_service.bundle, output)
+    bundle = open_artifact(output)
+
+    assert isinstance(bundle.svr_engine.support_vectors.base, np.memmap)
+    assert bundle.smoke_test()['ok']
+
+    frame = pd.read_csv(SAMPLE_CSV)
+    df = prediction_service.prepare_batch_frame(frame)
+    np.testing.assert_array_equal(
+        prediction_service.score_frame(df, bundle), prediction_service.score_frame(df)
+    )
+
+
+def test_registry_prefers_exported_artifact(tmp_path, monkeypatch):
+    for version in ModelRegistry(MODELS_DIR).scan():
+        for path in version['paths'].values():
+            link = tmp_path / os.path.basename(path)
+            if not link.exists():
+                link.symlink_to(os.path.abspath(path))
+    export_bundle(prediction_service.bundle, str(tmp_path / '02_03_2025__18_26_55_artifact'))
+
+    versions = ModelRegistry(str(tmp_path)).scan()
+    assert [v['format'] for v in versions] == ['artifact', 'joblib']
+
+    monkeypatch.setenv('MODEL_REGISTRY_DIR', str(tmp_path))
+    service = PredictionService()
+    service.load_version('02_03_2025__18_26_55', background=False)
+    assert service.bundle.describe()['format'] == 'artifact'
+    assert service.predict_single(PLAYER)['prediction'] == prediction_service.predict_single(PLAYER)['prediction']
+
+
+class StubGemini:
+    """Local stand-in for genai.Client counting calls"""
+
+    def __init__(self, delay=0.0, slow=()):
+        self.calls = []
+        self.delay = delay
+        self.slow = set(slow)
+        self.models = self
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents):
+        attribute = contents.split("player's ")[1].split('.')[0]
+        with self._lock:
+            self.calls.append(attribute)
+        time.sleep(5 if attribute in self.slow else self.delay)
+        return SimpleNamespace(text=f' advice for {attribute} ')
+
+
+def test_advice_cache_avoids_repeat_calls_and_persists(tmp_path, monkeypatch):
+    monkeypatch.setenv('ADVICE_CACHE_PATH', str(tmp_path / 'advice.sqlite'))
+    stub = StubGemini()
+    service = RecommendationService(gemini_client=stub)
+    player = {'finishing': 10, 'dribbling': 10, 'stamina': 99}
+
+    first = service.get_recommendations(player, 60.0)
+    second = service.get_recommendations(player, 60.0)
+    assert first == second
+    assert sorted(stub.calls) == ['dribbling', 'finishing']
+    assert first[0]['recommendation'] == 'advice for ' + first[0]['attribute']
+
+    # Un nouveau processus relit le fichier au lieu d'appeler Gemini
+    restarted = RecommendationService(gemini_client=StubGemini())
+    assert restarted.generate_training_advice('finishing') == 'advice for finishing'
+    assert restarted.gemini_client.calls == []
+    assert restarted.advice_cache.stats()['disk_hits'] == 1
+
+
+def test_advice_fetch_is_concurrent_with_timeout_fallback(tmp_path, monkeypatch):
+    monkeypatch.setenv('ADVICE_CACHE_PATH', str(tmp_path / 'advice.sqlite'))
+    monkeypatch.setenv('ADVICE_TIMEOUT_SECONDS', '1')
+    monkeypatch.setenv('ADVICE_MAX_CONCURRENCY', '4')
+    stub = StubGemini(delay=0.3, slow={'finishing'})
+    service = RecommendationService(gemini_client=stub)
+    attributes = ['finishing', 'dribbling', 'stamina', 'vision']
+
+    started = time.monotonic()
+    advice = service.generate_training_advice_many(attributes)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 2.0
+    assert advice['finishing'] == service.get_fallback_advice('finishing')
+    assert advice['vision'] == 'advice for vision'
+    # Le repli n'est pas mis en cache : il sera retenté
+    assert 'finishing' not in service.advice_cache.get_many(['finishing'])
+
+
+def test_advice_fetch_deadline_does_not_grow_with_batch_size(tmp_path, monkeypatch):
+    monkeypatch.setenv('ADVICE_CACHE_PATH', str(tmp_path / 'advice.sqlite'))
+    monkeypatch.setenv('ADVICE_TIMEOUT_SECONDS', '1')
+    monkeypatch.setenv('ADVICE_DEADLINE_SECONDS', '1')
+    monkeypatch.setenv('ADVICE_MAX_CONCURRENCY', '2')
+    stub = StubGemini(delay=0.3)
+    service = RecommendationService(gemini_client=stub)
+    attributes = [f'attribute_{i}' for i in range(20)]
+
+    started = time.monotonic()
+    advice = service.generate_training_advice_many(attributes)
+    assert time.monotonic() - started < 1.5
+    assert advice['attribute_0'] == 'advice for attribute_0'
+    assert advice['attribute_19'] == service.get_fallback_advice('attribute_19')
+
+    # Les appels encore en file à l'échéance n'atteignent jamais Gemini
+    time.sleep(0.7)
+    assert len(stub.calls) < len(attributes)
+
+
+def test_batch_recommendations_match_single_player_path(tmp_path, monkeypatch):
+    thresholds = json.load(open(THRESHOLDS_JSON))
+    path = tmp_path / 'thresholds.json'
+    path.write_text(json.dumps(thresholds))
+    monkeypatch.setenv('THRESHOLDS_PATH', str(path))
+    monkeypatch.setenv('THRESHOLDS_RELOAD_SECONDS', '0')
+    monkeypatch.setenv('ADVICE_CACHE_PATH', '')
+    service = RecommendationService(gemini_client=StubGemini())
+
+    players = pd.read_csv(SAMPLE_CSV).head(50).to_dict('records')
+    batch = service.get_recommendations_batch(players, top_k=4)
+    for player, result in zip(players, batch['players']):
+        single = service.get_recommendations(player, 60.0)
+        assert result['weak_count'] == len(single)
+        assert [w['improvement_needed'] for w in result['weaknesses']] == \
+            [float(r['improvement_needed']) for r in single[:4]]
+        for weakness in result['weaknesses']:
+            assert batch['advice'][weakness['attribute']] == 'advice for ' + weakness['attribute']
+
+    # Fichier modifié sur disque : rechargé au prochain appel
+    thresholds['finishing']['seuil'] = 100
+    path.write_text(json.dumps(thresholds))
+    os.utime(path, ns=(time.time_ns() + 10**9,) * 2)
+    result = service.get_recommendations_batch([{'finishing': 99}], top_k=1, include_advice=False)
+    assert result['players'][0]['weaknesses'][0]['threshold'] == 100
+
+
+# --- Prediction history ---------------------------------------------------
+
+def _history_rows(path):
+    import sqlite3
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            'SELECT user_id, input_data, prediction_result FROM prediction_history ORDER BY prediction_result'
+        ).fetchall()
+
+
+def _dirty_sample_csv(tmp_path):
+    # Une valeur non numérique : colonne lue comme texte puis convertie par prepare_batch_frame
+    frame = pd.read_csv(SAMPLE_CSV)
+    frame['crossing'] = frame['crossing'].astype(object)
+    frame.loc[2, 'crossing'] = 'abc'
+    path = tmp_path / 'dirty.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+def test_csv_engines_score_like_inferred_read(engine, monkeypatch):
+    monkeypatch.setenv('CSV_ENGINE', engine)
+    bundle = prediction_service.bundle
+    dtypes = prediction_service.batch_csv_dtypes(bundle)
+    with open(SAMPLE_CSV, 'rb') as f:
+        frame = batch_io.read_csv(f, dtypes)
+    inferred = pd.read_csv(SAMPLE_CSV)
+
+    assert frame.columns.tolist() == inferred.columns.tolist()
+    if engine == 'pyarrow':
+        assert frame['preferred_foot'].dtype == 'category'
+    assert all(frame[col].dtype == inferred[col].dtype for col in bundle.numerical_columns if col in frame)
+    np.testing.assert_allclose(
+        prediction_service.score_frame(prediction_service.prepare_batch_frame(frame, bundle), bundle),
+        prediction_service.score_frame(prediction_service.prepare_batch_frame(inferred, bundle), bundle)
+    )
+
+
+def test_typed_csv_read_coerces_dirty_numeric_values(tmp_path, monkeypatch):
+    monkeypatch.setenv('CSV_ENGINE', 'pyarrow')
+    path = _dirty_sample_csv(tmp_path)
+    frame = batch_io.read_csv(path, prediction_service.batch_csv_dtypes(prediction_service.bundle))
+    assert frame['crossing'].tolist()[2] == 'abc'
+
+    results = prediction_service.predict_batch(path)
+    streamed = [r for chunk in prediction_service.iter_batch_predictions(path, 2) for r in chunk]
+    assert [r['prediction'] for r in results] == [r['prediction'] for r in streamed]
+    assert results[2]['crossing'] == 50.0
+
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+def test_integer_csv_batch_matches_legacy_output(engine, tmp_path, monkeypatch):
+    # Attributs entiers : "potential": 71 doit rester 71 (pas 71.0) quel que soit le moteur
+    monkeypatch.setenv('CSV_ENGINE', engine)
+    frame = pd.read_csv(SAMPLE_CSV)
+    for col in prediction_service.numerical_columns:
+        if col in frame:
+            frame[col] = frame[col].round().astype('int64')
+    path = tmp_path / 'integers.csv'
+    frame.to_csv(path, index=False)
+
+    original_df, df = legacy_read_batch_csv(prediction_service, str(path))
+    legacy = legacy_build_batch_results(prediction_service, original_df, df,
+                                        prediction_service.score_frame(df).reshape(-1, 1))
+    results = prediction_service.predict_batch(str(path))
+    streamed = [r for chunk in prediction_service.iter_batch_predictions(str(path), 2) for r in chunk]
+
+    assert json.dumps(results) == json.dumps(legacy)
+    assert json.dumps(streamed) == json.dumps(results)
+    assert isinstance(results[0]['potential'], int)
+
+
+def test_streamed_csv_extra_columns_keep_whole_file_types(tmp_path):
+    # Colonnes hors modèle : chaque chunk doit garder le type inféré sur tout le fichier
+    frame = pd.concat([pd.read_csv(SAMPLE_CSV)] * 2, ignore_index=True).head(6)
+    frame['club_code'] = ['1', 'x', '2', '3', '4', '5']
+    frame['caps'] = [1, 2, 3, 4, None, 6]
+    frame['rating'] = [1, 2, 3, 4, 5.5, 6]
+    path = tmp_path / 'extra.csv'
+    frame.to_csv(path, index=False)
+
+    results = prediction_service.predict_batch(str(path))
+    streamed = [r for chunk in prediction_service.iter_batch_predictions(str(path), 2) for r in chunk]
+    assert json.dumps(streamed) == json.dumps(results)
+    assert results[2]['club_code'] == '2' and results[0]['caps'] == 1.0 and results[0]['rating'] == 1.0
+
+
+def test_job_service_pages_by_offset_and_expires_stale_queued_jobs(tmp_path):
+    service = JobService(jobs_dir=str(tmp_path / 'jobs'), max_workers=1, chunk_rows=2)
+    upload = tmp_path / 'players.csv'
+    upload.write_bytes(open(SAMPLE_CSV, 'rb').read())
+    job_id = service.submit(str(upload), 'players.csv', user_id='u1')['id']
+    service.shutdown()
+    expected = prediction_service.predict_batch(SAMPLE_CSV)
+    assert service.read_results(job_id, 3, 2) == expected[3:5]
+    assert service.read_results(job_id, len(expected), 2) == []
+
+    # Job resté en file dans un processus disparu : échoué, upload supprimé
+    os.makedirs(service.job_dir('orphan'))
+    open(service.input_path('orphan'), 'w').close()
+    with service.connect() as conn:
+        conn.execute("INSERT INTO jobs (id, user_id, status, created_at, updated_at) VALUES ('orphan', 'u1', 'queued', 0, 0)")
+    service.purge_expired()
+    assert service.get('orphan')['status'] == 'failed'
+    assert not os.path.exists(service.input_path('orphan'))
+
+
+def test_prediction_recorder_flushes_on_size_and_close(tmp_path):
+    path = str(tmp_path / 'database.sqlite')
+    recorder = PredictionRecorder(path, flush_rows=3, flush_seconds=60)
+
+    recorder.record('u1', {'potential': 80}, 61.5)
+    recorder.record(None, {'potential': 80}, 99.0)  # anonyme : ignoré
+    assert _history_rows(path) == []
+
+    recorder.record_batch('u2', [{'id': 1, 'prediction': 62.0}, {'id': 2, 'prediction': 63.0}])
+    deadline = time.monotonic() + 5
+    while len(_history_rows(path)) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [(r[0], json.loads(r[1]), r[2]) for r in _history_rows(path)] == [
+        ('u1', {'potential': 80}, 61.5), ('u2', {'id': 1}, 62.0), ('u2', {'id': 2}, 63.0)
+    ]
+
+    # Arrêt propre : le reste du tampon est écrit avant la sortie
+    recorder.record('u1', {'potential': 81}, 64.0)
+    recorder.close()
+    assert len(_history_rows(path)) == 4
+    assert recorder.stats()['buffered'] == 0
+
+
+def test_prediction_recorder_skips_bad_rows_and_keeps_writing(tmp_path):
+    path = str(tmp_path / 'database.sqlite')
+    recorder = PredictionRecorder(path, flush_rows=1, flush_seconds=60)
+
+    class BrokenResult:
+        def __len__(self):
+            return 2
+
+        def iter_records(self):
+            raise KeyError('result expired')
+
+    recorder.record_batch('u1', pd.DataFrame({'id': [1, 2, 3], 'prediction': [61.0, None, float('nan')]}))
+    recorder.record_batch('u1', BrokenResult())
+    recorder.record_batch('u1', [{'id': 4, 'prediction': None}, {'id': 5, 'prediction': 65.0}])
+    deadline = time.monotonic() + 5
+    while len(_history_rows(path)) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Le thread d'écriture a survécu aux lignes invalides
+    assert recorder._thread.is_alive()
+    recorder.close()
+
+    assert [json.loads(r[1])['id'] for r in _history_rows(path)] == [1, 5]
+    stats = recorder.stats()
+    assert stats['skipped'] == 5 and stats['errors'] == 0 and stats['buffered'] == 0
+
+
+def test_single_prediction_is_recorded_for_the_caller(client, auth_headers):
+    from app.services.prediction_recorder import prediction_recorder
+
+    response = client.post('/api/predict/single', json=dict(PLAYER, potential=77), headers=auth_headers)
+    assert response.status_code == 200
+    prediction_recorder.flush()
+    rows = [r for r in _history_rows(prediction_recorder.db_path) if json.loads(r[1]).get('potential') == 77]
+    assert rows and rows[-1][0] == 'test-user'
+    assert rows[-1][2] == response.get_json()['prediction']
+
+
+# --- Benchmark suite ------------------------------------------------------
+
+def test_load_generator_and_baseline_comparison(flask_app, auth_headers, tmp_path):
+    def single(client, i):
+        return client.post('/api/predict/single', json=dict(PLAYER, potential=50 + i), headers=auth_headers)
+
+    stats = run_load(flask_app, single, concurrency=3, requests=12)
+    assert stats['requests'] == 12 and stats['errors'] == 0
+    assert stats['p50'] <= stats['p95'] <= stats['p99'] and stats['throughput'] > 0
+
+    baseline = tmp_path / 'baseline.json'
+    save_baseline(str(baseline), {'results': {'load.single': stats}})
+    assert compare_baseline(str(baseline), {'results': {'load.single': stats}}) == []
+
+    slower = dict(stats, p95=stats['p95'] * 2, throughput=stats['throughput'] / 2)
+    regressions = compare_baseline(str(baseline), {'results': {'load.single': slower}}, tolerance=0.25)
+    assert [r.split(':')[0] for r in regressions] == ['load.single p95', 'load.single throughput']
@@ -0,0 +1,23 @@
+#!/bin/bash
+# Usage: ./run-benchmarks.sh [save|compare] [extra suite options, e.g. --quick]
+#   save     enregistre les résultats comme nouvelle référence
+#   compare  compare à la référence enregistrée (code de sortie 1 en cas de régression)
+
+MODE=${1:-run}
+shift
+BASELINE_DIR=${BENCHMARK_BASELINE_DIR:-"$(pwd)/shared/benchmarks"}
+mkdir -p "$BASELINE_DIR"
+
+status=0
+for api in prediction-api auth-api; do
+    echo "Benchmarking $api..."
+    baseline="$BASELINE_DIR/$api.json"
+    case "$MODE" in
+        save) options=(--save-baseline "$baseline") ;;
+        compare) options=(--compare "$baseline") ;;
+        *) options=(--output "$BASELINE_DIR/$api.last.json") ;;
+    esac
+    (cd "$api" && python -m benchmarks.suite "${options[@]}" "$@") || status=1
+done
+
+exit $status